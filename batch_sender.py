@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# Building blocks shared by the tools that move messages in bulk
+# (throughput_test.py, queue_replay.py): a sender that writes as fast as
+# credit allows without starving the rest of the reactor, a periodic
+# ticker and a progress line.
+
+import time
+from proton.handlers import MessagingHandler
+from proton.reactor import AtMostOnce, AtLeastOnce
+
+TICK = 1.0
+
+
+class BatchSender(MessagingHandler):
+    """
+    Sends to 'address' at most 'batch' messages per reactor wakeup and
+    counts the broker's outcomes. 'send_next(sender)' is the record source:
+    it sends one message and returns its delivery, or returns None once
+    there is nothing left; it may also set self.exhausted after sending the
+    last one. finished_at is set, and the connection closed, once every
+    message sent has been settled (as soon as all are sent when pre-settled).
+    """
+
+    def __init__(self, broker_url, address, batch, presettled, send_next):
+        super(BatchSender, self).__init__()
+        self.broker_url = broker_url
+        self.address = address
+        self.batch = batch
+        self.presettled = presettled
+        self.send_next = send_next
+        self.sent = 0
+        self.confirmed = 0
+        self.rejected = 0
+        self.exhausted = False
+        self.finished_at = None
+        self._sender = None
+        self._container = None
+        self._resume_scheduled = False
+
+    def on_start(self, event):
+        self._container = event.container
+        connection = event.container.connect(self.broker_url, handler=self)
+        options = AtMostOnce() if self.presettled else AtLeastOnce()
+        self._sender = event.container.create_sender(connection, self.address, options=options)
+
+    def on_sendable(self, event):
+        self._send_batch()
+
+    def on_timer_task(self, event):
+        self._resume_scheduled = False
+        self._send_batch()
+
+    def _send_batch(self):
+        if self.finished_at is not None:
+            return
+        sender = self._sender
+        burst = 0
+        while not self.exhausted and sender.credit > 0 and burst < self.batch:
+            delivery = self.send_next(sender)
+            if delivery is None:
+                self.exhausted = True
+                break
+            if self.presettled:
+                delivery.settle()
+            self.sent += 1
+            burst += 1
+        if self.exhausted:
+            self._check_done()
+        elif sender.credit > 0 and not self._resume_scheduled:
+            # Batch full but credit left: yield to the reactor, then go on.
+            self._resume_scheduled = True
+            self._container.schedule(0, self)
+
+    def on_accepted(self, event):
+        self.confirmed += 1
+        self._check_done()
+
+    def on_rejected(self, event):
+        self.rejected += 1
+        self._check_done()
+
+    def on_released(self, event):
+        self.rejected += 1
+        self._check_done()
+
+    def _check_done(self):
+        if self.exhausted and (self.presettled or self.confirmed + self.rejected >= self.sent):
+            self._finish()
+
+    def _finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+            self._sender.connection.close()
+
+
+class Ticker(object):
+    """Calls handler.tick(now) every TICK seconds until it returns False."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._container = None
+        self._task = None
+
+    def start(self, container):
+        self._container = container
+        self._task = container.schedule(TICK, self)
+
+    def on_timer_task(self, event):
+        self._task = None
+        if self.handler.tick(time.perf_counter()):
+            self._task = self._container.schedule(TICK, self)
+
+    def stop(self):
+        # A pending timer would otherwise keep the reactor running.
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class Progress(object):
+    """Prints a progress line with the rate since the previous one every 'interval' seconds (0 for never)."""
+
+    def __init__(self, label, interval, total=None):
+        self.label = label
+        self.interval = interval
+        self.total = total
+        self._last_at = time.perf_counter()
+        self._last_count = 0
+
+    def update(self, now, count):
+        if not self.interval or now - self._last_at < self.interval:
+            return
+        rate = (count - self._last_count) / (now - self._last_at)
+        done = f"{count}/{self.total}" if self.total is not None else str(count)
+        print(f"{self.label}: {done} messages, {rate:.0f} msgs/sec", flush=True)
+        self._last_at = now
+        self._last_count = count
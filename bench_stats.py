@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+
+# Summary statistics shared by the benchmark tools. Only the standard
+# library is used, so the tools that never touch proton can import it.
+
+
+def percentile(sorted_values, pct):
+    """
+    The pct-th percentile of an already sorted list: the value at index
+    round(pct / 100 * (n - 1)), without interpolating between neighbours.
+    An empty list gives 0.0.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
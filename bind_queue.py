@@ -1,75 +1,18 @@
 #!/usr/bin/env python3
 
 import sys
-from proton import Message
-from proton.handlers import MessagingHandler
-from proton.reactor import Container
 
-BROKER_URL = "localhost:5671"
-MANAGEMENT_NODE_ADDRESS = "qmf.default.direct/broker"
-
-class QmfManager(MessagingHandler):
-    def __init__(self, broker_url, bind_arguments):
-        super(QmfManager, self).__init__()
-        self.broker_url = broker_url
-        self.bind_arguments = bind_arguments
-        self._sender = None
-        self._receiver = None
-        self._request_sent = False
-        self._connection = None
-
-    def on_start(self, event):
-        self._connection = event.container.connect(self.broker_url)
-        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
-        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
-
-    def on_link_opened(self, event):
-        if event.receiver == self._receiver and not self._request_sent:
-            self._send_bind_request()
-            self._request_sent = True
-
-    def _send_bind_request(self):
-        reply_to_address = self._receiver.remote_source.address
-
-        request_props = {
-            'qmf.opcode': '_method',
-        }
-        
-        request_body = {
-            '_method_name': 'bind',
-            '_arguments': self.bind_arguments
-        }
-
-        msg = Message(
-            reply_to=reply_to_address,
-            properties=request_props,
-            body=request_body
-        )
-
-        print(f"Sending request to bind queue '{self.bind_arguments['queue']}' to exchange '{self.bind_arguments['exchange']}' with key '{self.bind_arguments['key']}'...")
-        self._sender.send(msg)
-
-    def on_message(self, event):
-        reply_props = event.message.properties
-        if reply_props and reply_props.get('qmf.opcode') == '_exception':
-            print("\n[ERROR] Broker returned an exception. Bind operation failed.")
-            print(f"Details: {event.message.body}")
-            print("\nHint: Make sure both the exchange and the queue already exist.")
-        else:
-            print(f"\n[SUCCESS] Broker response received. Bind operation should be complete.")
-        self._connection.close()
+from mgmt_client import daemon_socket, qmf_call
+from profiling import profile_from_argv
 
-    def on_transport_error(self, event):
-        print(f"[ERROR] Transport error: {event.transport.condition}")
-        if self._connection:
-            self._connection.close()
+BROKER_URL = "localhost:5671"
 
-# --- Main execution ---
-if __name__ == "__main__":
+def main():
+    profile_from_argv()
     if len(sys.argv) != 4:
-        print("Usage: python3 bind_queue.py <exchange-name> <queue-name> <binding-key>")
+        print("Usage: python3 bind_queue.py <exchange-name> <queue-name> <binding-key> [--profile]")
         print("Example: python3 bind_queue.py s1 s2 mykey")
-        sys.exit(1)
+        return 1
 
     exchange_name = sys.argv[1]
     queue_name = sys.argv[2]
@@ -81,8 +24,37 @@ if __name__ == "__main__":
         "key": binding_key
     }
 
+    socket_path = daemon_socket()
+    if socket_path:
+        print(f"Sending request to bind queue '{queue_name}' to exchange '{exchange_name}' with key '{binding_key}' through {socket_path}...")
+        try:
+            response = qmf_call(socket_path, BROKER_URL, "bind", arguments_for_bind)
+        except OSError as e:
+            print(f"[ERROR] Could not reach the management daemon: {e}")
+            return 1
+        if response["ok"]:
+            print("\n[SUCCESS] Broker response received. Bind operation should be complete.")
+        elif "error" in response:
+            print(f"\n[ERROR] {response['error']}")
+        else:
+            print("\n[ERROR] Broker returned an exception. Bind operation failed.")
+            print(f"Details: {response['body']}")
+            print("\nHint: Make sure both the exchange and the queue already exist.")
+        return 0 if response["ok"] else 1
+
+    # Only a request sent over a connection of our own needs proton.
+    from proton.reactor import Container
+    from mgmt_handlers import QmfBindManager
+    from mgmt_metrics import export_from_env
+
     try:
-        handler = QmfManager(BROKER_URL, arguments_for_bind)
+        handler = QmfBindManager(BROKER_URL, arguments_for_bind)
         Container(handler).run()
+        export_from_env()
     except Exception as e:
         print(f"An error occurred: {e}")
+    return 0
+
+# --- Main execution ---
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,8 @@
 import sys
 import pika
 
+from profiling import profile_from_argv
+
 # --- Configuration ---
 # NOTE: We connect to the default AMQP 0-10 port!
 BROKER_HOST = "localhost"
@@ -43,8 +45,9 @@ def bind_queue_to_exchange(exchange_name, queue_name, routing_key):
 
 # --- Main execution ---
 if __name__ == "__main__":
+    profile_from_argv()
     if len(sys.argv) != 4:
-        print("Usage: python3 bind_queue.py <exchange-name> <queue-name> <binding-key>")
+        print("Usage: python3 bind_queue.py <exchange-name> <queue-name> <binding-key> [--profile]")
         print("Example: python3 bind_queue.py s1 s2 mykey")
         sys.exit(1)
 
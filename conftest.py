@@ -0,0 +1,3 @@
+# Lets the tests under tests/ import the tools from the repository root.
+# The *_test.py tools here are benchmarks run against a broker, not tests.
+collect_ignore = ["perf_test.py", "throughput_test.py"]
@@ -2,84 +2,28 @@
 
 import sys
 import argparse
-from proton import Message
-from proton.handlers import MessagingHandler
-from proton.reactor import Container
-
-
-BROKER_URL = "localhost:6600" 
-MANAGEMENT_NODE_ADDRESS = "qmf.default.direct/broker"
-
-class QmfManager(MessagingHandler):
-    def __init__(self, broker_url, method_name, method_arguments):
-        super(QmfManager, self).__init__()
-        self.broker_url = broker_url
-        self.method_name = method_name
-        self.method_arguments = method_arguments
-        self._sender = None
-        self._receiver = None
-        self._request_sent = False
-        self._connection = None
-        self._reply_received = False
-
-    def on_start(self, event):
-        self._connection = event.container.connect(self.broker_url)
-        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
-        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
-
-    def on_link_opened(self, event):
-        if event.receiver == self._receiver and not self._request_sent:
-            self._send_method_request()
-            self._request_sent = True
-
-    def _send_method_request(self):
-        reply_to_address = self._receiver.remote_source.address
-
-        request_props = {'qmf.opcode': '_method'}
-        
-        request_body = {
-            '_method_name': self.method_name,
-            '_arguments': self.method_arguments
-        }
-
-        msg = Message(
-            reply_to=reply_to_address,
-            properties=request_props,
-            body=request_body
-        )
-
-        print(f"Sending method request '{self.method_name}'...")
-        self._sender.send(msg)
-
-    def on_message(self, event):
-        self._reply_received = True
-        reply_props = event.message.properties
-        if reply_props and reply_props.get('qmf.opcode') == '_exception':
-            print("\n[ERROR] Broker returned an exception.")
-            print(f"Details: {event.message.body}")
-        else:
-            print("\n[SUCCESS] Broker response received. Operation should be complete.")
-        self._connection.close()
-    
-    def on_disconnected(self, event):
-        if not self._reply_received:
-            print("\n[ERROR] Connection closed by broker before a reply was received.")
-            print("[HINT] This often means a permission error or an invalid property.")
-            print("[HINT] Check broker logs for details (journalctl -u qpidd -f).")
 
+from mgmt_client import daemon_socket, qmf_call
+from profiling import add_profile_arguments, start_profiling
 
-if __name__ == "__main__":
+
+BROKER_URL = "localhost:6600"
+
+
+def main():
     parser = argparse.ArgumentParser(
         description="Create an AMQP 1.0 exchange on a Qpid C++ broker.",
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
-    
+
     parser.add_argument("exchange_type", help="The type of the exchange (e.g., direct, topic, fanout, headers).")
     parser.add_argument("exchange_name", help="The name of the exchange.")
     parser.add_argument("--durable", action="store_true", help="Make the exchange durable.")
     parser.add_argument("--alternate-exchange", metavar="<name>", help="Name of an alternate exchange for unroutable messages.")
-    
+
+    add_profile_arguments(parser)
     opts = parser.parse_args()
+    start_profiling(opts)
 
     exchange_properties = {
         "exchange-type": opts.exchange_type
@@ -87,7 +31,7 @@ if __name__ == "__main__":
 
     if opts.durable:
         exchange_properties["durable"] = True
-    
+
     if opts.alternate_exchange:
         exchange_properties["alternate-exchange"] = opts.alternate_exchange
 
@@ -97,13 +41,41 @@ if __name__ == "__main__":
         "properties": exchange_properties,
         "strict": True
     }
-    
+
     print("--- Arguments for 'create' method ---")
     print(create_method_arguments)
     print("---------------------------------------")
 
+    socket_path = daemon_socket()
+    if socket_path:
+        print(f"Sending method request 'create' through {socket_path}...")
+        try:
+            response = qmf_call(socket_path, BROKER_URL, "create", create_method_arguments)
+        except OSError as e:
+            print(f"[ERROR] Could not reach the management daemon: {e}")
+            return 1
+        if response["ok"]:
+            print("\n[SUCCESS] Broker response received. Operation should be complete.")
+        elif "error" in response:
+            print(f"\n[ERROR] {response['error']}")
+        else:
+            print("\n[ERROR] Broker returned an exception.")
+            print(f"Details: {response['body']}")
+        return 0 if response["ok"] else 1
+
+    # Only a request sent over a connection of our own needs proton.
+    from proton.reactor import Container
+    from mgmt_handlers import QmfManager
+    from mgmt_metrics import export_from_env
+
     try:
         handler = QmfManager(BROKER_URL, "create", create_method_arguments)
         Container(handler).run()
+        export_from_env()
     except Exception as e:
         print(f"An unhandled error occurred: {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
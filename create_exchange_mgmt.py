@@ -1,148 +1,148 @@
 #!/usr/bin/env python3
 
 import sys
+import time
 import argparse
 import json
-from proton import Message
-from proton.handlers import MessagingHandler
-from proton.reactor import Container
+from collections import Counter
 
-# AMQP 1.0 management address
-BROKER_URL = "localhost:5672"
-MANAGEMENT_ADDRESS = "$management"
-
-class AmqpManager(MessagingHandler):
-    def __init__(self, broker_url, operation, entity_type, entity_name, properties=None):
-        super(AmqpManager, self).__init__()
-        self.broker_url = broker_url
-        self.operation = operation
-        self.entity_type = entity_type
-        self.entity_name = entity_name
-        self.properties = properties or {}
-        self._sender = None
-        self._receiver = None
-        self._connection = None
-        self._correlation_id = "create-exchange-001"
-
-    def on_start(self, event):
-        self._connection = event.container.connect(self.broker_url)
-        self._sender = event.container.create_sender(self._connection, MANAGEMENT_ADDRESS)
-        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
-
-    def on_link_opened(self, event):
-        if event.receiver == self._receiver:
-            self._send_management_request()
-
-    def _send_management_request(self):
-        reply_to = self._receiver.remote_source.address
-        
-        # AMQP 1.0 management message format
-        request_body = {
-            "operation": self.operation,
-            "type": self.entity_type,
-            "name": self.entity_name
-        }
-        
-        # Add properties if provided
-        if self.properties:
-            request_body.update(self.properties)
-
-        msg = Message(
-            body=request_body,
-            reply_to=reply_to,
-            correlation_id=self._correlation_id,
-            properties={
-                "operation": self.operation,
-                "type": self.entity_type,
-                "name": self.entity_name
-            }
-        )
-
-        print(f"Sending {self.operation} request for {self.entity_type} '{self.entity_name}'...")
-        print(f"Request body: {json.dumps(request_body, indent=2)}")
-        self._sender.send(msg)
-
-    def on_message(self, event):
-        reply = event.message
-        
-        print(f"\nReceived reply with correlation_id: {reply.correlation_id}")
-        
-        if hasattr(reply, 'properties') and reply.properties:
-            status_code = reply.properties.get('statusCode', 200)
-            status_description = reply.properties.get('statusDescription', 'OK')
-            
-            if status_code >= 200 and status_code < 300:
-                print(f"[SUCCESS] {self.entity_type.capitalize()} '{self.entity_name}' {self.operation}d successfully")
-                print(f"Status: {status_code} - {status_description}")
-            else:
-                print(f"[ERROR] Operation failed with status {status_code}: {status_description}")
-        else:
-            print(f"[SUCCESS] {self.entity_type.capitalize()} '{self.entity_name}' {self.operation}d successfully")
-        
-        if reply.body:
-            print(f"Response body: {reply.body}")
-            
-        self._connection.close()
+from mgmt_client import daemon_socket, management_call
+from profiling import add_profile_arguments, start_profiling
 
-    def on_disconnected(self, event):
-        print(f"Disconnected from broker")
+BROKER_URL = "localhost:5672"
+DEFAULT_WINDOW = 100
+DEFAULT_TIMEOUT = 30.0
 
 
-if __name__ == "__main__":
+def main():
     parser = argparse.ArgumentParser(
         description="Create an AMQP 1.0 exchange on a Qpid C++ broker using management interface.",
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
-    parser.add_argument("exchange_type", help="The type of the exchange (e.g., direct, topic, fanout, headers).")
-    parser.add_argument("exchange_name", help="The name of the exchange.")
+    parser.add_argument("exchange_type", nargs="?", help="The type of the exchange (e.g., direct, topic, fanout, headers).")
+    parser.add_argument("exchange_name", nargs="?", help="The name of the exchange.")
     parser.add_argument("--durable", action="store_true", help="Make the exchange durable.")
     parser.add_argument("--auto-delete", action="store_true", help="Auto-delete the exchange when no longer in use.")
     parser.add_argument("--alternate-exchange", metavar="<name>", help="Name of an alternate exchange.")
     parser.add_argument("--argument", dest="extra_arguments", action="append", default=[], 
                         metavar="<NAME=VALUE>", help="Additional exchange arguments.")
-
+    parser.add_argument("--bulk", metavar="<file>",
+                        help="Send every 'exchange'/'queue' line of this file (qmf_bulk.py format, '-' for stdin) "
+                             "over one connection")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Maximum requests in flight in bulk mode (default: {DEFAULT_WINDOW})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Seconds to wait for each reply (default: {DEFAULT_TIMEOUT:.0f})")
+
+    add_profile_arguments(parser)
     opts = parser.parse_args()
+    start_profiling(opts)
 
-    # Build properties
-    properties = {
-        "exchangeType": opts.exchange_type,
-        "durable": opts.durable,
-        "autoDelete": opts.auto_delete
-    }
-
-    if opts.alternate_exchange:
-        properties["alternateExchange"] = opts.alternate_exchange
-
-    # Handle extra arguments
-    arguments = {}
-    for arg in opts.extra_arguments:
-        if "=" not in arg:
-            print(f"[ERROR] Invalid format for --argument: '{arg}'. Must be NAME=VALUE.")
-            sys.exit(1)
-        key, value = arg.split("=", 1)
-        try:
-            arguments[key] = int(value)
-        except ValueError:
-            if value.lower() == 'true':
-                arguments[key] = True
-            elif value.lower() == 'false':
-                arguments[key] = False
+    if not opts.bulk:
+        if not opts.exchange_type or not opts.exchange_name:
+            parser.error("exchange_type and exchange_name are required unless --bulk is given")
+
+        # Build properties
+        properties = {
+            "exchangeType": opts.exchange_type,
+            "durable": opts.durable,
+            "autoDelete": opts.auto_delete
+        }
+
+        if opts.alternate_exchange:
+            properties["alternateExchange"] = opts.alternate_exchange
+
+        # Handle extra arguments
+        arguments = {}
+        for arg in opts.extra_arguments:
+            if "=" not in arg:
+                print(f"[ERROR] Invalid format for --argument: '{arg}'. Must be NAME=VALUE.")
+                return 1
+            key, value = arg.split("=", 1)
+            try:
+                arguments[key] = int(value)
+            except ValueError:
+                if value.lower() == 'true':
+                    arguments[key] = True
+                elif value.lower() == 'false':
+                    arguments[key] = False
+                else:
+                    arguments[key] = value
+
+        if arguments:
+            properties["arguments"] = arguments
+
+        print("--- Exchange creation request ---")
+        print(f"Name: {opts.exchange_name}")
+        print(f"Type: {opts.exchange_type}")
+        print(f"Properties: {json.dumps(properties, indent=2)}")
+        print("--------------------------------")
+
+        socket_path = daemon_socket()
+        if socket_path:
+            print(f"Sending CREATE request for exchange '{opts.exchange_name}' through {socket_path}...")
+            try:
+                response = management_call(socket_path, BROKER_URL, "CREATE", "org.apache.qpid.broker:exchange",
+                                           opts.exchange_name, properties)
+            except OSError as e:
+                print(f"[ERROR] Could not reach the management daemon: {e}")
+                return 1
+            if "error" in response:
+                print(f"[ERROR] {response['error']}")
+            elif response["ok"]:
+                print(f"[SUCCESS] Exchange '{opts.exchange_name}' created successfully")
             else:
-                arguments[key] = value
+                status_code = response["properties"].get('statusCode')
+                status_description = response["properties"].get('statusDescription')
+                print(f"[ERROR] Operation failed with status {status_code}: {status_description}")
+            if response.get("body"):
+                print(f"Response body: {response['body']}")
+            return 0 if response["ok"] else 1
 
-    if arguments:
-        properties["arguments"] = arguments
+    # Only requests sent over a connection of our own need proton.
+    from proton.reactor import Container
+    from mgmt_handlers import AmqpManager
+    from mgmt_metrics import export_from_env
 
-    print("--- Exchange creation request ---")
-    print(f"Name: {opts.exchange_name}")
-    print(f"Type: {opts.exchange_type}")
-    print(f"Properties: {json.dumps(properties, indent=2)}")
-    print("--------------------------------")
+    if opts.bulk:
+        from operations import load_operations, to_management_request
+
+        try:
+            requests = [to_management_request(operation) for operation in load_operations(opts.bulk)]
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return 1
+
+        start_time = time.monotonic()
+        handler = AmqpManager(BROKER_URL, requests=requests, window=opts.window, timeout=opts.timeout, quiet=True)
+        try:
+            Container(handler).run()
+            export_from_env()
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return 1
+        duration = time.monotonic() - start_time
+
+        failed = sum(1 for request, status_code, description in handler.results
+                     if status_code is None or not 200 <= status_code < 300)
+        not_sent = len(requests) - len(handler.results)
+        rate = len(handler.results) / duration if duration > 0 else 0.0
+        statuses = Counter(status_code for request, status_code, description in handler.results)
+        print(f"{len(handler.results) - failed} succeeded, {failed} failed, {not_sent} not sent "
+              f"in {duration:.2f} seconds ({rate:.0f} requests/sec)")
+        print("Status codes: " + ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items(), key=str)))
+        return 1 if failed or not_sent else 0
 
     try:
         handler = AmqpManager(BROKER_URL, "CREATE", "org.apache.qpid.broker:exchange", 
-                             opts.exchange_name, properties)
+                             opts.exchange_name, properties, timeout=opts.timeout)
         Container(handler).run()
+        export_from_env()
     except Exception as e:
         print(f"An error occurred: {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,8 @@
 import sys
 import pika
 
+from profiling import profile_from_argv
+
 # --- Configuration ---
 # NOTE: We connect to the default AMQP 0-10 port!
 BROKER_HOST = "localhost"
@@ -41,8 +43,9 @@ def create_exchange(exchange_name, exchange_type):
 
 # --- Main execution ---
 if __name__ == "__main__":
+    profile_from_argv()
     if len(sys.argv) != 3:
-        print("Usage: python3 create_exchange.py <exchange-name> <exchange-type>")
+        print("Usage: python3 create_exchange.py <exchange-name> <exchange-type> [--profile]")
         print("Example: python3 create_exchange.py my-direct-exchange direct")
         sys.exit(1)
 
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+import argparse
+from proton.reactor import Container
+
+from operations import load_operations
+from qmf_bulk import QmfBulkManager, DEFAULT_WINDOW
+from profiling import add_profile_arguments, start_profiling
+
+def read_brokers(path):
+    """One broker URL per line; blank lines and '#' comments are ignored."""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+def run_fanout(broker_urls, operations, window=DEFAULT_WINDOW, quiet=True):
+    """
+    Applies the same operations to every broker at once from a single
+    reactor, one pipelined connection per broker. Returns the finished
+    QmfBulkManager of each broker, in the order given.
+    """
+    handlers = [QmfBulkManager(broker_url, operations, window, quiet, label=broker_url)
+                for broker_url in broker_urls]
+    Container(*handlers).run()
+    return handlers
+
+def result_matrix(handlers, total):
+    rows = []
+    for handler in handlers:
+        duration = None
+        if handler.started_at is not None and handler.finished_at is not None:
+            duration = handler.finished_at - handler.started_at
+        rows.append({
+            "broker": handler.broker_url,
+            "succeeded": handler.succeeded,
+            "failed": len(handler.failed),
+            "not_sent": total - handler.succeeded - len(handler.failed),
+            "seconds": duration,
+            "error": handler.error
+        })
+    return rows
+
+def print_matrix(rows):
+    width = max([len("broker")] + [len(row["broker"]) for row in rows])
+    print(f"\n{'broker':<{width}} {'ok':>7} {'failed':>7} {'unsent':>7} {'seconds':>8}  error")
+    for row in rows:
+        seconds = f"{row['seconds']:.2f}" if row["seconds"] is not None else "-"
+        print(f"{row['broker']:<{width}} {row['succeeded']:>7} {row['failed']:>7} {row['not_sent']:>7} "
+              f"{seconds:>8}  {row['error'] or ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply the same create/bind operations to several brokers concurrently.",
+        epilog="The operations file uses the qmf_bulk.py format."
+    )
+    parser.add_argument("file", nargs="?", default="-", help="Operations file ('-' or omitted for stdin).")
+    parser.add_argument("--broker", dest="brokers", action="append", default=[], metavar="<url>",
+                        help="Broker URL (repeatable).")
+    parser.add_argument("--brokers-file", metavar="<file>", help="File with one broker URL per line.")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Maximum requests in flight per broker (default: {DEFAULT_WINDOW}).")
+    parser.add_argument("--verbose", action="store_true", help="Also print every successful operation.")
+    parser.add_argument("--json", action="store_true", help="Print the result matrix as JSON.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    broker_urls = list(opts.brokers)
+    if opts.brokers_file:
+        broker_urls.extend(read_brokers(opts.brokers_file))
+    if not broker_urls:
+        parser.error("give at least one --broker or --brokers-file")
+
+    try:
+        # Every broker walks the same list, so it is read once up front.
+        operations = load_operations(opts.file)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    start_time = time.monotonic()
+    try:
+        handlers = run_fanout(broker_urls, operations, opts.window, quiet=not opts.verbose)
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}")
+        sys.exit(1)
+    duration = time.monotonic() - start_time
+
+    rows = result_matrix(handlers, len(operations))
+    if opts.json:
+        print(json.dumps({"seconds": duration, "operations": len(operations), "brokers": rows}, indent=2))
+    else:
+        print_matrix(rows)
+        print(f"\n{len(operations)} operations on {len(broker_urls)} brokers in {duration:.2f} seconds")
+
+    if any(row["failed"] or row["not_sent"] or row["error"] for row in rows):
+        sys.exit(1)
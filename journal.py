@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# Append-only journal for resumable bulk runs. Each operation is identified
+# by a 16 byte digest of its method and arguments; the journal records when
+# it was sent ("S"), confirmed ("D") or refused ("F") by the broker, one
+# fixed-size record per event, written straight to the file without
+# buffering.
+#
+# A run that reuses the journal skips operations that were confirmed and
+# sends refused ones again as they are. Ones that were sent but never
+# answered may or may not have been applied. They are sent again too, but
+# flagged, so the caller can take an "already exists" refusal of such a
+# create, or a "not found" refusal of such a delete, as a success: qpidd
+# refuses a repeated create whatever its 'strict' argument says.
+#
+# Identical operations are counted, not deduplicated: the nth occurrence in
+# the input is skipped only if the journal confirmed it at least n times.
+
+import os
+import json
+import hashlib
+from collections import Counter
+
+DIGEST_SIZE = 16
+SENT = b"S"
+DONE = b"D"
+FAILED = b"F"
+RECORD_SIZE = 1 + DIGEST_SIZE
+
+def operation_digest(operation):
+    """Digest of an operation. 'strict' is left out; qpidd does not act on it."""
+    arguments = {key: value for key, value in operation["arguments"].items() if key != "strict"}
+    data = json.dumps([operation["method"], arguments], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class Journal(object):
+    def __init__(self, path):
+        self.path = path
+        self.skipped = 0
+        self.resent = 0
+        sent = Counter()
+        answered = Counter()
+        self._done = Counter()
+        size = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            # A record cut short by a crash is dropped.
+            size = len(data) - len(data) % RECORD_SIZE
+            for offset in range(0, size, RECORD_SIZE):
+                kind = data[offset:offset + 1]
+                digest = data[offset + 1:offset + RECORD_SIZE]
+                if kind == SENT:
+                    sent[digest] += 1
+                else:
+                    answered[digest] += 1
+                    if kind == DONE:
+                        self._done[digest] += 1
+        self.completed = sum(self._done.values())
+        self._uncertain = sent - answered
+        self._file = open(path, "ab", buffering=0)
+        self._file.truncate(size)
+
+    def pending(self, operations):
+        """
+        Lazily yields (operation, resent) for the operations that still need
+        to be sent; 'resent' is True for one whose earlier outcome is
+        unknown (see operations.already_applied). The caller sends each one
+        as soon as it is yielded, so it is journaled as sent here.
+        """
+        for operation in operations:
+            digest = operation_digest(operation)
+            if self._take_done(digest):
+                continue
+            if self._uncertain[digest] > 0:
+                # Its "S" record is already there and still unanswered.
+                self._uncertain[digest] -= 1
+                self.resent += 1
+                yield operation, True
+            else:
+                self._file.write(SENT + digest)
+                yield operation, False
+
+    def confirmed(self, operation):
+        """
+        True if an earlier run confirmed this occurrence of the operation,
+        as pending() would skip it, but without journaling anything: for
+        sorting out the operations a failed run never got to.
+        """
+        return self._take_done(operation_digest(operation))
+
+    def _take_done(self, digest):
+        if self._done[digest] > 0:
+            self._done[digest] -= 1
+            self.skipped += 1
+            return True
+        return False
+
+    def record_done(self, operation):
+        self._file.write(DONE + operation_digest(operation))
+
+    def record_failed(self, operation):
+        self._file.write(FAILED + operation_digest(operation))
+
+    def close(self):
+        if not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._file.close()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+# asyncio API for broker management calls. The proton reactor runs on a
+# background thread (see mgmt_session.py); each call returns once its reply
+# arrives, so many calls can be awaited concurrently on one connection.
+#
+#   async with AsyncManagement("localhost:5671") as mgmt:
+#       await mgmt.create_exchange("s1", "topic", durable=True)
+#       await asyncio.gather(*(mgmt.bind("s1", q, "mykey") for q in queues))
+
+import sys
+import asyncio
+import argparse
+
+import operations
+from mgmt_session import (ReactorThread, qmf_method_request, management_request,
+                          QMF_ADDRESS, MANAGEMENT_ADDRESS, DEFAULT_TIMEOUT)
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+
+class ManagementError(Exception):
+    """The broker rejected a request, or no reply arrived."""
+
+    def __init__(self, message, details=None):
+        super(ManagementError, self).__init__(message)
+        self.details = details
+
+
+class AsyncManagement(object):
+    """
+    Management client for one broker. A reactor thread is started on first
+    use unless one is passed in, in which case it may be shared between
+    several clients (e.g. one per broker).
+    """
+
+    def __init__(self, broker_url=BROKER_URL, timeout=DEFAULT_TIMEOUT, reactor=None):
+        self.broker_url = broker_url
+        self._reactor = reactor
+        self._owns_reactor = reactor is None
+        self._timeout = timeout
+
+    def _ensure_reactor(self):
+        if self._reactor is None:
+            self._reactor = ReactorThread(self._timeout).start()
+        return self._reactor
+
+    async def _request(self, address, message):
+        """Returns (reply, error) with exactly one of them set."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(reply, error):
+            if not future.done():
+                future.set_result((reply, error))
+
+        def on_reply(reply, error):
+            # Runs on the reactor thread.
+            loop.call_soon_threadsafe(resolve, reply, error)
+
+        self._ensure_reactor().submit(self.broker_url, address, message, on_reply)
+        # The session times out a request only once it is sent; this also
+        # covers one still queued behind a connection or link that never opens.
+        try:
+            return await asyncio.wait_for(future, self._timeout)
+        except asyncio.TimeoutError:
+            return None, f"no reply from {self.broker_url} within {self._timeout:g} seconds"
+
+    async def qmf_method(self, method_name, arguments):
+        """Calls a QMF method on the broker object and returns the reply body."""
+        reply, error = await self._request(QMF_ADDRESS, qmf_method_request(method_name, arguments))
+        if error:
+            raise ManagementError(error)
+        reply_props = reply.properties
+        if reply_props and reply_props.get('qmf.opcode') == '_exception':
+            raise ManagementError(f"broker returned an exception for '{method_name}'", reply.body)
+        return reply.body
+
+    async def management(self, operation, entity_type, entity_name, properties=None):
+        """Sends an AMQP 1.0 '$management' request and returns the reply body."""
+        message = management_request(operation, entity_type, entity_name, properties)
+        reply, error = await self._request(MANAGEMENT_ADDRESS, message)
+        if error:
+            raise ManagementError(error)
+        status_code = (reply.properties or {}).get('statusCode', 200)
+        if not 200 <= status_code < 300:
+            status_description = reply.properties.get('statusDescription')
+            raise ManagementError(f"operation failed with status {status_code}: {status_description}", reply.body)
+        return reply.body
+
+    async def _run(self, operation):
+        return await self.qmf_method(operation["method"], operation["arguments"])
+
+    async def create_exchange(self, name, exchange_type, durable=False, alternate_exchange=None):
+        return await self._run(operations.exchange_create(name, exchange_type, durable, alternate_exchange))
+
+    async def create_queue(self, name, durable=False, auto_delete=False, alternate_exchange=None):
+        return await self._run(operations.queue_create(name, durable, auto_delete, alternate_exchange))
+
+    async def bind(self, exchange, queue, key):
+        return await self._run(operations.bind(exchange, queue, key))
+
+    async def delete(self, object_type, name):
+        return await self._run(operations.delete(object_type, name))
+
+    async def close(self):
+        if self._owns_reactor and self._reactor is not None:
+            reactor, self._reactor = self._reactor, None
+            await asyncio.get_running_loop().run_in_executor(None, reactor.stop)
+
+    async def __aenter__(self):
+        self._ensure_reactor()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+async def _bind_all(broker_url, exchange_name, queue_names, binding_key):
+    async with AsyncManagement(broker_url) as mgmt:
+        results = await asyncio.gather(
+            *(mgmt.bind(exchange_name, queue_name, binding_key) for queue_name in queue_names),
+            return_exceptions=True
+        )
+    failed = 0
+    for queue_name, result in zip(queue_names, results):
+        if isinstance(result, ManagementError):
+            failed += 1
+            print(f"[ERROR] bind queue '{queue_name}': {result}")
+            if result.details:
+                print(f"Details: {result.details}")
+        elif isinstance(result, Exception):
+            raise result
+    print(f"{len(queue_names) - failed} succeeded, {failed} failed")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bind many queues to an exchange concurrently using the asyncio API.")
+    parser.add_argument("exchange_name", help="The name of the exchange.")
+    parser.add_argument("binding_key", help="The binding key.")
+    parser.add_argument("queue_names", nargs="+", help="The queues to bind.")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+    failed = asyncio.run(_bind_all(opts.broker, opts.exchange_name, opts.queue_names, opts.binding_key))
+    sys.exit(1 if failed else 0)
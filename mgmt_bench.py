@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+# Latency/throughput benchmark for the management transports in this repo:
+#
+#   qmf            mgmt_handlers.QmfManager, one connection per operation
+#   qmf-pipelined  mgmt_async.AsyncManagement, one connection for all operations
+#   mgmt           mgmt_handlers.AmqpManager ($management), one connection per operation
+#   amqp091        create_exchange_pika / bind_queue_pike, one connection per operation
+#   rest           rest_create_exchange.create_exchange_rest, one request per operation
+#
+# With --local the AMQP 1.0 and REST transports run against stub_broker.py
+# on free local ports, so the suite needs no broker (amqp091 has no stub and
+# is skipped). --save writes the results as JSON; --baseline compares ops/sec
+# with an earlier run and exits non-zero on a regression.
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import operations
+from bench_stats import percentile
+from profiling import add_profile_arguments, start_profiling
+
+TRANSPORTS = ["qmf", "qmf-pipelined", "mgmt", "amqp091", "rest"]
+BIND_TRANSPORTS = {"qmf", "qmf-pipelined", "amqp091"}
+BENCH_QUEUE = "bench-queue"
+BENCH_BIND_EXCHANGE = "amq.topic"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+class Targets(object):
+    """Where each transport connects to."""
+
+    def __init__(self, qmf_url, mgmt_url, amqp091_host, amqp091_port, rest_url):
+        self.qmf_url = qmf_url
+        self.mgmt_url = mgmt_url
+        self.amqp091_host = amqp091_host
+        self.amqp091_port = amqp091_port
+        self.rest_url = rest_url
+
+
+def _operation(kind, name):
+    if kind == "bind":
+        return operations.bind(BENCH_BIND_EXCHANGE, BENCH_QUEUE, name)
+    return operations.exchange_create(name, "topic")
+
+def _per_call_function(transport, kind, targets):
+    """Returns call(name) -> bool for the transports that do one operation per connection."""
+    if transport in ("qmf", "mgmt"):
+        from proton.reactor import Container
+
+    if transport == "qmf":
+        from mgmt_handlers import QmfManager
+
+        def call(name):
+            operation = _operation(kind, name)
+            handler = QmfManager(targets.qmf_url, operation["method"], operation["arguments"])
+            Container(handler).run()
+            return handler._reply_received and handler.exception is None
+        return call
+
+    if transport == "mgmt":
+        from mgmt_handlers import AmqpManager
+
+        def call(name):
+            handler = AmqpManager(targets.mgmt_url, "CREATE", "org.apache.qpid.broker:exchange", name,
+                                  {"exchangeType": "topic", "durable": False, "autoDelete": False})
+            Container(handler).run()
+            return handler.status_code is not None and 200 <= handler.status_code < 300
+        return call
+
+    if transport == "amqp091":
+        import create_exchange_pika
+        import bind_queue_pike
+        for module in (create_exchange_pika, bind_queue_pike):
+            module.BROKER_HOST = targets.amqp091_host
+            module.BROKER_PORT = targets.amqp091_port
+
+        def call(name):
+            try:
+                if kind == "bind":
+                    bind_queue_pike.bind_queue_to_exchange(BENCH_BIND_EXCHANGE, BENCH_QUEUE, name)
+                else:
+                    create_exchange_pika.create_exchange(name, "topic")
+            except SystemExit:
+                return False
+            return True
+        return call
+
+    if transport == "rest":
+        import rest_create_exchange
+
+        def call(name):
+            return rest_create_exchange.create_exchange_rest(name, "topic", {"durable": False},
+                                                             base_url=targets.rest_url)
+        return call
+
+    raise ValueError(f"unknown transport '{transport}'")
+
+def _run_per_call(call, names, concurrency):
+    def timed(name):
+        start = time.perf_counter()
+        ok = call(name)
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(timed, names))
+
+def _run_pipelined(kind, names, concurrency, targets):
+    from mgmt_async import AsyncManagement, ManagementError
+
+    async def run():
+        async with AsyncManagement(targets.qmf_url) as mgmt:
+            if kind == "bind":
+                try:
+                    await mgmt.qmf_method("create", operations.queue_create(BENCH_QUEUE)["arguments"])
+                except ManagementError:
+                    pass  # already created for an earlier level
+            pending = iter(names)
+            results = []
+
+            async def worker():
+                for name in pending:
+                    operation = _operation(kind, name)
+                    start = time.perf_counter()
+                    try:
+                        await mgmt.qmf_method(operation["method"], operation["arguments"])
+                        ok = True
+                    except ManagementError:
+                        ok = False
+                    results.append((time.perf_counter() - start, ok))
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return results
+
+    return asyncio.run(run())
+
+def _prepare_bind_queue(transport, targets):
+    """
+    Bind benchmarks need a queue; create it through the transport under
+    test. The create fails harmlessly if an earlier level made the queue.
+    """
+    if transport == "qmf":
+        from proton.reactor import Container
+        from mgmt_handlers import QmfManager
+        Container(QmfManager(targets.qmf_url, "create", operations.queue_create(BENCH_QUEUE)["arguments"])).run()
+    elif transport == "amqp091":
+        import pika
+        params = pika.ConnectionParameters(host=targets.amqp091_host, port=targets.amqp091_port)
+        connection = pika.BlockingConnection(params)
+        connection.channel().queue_declare(queue=BENCH_QUEUE)
+        connection.close()
+
+def run_level(transport, kind, count, concurrency, targets, run_id):
+    names = [f"bench-{run_id}-{transport}-{concurrency}-{i}" for i in range(count)]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if transport == "qmf-pipelined":
+            start = time.perf_counter()
+            results = _run_pipelined(kind, names, concurrency, targets)
+        else:
+            call = _per_call_function(transport, kind, targets)
+            if kind == "bind":
+                _prepare_bind_queue(transport, targets)
+            start = time.perf_counter()
+            results = _run_per_call(call, names, concurrency)
+        duration = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok in results)
+    return {
+        "transport": transport,
+        "operation": kind,
+        "concurrency": concurrency,
+        "count": count,
+        "failed": sum(1 for latency, ok in results if not ok),
+        "ops_per_sec": count / duration if duration > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000
+    }
+
+def compare(results, baseline, tolerance):
+    """Returns the descriptions of results whose ops/sec fell more than 'tolerance' below the baseline."""
+    previous = {(r["transport"], r["operation"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["transport"], result["operation"], result["concurrency"]))
+        if old and result["ops_per_sec"] < old["ops_per_sec"] * (1.0 - tolerance):
+            regressions.append(
+                f"{result['transport']} {result['operation']} c={result['concurrency']}: "
+                f"{result['ops_per_sec']:.0f} ops/sec, baseline {old['ops_per_sec']:.0f}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark create/bind latency and throughput across management transports.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--transport", action="append", choices=TRANSPORTS,
+                        help="Transport to run (repeatable, default: all).")
+    parser.add_argument("--operation", choices=["create", "bind"], default="create",
+                        help="Operation to benchmark (default: create).")
+    parser.add_argument("--count", type=int, default=200, help="Operations per run (default: 200).")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma separated concurrency levels (default: 1,4,16).")
+    parser.add_argument("--local", action="store_true", help="Run against stub_broker.py on local ports.")
+    parser.add_argument("--qmf-url", default="localhost:5671", help="QMF broker URL.")
+    parser.add_argument("--mgmt-url", default="localhost:5672", help="$management broker URL.")
+    parser.add_argument("--amqp091-host", default="localhost", help="AMQP 0-9-1 broker host.")
+    parser.add_argument("--amqp091-port", type=int, default=5672, help="AMQP 0-9-1 broker port.")
+    parser.add_argument("--rest-url", default="http://localhost:8080", help="REST management URL.")
+    parser.add_argument("--save", metavar="<file>", help="Write the results as JSON.")
+    parser.add_argument("--baseline", metavar="<file>", help="Compare ops/sec with an earlier --save file.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed ops/sec drop against the baseline (default: 0.2 = 20%%).")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    targets = Targets(opts.qmf_url, opts.mgmt_url, opts.amqp091_host, opts.amqp091_port, opts.rest_url)
+    transports = opts.transport or TRANSPORTS
+    levels = [int(level) for level in opts.concurrency.split(",")]
+
+    if opts.local:
+        from stub_broker import BrokerModel, start_amqp_stub, start_http_stub
+        model = BrokerModel()
+        amqp_url = f"localhost:{free_port()}"
+        start_amqp_stub(amqp_url, model)
+        http_server = start_http_stub(free_port(), model)
+        targets.qmf_url = targets.mgmt_url = amqp_url
+        targets.rest_url = f"http://localhost:{http_server.server_address[1]}"
+        time.sleep(0.2)
+        if "amqp091" in transports:
+            print("[INFO] Skipping amqp091: there is no local AMQP 0-9-1 stub.")
+            transports = [transport for transport in transports if transport != "amqp091"]
+
+    run_id = int(time.time())
+    results = []
+    print(f"{'transport':<15} {'op':<7} {'conc':>5} {'ops/sec':>10} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}")
+    for transport in transports:
+        if opts.operation == "bind" and transport not in BIND_TRANSPORTS:
+            print(f"[INFO] Skipping {transport}: it has no bind operation.")
+            continue
+        for level in levels:
+            result = run_level(transport, opts.operation, opts.count, level, targets, run_id)
+            results.append(result)
+            print(f"{transport:<15} {opts.operation:<7} {level:>5} {result['ops_per_sec']:>10.1f} "
+                  f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['failed']:>7}")
+
+    if opts.save:
+        with open(opts.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            regressions = compare(results, json.load(f), opts.tolerance)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions:
+            sys.exit(1)
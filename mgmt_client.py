@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+# Thin client for mgmt_daemon.py. It only needs the standard library, so the
+# command line tools can hand their request to a running daemon without
+# setting up an AMQP connection of their own.
+
+import os
+import json
+import socket
+
+DEFAULT_SOCKET = "/tmp/qpid-mgmt.sock"
+SOCKET_ENV = "QPID_MGMT_SOCKET"
+
+def daemon_socket():
+    """Returns the daemon socket path from QPID_MGMT_SOCKET, or None when it is not set."""
+    return os.environ.get(SOCKET_ENV) or None
+
+def call_daemon(socket_path, request):
+    """Sends one request to the daemon and returns its response as a dict."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        return {"ok": False, "error": "daemon closed the connection without replying"}
+    return json.loads(line)
+
+def qmf_call(socket_path, broker_url, method_name, arguments):
+    return call_daemon(socket_path, {
+        "broker": broker_url,
+        "protocol": "qmf",
+        "method": method_name,
+        "arguments": arguments
+    })
+
+def management_call(socket_path, broker_url, operation, entity_type, entity_name, properties=None):
+    return call_daemon(socket_path, {
+        "broker": broker_url,
+        "protocol": "management",
+        "operation": operation,
+        "type": entity_type,
+        "name": entity_name,
+        "properties": properties or {}
+    })
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import signal
+import argparse
+import threading
+import socketserver
+
+from mgmt_session import (ReactorThread, qmf_method_request, management_request,
+                          QMF_ADDRESS, MANAGEMENT_ADDRESS, DEFAULT_TIMEOUT)
+from mgmt_client import DEFAULT_SOCKET
+from profiling import add_profile_arguments, start_profiling
+
+def _plain(value):
+    """Makes proton reply values (symbols, binary, described types) JSON friendly."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return str(value)
+
+def _to_response(request, reply, error):
+    if error:
+        return {"ok": False, "error": error}
+
+    properties = dict(reply.properties or {})
+    if request.get("protocol", "qmf") == "qmf":
+        ok = properties.get('qmf.opcode') != '_exception'
+    else:
+        status_code = properties.get('statusCode', 200)
+        ok = 200 <= status_code < 300
+    return {"ok": ok, "properties": properties, "body": reply.body}
+
+def _build_request(request):
+    protocol = request.get("protocol", "qmf")
+    if protocol == "qmf":
+        return QMF_ADDRESS, qmf_method_request(request["method"], request["arguments"])
+    if protocol == "management":
+        return MANAGEMENT_ADDRESS, management_request(
+            request["operation"], request["type"], request["name"], request.get("properties"))
+    raise ValueError(f"unknown protocol '{protocol}'")
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Reads one JSON request per line and writes one JSON response per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self._call(line)
+            self.wfile.write(json.dumps(response, default=_plain).encode('utf-8') + b"\n")
+            self.wfile.flush()
+
+    def _call(self, line):
+        try:
+            request = json.loads(line)
+            address, message = _build_request(request)
+            broker_url = request["broker"]
+        except (ValueError, KeyError) as e:
+            return {"ok": False, "error": f"bad request: {e}"}
+
+        done = threading.Event()
+        result = {}
+
+        def on_reply(reply, error):
+            # Runs on the reactor thread.
+            result.update(_to_response(request, reply, error))
+            done.set()
+
+        reactor = self.server.reactor
+        reactor.submit(broker_url, address, message, on_reply)
+        # The reactor times out a request only once it is sent; this also
+        # covers one still queued behind a connection that never opens.
+        if not done.wait(reactor.timeout):
+            return {"ok": False, "error": f"no reply from {broker_url} within {reactor.timeout:g} seconds"}
+        return result
+
+
+def _stop_on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
+class ManagementServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, reactor):
+        self.reactor = reactor
+        super(ManagementServer, self).__init__(socket_path, RequestHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Keep warm management connections to Qpid brokers and serve requests over a Unix socket.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Set QPID_MGMT_SOCKET to the socket path to make create_exchange.py,\n"
+            "bind_queue.py and create_exchange_mgmt.py send their request through\n"
+            "this daemon instead of opening their own connection."
+        )
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Unix socket path (default: {DEFAULT_SOCKET}).")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Seconds to wait for a broker reply (default: {DEFAULT_TIMEOUT:.0f}).")
+    parser.add_argument("--qmf-broker", action="append", default=[], metavar="<url>",
+                        help="Connect to this broker's QMF address at startup (repeatable).")
+    parser.add_argument("--management-broker", action="append", default=[], metavar="<url>",
+                        help="Connect to this broker's $management address at startup (repeatable).")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    if os.path.exists(opts.socket):
+        os.unlink(opts.socket)
+
+    reactor = ReactorThread(opts.timeout).start()
+    for broker_url in opts.qmf_broker:
+        reactor.connect(broker_url, QMF_ADDRESS)
+    for broker_url in opts.management_broker:
+        reactor.connect(broker_url, MANAGEMENT_ADDRESS)
+
+    server = ManagementServer(opts.socket, reactor)
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    print(f"Listening on {opts.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        os.unlink(opts.socket)
+        reactor.stop()
+    sys.exit(0)
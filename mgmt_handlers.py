@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+
+# The proton handlers behind create_exchange.py, bind_queue.py and
+# create_exchange_mgmt.py. They live apart from the scripts, which import
+# them only once they know the request is not going to mgmt_daemon.py, so
+# a thin client exits without loading proton.
+
+import json
+import uuid
+from proton import Message
+from proton.handlers import MessagingHandler
+
+from mgmt_metrics import PhaseTimer, REGISTRY, OK, ERROR
+
+MANAGEMENT_NODE_ADDRESS = "qmf.default.direct/broker"
+# AMQP 1.0 management address
+MANAGEMENT_ADDRESS = "$management"
+DEFAULT_WINDOW = 100
+DEFAULT_TIMEOUT = 30.0
+
+
+class QmfManager(MessagingHandler):
+    def __init__(self, broker_url, method_name, method_arguments, registry=REGISTRY):
+        super(QmfManager, self).__init__()
+        self.broker_url = broker_url
+        self.method_name = method_name
+        self.method_arguments = method_arguments
+        self._sender = None
+        self._receiver = None
+        self._request_sent = False
+        self._connection = None
+        self.registry = registry
+        self.timer = PhaseTimer()
+        self._reply_received = False
+        self.exception = None
+
+    def on_start(self, event):
+        self.timer.mark("start")
+        self._connection = event.container.connect(self.broker_url)
+        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
+        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
+
+    def on_connection_opened(self, event):
+        self.timer.mark("connected")
+
+    def on_link_opened(self, event):
+        if event.receiver == self._receiver and not self._request_sent:
+            self.timer.mark("reply_address")
+            self._send_method_request()
+            self._request_sent = True
+
+    def _send_method_request(self):
+        reply_to_address = self._receiver.remote_source.address
+
+        request_props = {'qmf.opcode': '_method'}
+        
+        request_body = {
+            '_method_name': self.method_name,
+            '_arguments': self.method_arguments
+        }
+
+        msg = Message(
+            reply_to=reply_to_address,
+            properties=request_props,
+            body=request_body
+        )
+
+        print(f"Sending method request '{self.method_name}'...")
+        self._sender.send(msg)
+        self.timer.mark("sent")
+
+    def on_message(self, event):
+        self.timer.mark("replied")
+        self._reply_received = True
+        reply_props = event.message.properties
+        failed = bool(reply_props and reply_props.get('qmf.opcode') == '_exception')
+        self.registry.record(self.timer, "qmf", self.method_name, ERROR if failed else OK)
+        if failed:
+            self.exception = event.message.body
+            print("\n[ERROR] Broker returned an exception.")
+            print(f"Details: {event.message.body}")
+        else:
+            print("\n[SUCCESS] Broker response received. Operation should be complete.")
+        self._connection.close()
+    
+    def on_disconnected(self, event):
+        self.registry.record(self.timer, "qmf", self.method_name, ERROR)
+        if not self._reply_received:
+            print("\n[ERROR] Connection closed by broker before a reply was received.")
+            print("[HINT] This often means a permission error or an invalid property.")
+            print("[HINT] Check broker logs for details (journalctl -u qpidd -f).")
+
+
+class QmfBindManager(MessagingHandler):
+    def __init__(self, broker_url, bind_arguments, registry=REGISTRY):
+        super(QmfBindManager, self).__init__()
+        self.broker_url = broker_url
+        self.bind_arguments = bind_arguments
+        self._sender = None
+        self._receiver = None
+        self._request_sent = False
+        self._connection = None
+        self.registry = registry
+        self.timer = PhaseTimer()
+
+    def on_start(self, event):
+        self.timer.mark("start")
+        self._connection = event.container.connect(self.broker_url)
+        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
+        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
+
+    def on_connection_opened(self, event):
+        self.timer.mark("connected")
+
+    def on_link_opened(self, event):
+        if event.receiver == self._receiver and not self._request_sent:
+            self.timer.mark("reply_address")
+            self._send_bind_request()
+            self._request_sent = True
+
+    def _send_bind_request(self):
+        reply_to_address = self._receiver.remote_source.address
+
+        request_props = {
+            'qmf.opcode': '_method',
+        }
+        
+        request_body = {
+            '_method_name': 'bind',
+            '_arguments': self.bind_arguments
+        }
+
+        msg = Message(
+            reply_to=reply_to_address,
+            properties=request_props,
+            body=request_body
+        )
+
+        print(f"Sending request to bind queue '{self.bind_arguments['queue']}' to exchange '{self.bind_arguments['exchange']}' with key '{self.bind_arguments['key']}'...")
+        self._sender.send(msg)
+        self.timer.mark("sent")
+
+    def on_message(self, event):
+        self.timer.mark("replied")
+        reply_props = event.message.properties
+        failed = bool(reply_props and reply_props.get('qmf.opcode') == '_exception')
+        self.registry.record(self.timer, "qmf", "bind", ERROR if failed else OK)
+        if failed:
+            print("\n[ERROR] Broker returned an exception. Bind operation failed.")
+            print(f"Details: {event.message.body}")
+            print("\nHint: Make sure both the exchange and the queue already exist.")
+        else:
+            print("\n[SUCCESS] Broker response received. Bind operation should be complete.")
+        self._connection.close()
+
+    def on_transport_error(self, event):
+        self.registry.record(self.timer, "qmf", "bind", ERROR)
+        print(f"[ERROR] Transport error: {event.transport.condition}")
+        if self._connection:
+            self._connection.close()
+
+
+class _Timeout(object):
+    def __init__(self, manager, correlation_id):
+        self.manager = manager
+        self.correlation_id = correlation_id
+
+    def on_timer_task(self, event):
+        self.manager._fail(self.correlation_id, "timed out waiting for a reply")
+
+
+class AmqpManager(MessagingHandler):
+    """
+    Sends '$management' requests over one connection. The classic form sends
+    a single request; pass 'requests' instead, an iterable of (operation,
+    entity_type, entity_name, properties) tuples, to send many. Every
+    request gets its own correlation_id, at most 'window' are in flight
+    (the reply link is given the same credit), and a request that is not
+    answered within 'timeout' seconds fails on its own.
+
+    self.results holds (request, status_code, status_description) in reply
+    order; status_code is None when no reply came. self.status_code is the
+    status of the most recent reply.
+    """
+
+    def __init__(self, broker_url, operation=None, entity_type=None, entity_name=None, properties=None,
+                 registry=REGISTRY, requests=None, window=DEFAULT_WINDOW, timeout=DEFAULT_TIMEOUT, quiet=False):
+        super(AmqpManager, self).__init__(prefetch=window)
+        self.broker_url = broker_url
+        if requests is None:
+            requests = [(operation, entity_type, entity_name, properties)]
+        self.requests = iter(requests)
+        self.window = window
+        self.timeout = timeout
+        self.quiet = quiet
+        self._sender = None
+        self._receiver = None
+        self._connection = None
+        self._container = None
+        self._reply_to = None
+        self._prefix = uuid.uuid4().hex[:8]
+        self._next_id = 0
+        self._in_flight = {}
+        self._exhausted = False
+        self.status_code = None
+        self.results = []
+        self.registry = registry
+        self.timer = PhaseTimer()
+
+    def on_start(self, event):
+        self.timer.mark("start")
+        self._container = event.container
+        self._connection = event.container.connect(self.broker_url, handler=self)
+        self._sender = event.container.create_sender(self._connection, MANAGEMENT_ADDRESS)
+        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
+
+    def on_connection_opened(self, event):
+        self.timer.mark("connected")
+
+    def on_link_opened(self, event):
+        if event.receiver == self._receiver and self._reply_to is None:
+            self.timer.mark("reply_address")
+            self._reply_to = self._receiver.remote_source.address
+            self._send_pending()
+
+    def on_sendable(self, event):
+        self._send_pending()
+
+    def _send_pending(self):
+        if self._reply_to is None:
+            return
+        while not self._exhausted and len(self._in_flight) < self.window and self._sender.credit > 0:
+            request = next(self.requests, None)
+            if request is None:
+                self._exhausted = True
+                break
+            self._send_management_request(request)
+        self._close_if_done()
+
+    def _send_management_request(self, request):
+        operation, entity_type, entity_name, properties = request
+        timer = PhaseTimer()
+        if self._next_id == 0:
+            # The first request waited for the connection, so its timer
+            # carries the connection marks; connect and attach are thus
+            # recorded once per connection, not once per request.
+            timer.marks.update(self.timer.marks)
+        else:
+            # Later requests are timed from when they get a window slot.
+            timer.mark("start")
+            timer.mark("reply_address")
+        correlation_id = f"{self._prefix}-{self._next_id}"
+        self._next_id += 1
+
+        # AMQP 1.0 management message format
+        request_body = {
+            "operation": operation,
+            "type": entity_type,
+            "name": entity_name
+        }
+        
+        # Add properties if provided
+        if properties:
+            request_body.update(properties)
+
+        msg = Message(
+            body=request_body,
+            reply_to=self._reply_to,
+            correlation_id=correlation_id,
+            properties={
+                "operation": operation,
+                "type": entity_type,
+                "name": entity_name
+            }
+        )
+
+        if not self.quiet:
+            print(f"Sending {operation} request for {entity_type} '{entity_name}'...")
+            print(f"Request body: {json.dumps(request_body, indent=2)}")
+
+        timeout = self._container.schedule(self.timeout, _Timeout(self, correlation_id))
+        self._in_flight[correlation_id] = (request, timer, timeout)
+        self._sender.send(msg)
+        timer.mark("sent")
+
+    def on_message(self, event):
+        reply = event.message
+        entry = self._in_flight.pop(reply.correlation_id, None)
+        if entry is None:
+            print(f"[WARNING] Ignoring reply with unknown correlation_id: {reply.correlation_id}")
+            self._send_pending()
+            return
+        request, timer, timeout = entry
+        timeout.cancel()
+        operation, entity_type, entity_name, properties = request
+        timer.mark("replied")
+        
+        if not self.quiet:
+            print(f"\nReceived reply with correlation_id: {reply.correlation_id}")
+        
+        if hasattr(reply, 'properties') and reply.properties:
+            status_code = reply.properties.get('statusCode', 200)
+            status_description = reply.properties.get('statusDescription', 'OK')
+        else:
+            status_code, status_description = 200, 'OK'
+        self.registry.record(timer, "mgmt", operation, OK if 200 <= status_code < 300 else ERROR)
+        self.status_code = status_code
+        self.results.append((request, status_code, status_description))
+
+        if 200 <= status_code < 300:
+            if not self.quiet:
+                print(f"[SUCCESS] {entity_type.capitalize()} '{entity_name}' {operation}d successfully")
+                print(f"Status: {status_code} - {status_description}")
+        else:
+            print(f"[ERROR] {operation} {entity_type} '{entity_name}' failed with status {status_code}: "
+                  f"{status_description}")
+        
+        if reply.body and not self.quiet:
+            print(f"Response body: {reply.body}")
+            
+        self._send_pending()
+
+    def _fail(self, correlation_id, reason):
+        entry = self._in_flight.pop(correlation_id, None)
+        if entry is None:
+            return
+        request, timer, timeout = entry
+        timeout.cancel()
+        operation, entity_type, entity_name, properties = request
+        self.registry.record(timer, "mgmt", operation, ERROR)
+        self.results.append((request, None, reason))
+        print(f"[ERROR] {operation} {entity_type} '{entity_name}': {reason}")
+        # A late reply is ignored; keep the window moving.
+        self._send_pending()
+
+    def _close_if_done(self):
+        if self._exhausted and not self._in_flight and self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def _abandon_in_flight(self, reason):
+        for correlation_id in list(self._in_flight):
+            self._fail(correlation_id, reason)
+
+    def on_transport_error(self, event):
+        print(f"[ERROR] Transport error: {event.transport.condition}")
+        self._exhausted = True
+        self._abandon_in_flight("no reply received before the transport failed")
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def on_disconnected(self, event):
+        self._exhausted = True
+        self._abandon_in_flight("no reply received before the connection closed")
+        if not self.quiet:
+            print(f"Disconnected from broker")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+# Per-phase latency for management calls. Handlers mark points in the
+# MessagingHandler lifecycle on a PhaseTimer; the phases between them are
+# added to histograms in a MetricsRegistry, which can be exported as JSON
+# or Prometheus text.
+#
+# Marks and the phases derived from them:
+#
+#   start             on_start, before container.connect()
+#   connected         on_connection_opened (TCP connect, SASL and AMQP open)
+#   reply_address     on_link_opened for the dynamic reply receiver
+#   sent              request handed to the sender
+#   replied           on_message with the reply
+#
+#   connect  = connected - start
+#   attach   = reply_address - connected   (link attach + dynamic address)
+#   send     = sent - reply_address        (message build and encode)
+#   broker   = replied - sent              (broker processing + reply delivery)
+#   total    = replied - start
+#
+# A handler that sends many requests over one connection (AmqpManager in
+# bulk mode) records connect and attach once, with its first request; the
+# later requests are timed from when each one is sent.
+#
+# Every call is recorded with a status label, "ok" or "error", so failed
+# calls (refusals, timeouts, lost connections) do not skew the latencies
+# of the successful ones.
+#
+# Setting QPID_MGMT_METRICS_JSON and/or QPID_MGMT_METRICS_PROM makes the
+# command line tools write their timings there. The JSON file accumulates
+# across runs; the Prometheus file is rewritten from that aggregate, which
+# suits the node_exporter textfile collector. With only the Prometheus file
+# set, the aggregate is kept in "<prom file>.state.json" next to it, so its
+# counters keep growing from run to run.
+
+import os
+import json
+import time
+import threading
+
+METRICS_JSON_ENV = "QPID_MGMT_METRICS_JSON"
+METRICS_PROM_ENV = "QPID_MGMT_METRICS_PROM"
+METRIC_NAME = "qpid_mgmt_phase_seconds"
+OK = "ok"
+ERROR = "error"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = (
+    ("connect", "start", "connected"),
+    ("attach", "connected", "reply_address"),
+    ("send", "reply_address", "sent"),
+    ("broker", "sent", "replied"),
+    ("total", "start", "replied")
+)
+
+
+class PhaseTimer(object):
+    """Timestamps of the lifecycle marks of one management call."""
+
+    def __init__(self):
+        self.marks = {}
+        self.recorded = False
+
+    def mark(self, name):
+        self.marks.setdefault(name, time.perf_counter())
+
+    def phases(self):
+        """Returns {phase: seconds} for every phase whose two marks were reached."""
+        return {phase: self.marks[end] - self.marks[begin]
+                for phase, begin, end in PHASES
+                if begin in self.marks and end in self.marks}
+
+
+class Histogram(object):
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def merge(self, data):
+        self.count += data["count"]
+        self.sum += data["sum"]
+        for index, bound in enumerate(BUCKETS):
+            self.counts[index] += data["buckets"].get(str(bound), 0)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(bound): count for bound, count in zip(BUCKETS, self.counts)}
+        }
+
+
+class MetricsRegistry(object):
+    """Histograms keyed by (handler, operation, phase, status)."""
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, handler, operation, phase, status):
+        key = (handler, operation, phase, status)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        return self.histograms[key]
+
+    def record(self, timer, handler, operation, status=OK):
+        """Adds the phases of a finished call; later calls for the same timer are ignored."""
+        with self._lock:
+            if timer.recorded:
+                return
+            timer.recorded = True
+            for phase, seconds in timer.phases().items():
+                self._histogram(handler, operation, phase, status).observe(seconds)
+
+    def to_json(self):
+        return [{"handler": handler, "operation": operation, "phase": phase, "status": status,
+                 **histogram.to_dict()}
+                for (handler, operation, phase, status), histogram in sorted(self.histograms.items())]
+
+    def merge_json(self, entries):
+        for entry in entries:
+            # Files written before the status label hold successful calls only.
+            self._histogram(entry["handler"], entry["operation"], entry["phase"],
+                            entry.get("status", OK)).merge(entry)
+
+    def to_prometheus(self):
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each phase of a broker management call.",
+            f"# TYPE {METRIC_NAME} histogram"
+        ]
+        for (handler, operation, phase, status), histogram in sorted(self.histograms.items()):
+            labels = f'handler="{handler}",operation="{operation}",phase="{phase}",status="{status}"'
+            for bound, count in zip(BUCKETS, histogram.counts):
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+def _write(path, text):
+    # Write then rename so a scraper never reads a half written file.
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+def _lock_exclusive(lock):
+    try:
+        import fcntl
+    except ImportError:
+        return  # not available on Windows; concurrent runs there are not serialized
+    fcntl.flock(lock, fcntl.LOCK_EX)
+
+def export_from_env(registry=REGISTRY):
+    """Writes the registry to the files named by QPID_MGMT_METRICS_JSON / QPID_MGMT_METRICS_PROM."""
+    json_path = os.environ.get(METRICS_JSON_ENV)
+    prom_path = os.environ.get(METRICS_PROM_ENV)
+    if not json_path and not prom_path:
+        return
+    # Prometheus counters must not go back down, so the aggregate is always kept.
+    state_path = json_path or f"{prom_path}.state.json"
+
+    # Many tool runs may finish at once; serialize the read-merge-write.
+    with open(f"{state_path}.lock", "w") as lock:
+        _lock_exclusive(lock)
+        aggregate = MetricsRegistry()
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                aggregate.merge_json(json.load(f))
+        aggregate.merge_json(registry.to_json())
+
+        _write(state_path, json.dumps(aggregate.to_json(), indent=2))
+        if prom_path:
+            _write(prom_path, aggregate.to_prometheus())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+# Long-lived management sessions driven by a proton reactor running on a
+# background thread. Other threads submit request messages; each session
+# keeps one warm connection, one sender to the management address and one
+# dynamic reply receiver per broker.
+
+import threading
+from proton import Handler, Message
+from proton.handlers import MessagingHandler
+from proton.reactor import Container, EventInjector, ApplicationEvent
+
+QMF_ADDRESS = "qmf.default.direct/broker"
+MANAGEMENT_ADDRESS = "$management"
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_PREFETCH = 1000
+
+def qmf_method_request(method_name, arguments):
+    """Builds a QMF '_method' request, as QmfManager does."""
+    return Message(
+        properties={'qmf.opcode': '_method'},
+        body={
+            '_method_name': method_name,
+            '_arguments': arguments
+        }
+    )
+
+def management_request(operation, entity_type, entity_name, properties=None):
+    """Builds an AMQP 1.0 '$management' request, as AmqpManager does."""
+    request_body = {
+        "operation": operation,
+        "type": entity_type,
+        "name": entity_name
+    }
+    if properties:
+        request_body.update(properties)
+    return Message(
+        body=request_body,
+        properties={
+            "operation": operation,
+            "type": entity_type,
+            "name": entity_name
+        }
+    )
+
+
+class _Timeout(object):
+    def __init__(self, session, correlation_id):
+        self.session = session
+        self.correlation_id = correlation_id
+
+    def on_timer_task(self, event):
+        self.session._fail(self.correlation_id, "timed out waiting for a reply")
+
+
+class ManagementSession(MessagingHandler):
+    """
+    A warm connection to one management address on one broker. Only use it
+    from the reactor thread; other threads go through ReactorThread.submit().
+    """
+
+    def __init__(self, broker_url, address, timeout=DEFAULT_TIMEOUT, on_closed=None):
+        super(ManagementSession, self).__init__(prefetch=DEFAULT_PREFETCH)
+        self.broker_url = broker_url
+        self.address = address
+        self.timeout = timeout
+        self.on_closed = on_closed
+        self.closed = False
+        self._container = None
+        self._connection = None
+        self._sender = None
+        self._receiver = None
+        self._reply_to = None
+        self._queued = []
+        self._in_flight = {}
+        self._next_id = 0
+
+    def open(self, container):
+        self._container = container
+        self._connection = container.connect(self.broker_url, handler=self, reconnect=False)
+        self._sender = container.create_sender(self._connection, self.address)
+        self._receiver = container.create_receiver(self._connection, None, dynamic=True)
+
+    def request(self, message, callback):
+        """Sends 'message' and later calls callback(reply, error) with exactly one of them set."""
+        if self.closed:
+            callback(None, "connection to broker is closed")
+            return
+        if self._reply_to is None:
+            self._queued.append((message, callback))
+            return
+
+        correlation_id = str(self._next_id)
+        self._next_id += 1
+        message.correlation_id = correlation_id
+        message.reply_to = self._reply_to
+        timer = self._container.schedule(self.timeout, _Timeout(self, correlation_id))
+        self._in_flight[correlation_id] = (callback, timer)
+        self._sender.send(message)
+
+    def on_link_opened(self, event):
+        if event.receiver == self._receiver and self._reply_to is None:
+            self._reply_to = self._receiver.remote_source.address
+            queued, self._queued = self._queued, []
+            for message, callback in queued:
+                self.request(message, callback)
+
+    def on_message(self, event):
+        entry = self._in_flight.pop(event.message.correlation_id, None)
+        if entry is None:
+            return
+        callback, timer = entry
+        timer.cancel()
+        callback(event.message, None)
+
+    def _fail(self, correlation_id, error):
+        entry = self._in_flight.pop(correlation_id, None)
+        if entry is not None:
+            entry[0](None, error)
+
+    def _fail_all(self, error):
+        if self.closed:
+            return
+        self.closed = True
+        for correlation_id in list(self._in_flight):
+            callback, timer = self._in_flight.pop(correlation_id)
+            timer.cancel()
+            callback(None, error)
+        queued, self._queued = self._queued, []
+        for message, callback in queued:
+            callback(None, error)
+        if self.on_closed:
+            self.on_closed(self)
+
+    def close(self):
+        if self._connection and not self.closed:
+            self._fail_all("session closed")
+            self._connection.close()
+
+    def on_transport_error(self, event):
+        self._fail_all(f"transport error: {event.transport.condition}")
+
+    def on_link_error(self, event):
+        # A refused sender or reply link leaves nothing to send requests on.
+        self._fail_all(f"link error: {event.link.remote_condition}")
+        event.connection.close()
+
+    def on_connection_error(self, event):
+        self._fail_all(f"connection error: {event.connection.remote_condition}")
+        event.connection.close()
+
+    def on_disconnected(self, event):
+        if not self.closed:
+            self._fail_all("connection to broker closed")
+
+
+class _Dispatcher(Handler):
+    def on_management_call(self, event):
+        event.subject()
+
+
+class ReactorThread(object):
+    """
+    Runs a proton Container on a daemon thread and keeps one
+    ManagementSession per (broker_url, address). submit() may be called
+    from any thread; the callback runs on the reactor thread.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.container = Container(_Dispatcher())
+        self._injector = EventInjector()
+        self.container.selectable(self._injector)
+        self._sessions = {}
+        self._thread = threading.Thread(target=self.container.run, name="proton-reactor", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def call_soon(self, function):
+        """Runs function() on the reactor thread."""
+        self._injector.trigger(ApplicationEvent("management_call", subject=function))
+
+    def submit(self, broker_url, address, message, callback):
+        self.call_soon(lambda: self._session(broker_url, address).request(message, callback))
+
+    def connect(self, broker_url, address):
+        """Opens a session ahead of the first request."""
+        self.call_soon(lambda: self._session(broker_url, address))
+
+    def _session(self, broker_url, address):
+        key = (broker_url, address)
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            session = ManagementSession(broker_url, address, self.timeout, on_closed=self._forget)
+            session.open(self.container)
+            self._sessions[key] = session
+        return session
+
+    def _forget(self, session):
+        key = (session.broker_url, session.address)
+        if self._sessions.get(key) is session:
+            del self._sessions[key]
+
+    def stop(self):
+        def close_all():
+            for session in list(self._sessions.values()):
+                session.close()
+            self._injector.close()
+        self.call_soon(close_all)
+        self._thread.join()
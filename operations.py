@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+# Helpers for describing QMF management operations (create/bind/delete)
+# without importing proton, so they can be shared by the bulk tools.
+
+import sys
+import json
+import zlib
+import shlex
+
+EXCHANGE_OPTIONS = {"--durable", "--alternate-exchange"}
+MANAGEMENT_TYPES = {
+    "exchange": "org.apache.qpid.broker:exchange",
+    "queue": "org.apache.qpid.broker:queue"
+}
+# QMF property names to the names the $management node uses.
+MANAGEMENT_PROPERTIES = {
+    "exchange-type": "exchangeType",
+    "durable": "durable",
+    "auto-delete": "autoDelete",
+    "alternate-exchange": "alternateExchange"
+}
+QUEUE_OPTIONS = {"--durable", "--auto-delete", "--alternate-exchange"}
+
+
+def exchange_create(name, exchange_type, durable=False, alternate_exchange=None):
+    """Builds the 'create' operation for an exchange, as create_exchange.py does."""
+    properties = {"exchange-type": exchange_type}
+    if durable:
+        properties["durable"] = True
+    if alternate_exchange:
+        properties["alternate-exchange"] = alternate_exchange
+    return {
+        "method": "create",
+        "arguments": {
+            "type": "exchange",
+            "name": name,
+            "properties": properties,
+            "strict": True
+        }
+    }
+
+
+def queue_create(name, durable=False, auto_delete=False, alternate_exchange=None):
+    """Builds the 'create' operation for a queue."""
+    properties = {}
+    if durable:
+        properties["durable"] = True
+    if auto_delete:
+        properties["auto-delete"] = True
+    if alternate_exchange:
+        properties["alternate-exchange"] = alternate_exchange
+    return {
+        "method": "create",
+        "arguments": {
+            "type": "queue",
+            "name": name,
+            "properties": properties,
+            "strict": True
+        }
+    }
+
+
+def bind(exchange, queue, key):
+    """Builds the 'bind' operation, as bind_queue.py does."""
+    return {
+        "method": "bind",
+        "arguments": {
+            "exchange": exchange,
+            "queue": queue,
+            "key": key
+        }
+    }
+
+
+def delete(object_type, name):
+    """Builds the 'delete' operation for an exchange or queue."""
+    return {
+        "method": "delete",
+        "arguments": {
+            "type": object_type,
+            "name": name
+        }
+    }
+
+
+def describe_operation(operation):
+    """Returns a short human readable description of an operation."""
+    method = operation["method"]
+    arguments = operation["arguments"]
+    if method == "bind":
+        return f"bind queue '{arguments['queue']}' to exchange '{arguments['exchange']}' with key '{arguments['key']}'"
+    if "type" in arguments and "name" in arguments:
+        return f"{method} {arguments['type']} '{arguments['name']}'"
+    return f"{method} {arguments}"
+
+
+def already_applied(operation, error_text):
+    """
+    True if the broker refused an operation only because its effect is
+    already in place: a create of an object that exists, or a delete of
+    one that does not. qpidd refuses both whatever 'strict' is set to.
+    """
+    error_text = str(error_text or "")
+    if operation["method"] == "create":
+        return "already exists" in error_text
+    if operation["method"] == "delete":
+        return "No such" in error_text or "not-found" in error_text
+    return False
+
+
+def to_management_request(operation):
+    """
+    Converts a create or delete operation to the (operation, entity_type,
+    entity_name, properties) of an AMQP 1.0 '$management' request. Binds
+    have no '$management' equivalent and raise ValueError.
+    """
+    method = operation["method"]
+    arguments = operation["arguments"]
+    if method not in ("create", "delete") or arguments.get("type") not in MANAGEMENT_TYPES:
+        raise ValueError(f"'{describe_operation(operation)}' is not supported over $management")
+    properties = {MANAGEMENT_PROPERTIES[key]: value
+                  for key, value in (arguments.get("properties") or {}).items() if key in MANAGEMENT_PROPERTIES}
+    return (method.upper(), MANAGEMENT_TYPES[arguments["type"]], arguments["name"], properties)
+
+
+def to_amqp091_call(operation):
+    """
+    Converts an operation to the (method name, keyword arguments) of the
+    pika channel call that does the same over AMQP 0-9-1.
+    """
+    method = operation["method"]
+    arguments = operation["arguments"]
+    if method == "bind":
+        return "queue_bind", {"queue": arguments["queue"], "exchange": arguments["exchange"],
+                              "routing_key": arguments["key"]}
+    if method not in ("create", "delete") or arguments.get("type") not in ("exchange", "queue"):
+        raise ValueError(f"'{describe_operation(operation)}' is not supported over AMQP 0-9-1")
+    if method == "delete":
+        if arguments["type"] == "exchange":
+            return "exchange_delete", {"exchange": arguments["name"]}
+        return "queue_delete", {"queue": arguments["name"]}
+
+    properties = arguments.get("properties") or {}
+    declare_arguments = None
+    if properties.get("alternate-exchange"):
+        declare_arguments = {"alternate-exchange": properties["alternate-exchange"]}
+    if arguments["type"] == "exchange":
+        return "exchange_declare", {"exchange": arguments["name"], "exchange_type": properties["exchange-type"],
+                                    "durable": properties.get("durable", False), "arguments": declare_arguments}
+    return "queue_declare", {"queue": arguments["name"], "durable": properties.get("durable", False),
+                             "auto_delete": properties.get("auto-delete", False), "arguments": declare_arguments}
+
+
+def _parse_options(tokens, allowed, line_number):
+    options = {}
+    positional = []
+    tokens = iter(tokens)
+    for token in tokens:
+        if not token.startswith("--"):
+            positional.append(token)
+            continue
+        if token not in allowed:
+            raise ValueError(f"line {line_number}: unknown option '{token}'")
+        if token == "--alternate-exchange":
+            value = next(tokens, None)
+            if value is None:
+                raise ValueError(f"line {line_number}: --alternate-exchange needs a value")
+            options["alternate_exchange"] = value
+        else:
+            options[token[2:].replace("-", "_")] = True
+    return positional, options
+
+
+def parse_operation(line, line_number=0):
+    """
+    Parses one line of a bulk operations file. Returns None for blank lines
+    and comments. Two formats are accepted:
+
+      {"method": "create", "arguments": {...}}      (raw QMF method, JSON)
+      exchange <type> <name> [--durable] [--alternate-exchange <name>]
+      queue <name> [--durable] [--auto-delete] [--alternate-exchange <name>]
+      bind <exchange> <queue> <binding-key>
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        operation = json.loads(line)
+        if "method" not in operation or "arguments" not in operation:
+            raise ValueError(f"line {line_number}: JSON operations need 'method' and 'arguments'")
+        return operation
+
+    tokens = shlex.split(line)
+    kind = tokens[0]
+    if kind == "exchange":
+        positional, options = _parse_options(tokens[1:], EXCHANGE_OPTIONS, line_number)
+        if len(positional) != 2:
+            raise ValueError(f"line {line_number}: expected 'exchange <type> <name>'")
+        return exchange_create(positional[1], positional[0], **options)
+    if kind == "queue":
+        positional, options = _parse_options(tokens[1:], QUEUE_OPTIONS, line_number)
+        if len(positional) != 1:
+            raise ValueError(f"line {line_number}: expected 'queue <name>'")
+        return queue_create(positional[0], **options)
+    if kind == "bind":
+        if len(tokens) != 4:
+            raise ValueError(f"line {line_number}: expected 'bind <exchange> <queue> <binding-key>'")
+        return bind(tokens[1], tokens[2], tokens[3])
+    raise ValueError(f"line {line_number}: unknown operation '{kind}'")
+
+
+def read_operations(stream):
+    """Lazily yields operations from a file object, one per line."""
+    for line_number, line in enumerate(stream, 1):
+        operation = parse_operation(line, line_number)
+        if operation is not None:
+            yield operation
+
+
+def load_operations(path):
+    """
+    Reads a whole operations file ('-' for stdin) into a list. It is parsed
+    up front, so a bad line raises ValueError before anything is sent
+    rather than in the middle of a run.
+    """
+    stream = sys.stdin if path == "-" else open(path)
+    try:
+        return list(read_operations(stream))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _exchange_roots(operations):
+    """Maps each exchange created in the batch to the last exchange of its alternate-exchange chain."""
+    alternates = {}
+    for operation in operations:
+        arguments = operation["arguments"]
+        if operation["method"] == "create" and arguments.get("type") == "exchange":
+            alternates[arguments["name"]] = (arguments.get("properties") or {}).get("alternate-exchange")
+
+    roots = {}
+    for name in alternates:
+        root, seen = name, {name}
+        while alternates.get(root) and alternates[root] not in seen:
+            root = alternates[root]
+            seen.add(root)
+        roots[name] = root
+    return roots
+
+
+def shard_phases(operations, shards):
+    """
+    Splits a batch for 'shards' connections or channels that run side by
+    side. Returns a list of phases to run one after the other; each is a
+    list of 'shards' lists of (index, operation), in input order within a
+    shard. Exchange creates are moved into a phase ahead of the queue and
+    bind operations around them, so no bind or queue races the exchange it
+    refers to (see sharded_bulk.py). An exchange delete is never moved
+    ahead of a queue or bind operation: if one came before it, the delete
+    starts a new pair of phases.
+    """
+    roots = _exchange_roots(operations)
+    phases = []
+    exchange_phase = queue_phase = None
+    for index, operation in enumerate(operations):
+        arguments = operation["arguments"]
+        is_exchange = operation["method"] != "bind" and arguments.get("type") == "exchange"
+        if exchange_phase is None or (is_exchange and operation["method"] != "create" and any(queue_phase)):
+            exchange_phase = [[] for _ in range(shards)]
+            queue_phase = [[] for _ in range(shards)]
+            phases += [exchange_phase, queue_phase]
+        if operation["method"] == "bind":
+            phase, key = queue_phase, "queue:" + arguments["queue"]
+        elif is_exchange:
+            phase, key = exchange_phase, "exchange:" + roots.get(arguments["name"], arguments["name"])
+        else:
+            phase, key = queue_phase, "queue:" + str(arguments.get("name"))
+        # crc32 rather than hash(): it is the same in every process and run.
+        phase[zlib.crc32(key.encode("utf-8")) % shards].append((index, operation))
+    return [phase for phase in phases if any(phase)]
@@ -1,11 +1,41 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-# Important: This script is for Python 2.7
+# Repeatable query benchmark for the QPID table.
+#
+# Each iteration connects, executes the query and fetches every row; the
+# three phases are timed separately. Warmup iterations are run first and
+# not counted. --arraysize and --prefetchrows take comma separated lists
+# and every combination is measured.
+#
+# With --load, N worker threads share a session pool and run a weighted mix
+# of queries (--mix) at an optional target rate for --duration seconds;
+# throughput, latency histograms and pool wait time are reported for every
+# value of --workers.
+#
+# The database driver is pluggable:
+#   --driver oracle          cx_Oracle with the settings below (default)
+#   --driver sqlite          sqlite3 stand-in, see --sqlite-path/--sqlite-rows
+#   --driver module:function any callable returning a DB-API connection
+#
+# With --export PATH the table is streamed into a CSV file, or Parquet when
+# pyarrow is installed, in --export-arraysize batches. --splits N scans the
+# table on N sessions at once, split by ROWID hash (Oracle) or by ranges of
+# an integer key column; rows/sec and peak memory are reported.
 
-import cx_Oracle
-import time
 import os
+import sys
+import csv
+import json
+import time
+import queue
+import random
+import argparse
+import importlib
+import threading
+
+from bench_stats import percentile
+from profiling import add_profile_arguments, start_profiling
 
 # --- 1. CONFIGURE YOUR DATABASE CONNECTION DETAILS HERE ---
 # It's best practice to get these from environment variables or a config file,
@@ -20,70 +50,680 @@ DB_SERVICE_NAME = "ORCLPDB1"
 
 sql_query = "SELECT COUNT(*) FROM QPID"
 
+SQLITE_PATH = "qpid_standin.db"
+PERCENTILES = (50, 90, 99)
+PHASES = ("connect", "execute", "fetch", "total")
+HISTOGRAM_BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+EXPORT_ARRAYSIZE = 5000
+ROW_GROUP_ROWS = 100000
 
 
-if 'LD_LIBRARY_PATH' not in os.environ:
-    print "WARNING: LD_LIBRARY_PATH is not set."
-    print "The script might fail if Oracle Instant Client is not in a system-default location."
-    print "Please run 'export LD_LIBRARY_PATH=/path/to/your/instantclient'"
+def oracle_driver(opts):
+    """Returns (connect, error class) for cx_Oracle."""
+    import cx_Oracle
 
+    if 'LD_LIBRARY_PATH' not in os.environ:
+        print("WARNING: LD_LIBRARY_PATH is not set.")
+        print("The script might fail if Oracle Instant Client is not in a system-default location.")
+        print("Please run 'export LD_LIBRARY_PATH=/path/to/your/instantclient'")
 
+    dsn = cx_Oracle.makedsn(DB_HOST, DB_PORT, service_name=DB_SERVICE_NAME)
 
-dsn = cx_Oracle.makedsn(DB_HOST, DB_PORT, service_name=DB_SERVICE_NAME)
+    def connect():
+        return cx_Oracle.connect(user=DB_USERNAME, password=DB_PASSWORD, dsn=dsn)
+    return connect, cx_Oracle.DatabaseError
 
-connection = None # Initialize connection to None
-try:
-    print "Connecting to the database..."
+def oracle_session_pool(size):
+    """A cx_Oracle SessionPool of 'size' sessions; acquire() waits when all are busy."""
+    import cx_Oracle
 
-    # Record the start time (includes connection time)
-    start_time = time.time()
+    dsn = cx_Oracle.makedsn(DB_HOST, DB_PORT, service_name=DB_SERVICE_NAME)
+    return cx_Oracle.SessionPool(user=DB_USERNAME, password=DB_PASSWORD, dsn=dsn,
+                                 min=size, max=size, increment=0, threaded=True,
+                                 getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT)
 
-    # Establish the connection to the database
-    connection = cx_Oracle.connect(
-        user=DB_USERNAME,
-        password=DB_PASSWORD,
-        dsn=dsn
-    )
 
-    print "Connection successful."
+class QueuePool(object):
+    """SessionPool-style pool for drivers without one: 'size' connections made up front."""
 
-    # Create a cursor object to execute SQL
-    cursor = connection.cursor()
+    def __init__(self, connect, size):
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(connect())
 
-    print "Executing query: " + sql_query
-    cursor.execute(sql_query)
+    def acquire(self):
+        return self._connections.get()
 
-    # Fetch the result. use fetchone() for a single result,
-    # or fetchall() for multiple rows.
-    result = cursor.fetchone()
+    def release(self, connection):
+        self._connections.put(connection)
 
-    # Record the end time
-    end_time = time.time()
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
 
-    # Calculate the duration
-    duration = end_time - start_time
 
-    print "\n--- Query Results ---"
-    if result:
-        # result is a tuple, e.g., (2600000,) so we access the first element
-        print "Row count: %d" % result[0]
-    else:
-        print "Query returned no results."
+def make_pool(opts, connect, size):
+    if opts.driver == "oracle":
+        return oracle_session_pool(size)
+    return QueuePool(connect, size)
+
+def create_sqlite_qpid(path, rows):
+    """Creates and fills a QPID table in a sqlite file if it does not exist yet."""
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    try:
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'QPID'").fetchone()
+        if not exists:
+            print(f"Creating stand-in QPID table with {rows} rows in {path}...")
+            connection.execute(
+                "CREATE TABLE QPID (ID INTEGER PRIMARY KEY, EXCHANGE_NAME TEXT, QUEUE_NAME TEXT, BINDING_KEY TEXT)")
+            connection.executemany(
+                "INSERT INTO QPID VALUES (?, ?, ?, ?)",
+                ((i, f"exchange-{i % 100}", f"queue-{i}", f"key.{i % 1000}") for i in range(1, rows + 1)))
+            connection.commit()
+    finally:
+        connection.close()
+
+def sqlite_driver(opts):
+    """Returns (connect, error class) for the sqlite3 stand-in."""
+    import sqlite3
+
+    create_sqlite_qpid(opts.sqlite_path, opts.sqlite_rows)
+
+    def connect():
+        return sqlite3.connect(opts.sqlite_path, check_same_thread=False)
+    return connect, sqlite3.DatabaseError
+
+def custom_driver(spec):
+    """Loads 'module:function'; the function takes no arguments and returns a DB-API connection."""
+    module_name, function_name = spec.split(":", 1)
+    module = importlib.import_module(module_name)
+    connect = getattr(module, function_name)
+    return connect, getattr(module, "DatabaseError", Exception)
+
+def load_driver(opts):
+    if opts.driver == "oracle":
+        return oracle_driver(opts)
+    if opts.driver == "sqlite":
+        return sqlite_driver(opts)
+    if ":" in opts.driver:
+        return custom_driver(opts.driver)
+    raise ValueError(f"unknown driver '{opts.driver}' (use oracle, sqlite or module:function)")
+
+
+def parse_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+def parse_binds(pairs):
+    binds = {}
+    for pair in pairs:
+        if "=" not in pair:
+            raise ValueError(f"invalid bind '{pair}', must be NAME=VALUE")
+        name, value = pair.split("=", 1)
+        binds[name] = parse_value(value)
+    return binds
+
+def parse_sizes(text):
+    """'100,1000' -> [100, 1000]; an empty string means 'driver default' -> [None]."""
+    if not text:
+        return [None]
+    return [int(size) for size in text.split(",")]
+
+def summarize(samples):
+    """Turns {phase: [seconds, ...]} into {phase: {p50_ms, ..., mean_ms}}."""
+    summary = {}
+    for phase, values in samples.items():
+        ordered = sorted(values)
+        stats = {f"p{pct}_ms": percentile(ordered, pct) * 1000 for pct in PERCENTILES}
+        stats["min_ms"] = ordered[0] * 1000 if ordered else 0.0
+        stats["max_ms"] = ordered[-1] * 1000 if ordered else 0.0
+        stats["mean_ms"] = sum(ordered) / len(ordered) * 1000 if ordered else 0.0
+        summary[phase] = stats
+    return summary
+
+
+def configure_cursor(cursor, arraysize, prefetchrows):
+    """Applies the fetch tuning; returns the settings the driver did not support."""
+    unsupported = []
+    for name, value in (("arraysize", arraysize), ("prefetchrows", prefetchrows)):
+        if value is None:
+            continue
+        try:
+            setattr(cursor, name, value)
+        except AttributeError:
+            unsupported.append(name)
+    return unsupported
+
+def run_iteration(connect, query, binds, arraysize, prefetchrows, connection=None):
+    """Runs one connect/execute/fetch cycle. Returns ({phase: seconds}, rows, unsupported settings)."""
+    timings = {}
+    start = time.perf_counter()
+    own_connection = connection is None
+    if own_connection:
+        connection = connect()
+    connected = time.perf_counter()
+    timings["connect"] = connected - start
+
+    try:
+        cursor = connection.cursor()
+        unsupported = configure_cursor(cursor, arraysize, prefetchrows)
+        cursor.execute(query, binds)
+        executed = time.perf_counter()
+        timings["execute"] = executed - connected
+
+        rows = 0
+        fetch_size = arraysize or cursor.arraysize
+        while True:
+            batch = cursor.fetchmany(fetch_size)
+            if not batch:
+                break
+            rows += len(batch)
+        timings["fetch"] = time.perf_counter() - executed
+        cursor.close()
+    finally:
+        if own_connection:
+            connection.close()
+    timings["total"] = time.perf_counter() - start
+    return timings, rows, unsupported
+
+def run_benchmark(connect, query, binds, arraysize, prefetchrows, iterations, warmup, reuse_connection):
+    connection = connect() if reuse_connection else None
+    samples = {phase: [] for phase in PHASES}
+    rows = 0
+    unsupported = []
+    try:
+        for i in range(warmup + iterations):
+            timings, rows, unsupported = run_iteration(connect, query, binds, arraysize, prefetchrows, connection)
+            if i >= warmup:
+                for phase in PHASES:
+                    samples[phase].append(timings[phase])
+    finally:
+        if connection is not None:
+            connection.close()
+    if reuse_connection:
+        del samples["connect"]
+    return {
+        "arraysize": arraysize,
+        "prefetchrows": prefetchrows,
+        "iterations": iterations,
+        "rows": rows,
+        "unsupported": unsupported,
+        "phases": summarize(samples)
+    }
+
+def parse_mix(entries, default_query):
+    """'3:SELECT ...' -> [(3.0, 'SELECT ...')]; no entries means just the default query."""
+    if not entries:
+        return [(1.0, default_query)]
+    mix = []
+    for entry in entries:
+        weight, separator, query = entry.partition(":")
+        if not separator or not query:
+            raise ValueError(f"invalid --mix '{entry}', must be WEIGHT:SQL")
+        mix.append((float(weight), query))
+    return mix
+
+def histogram(values_ms):
+    """Counts per bucket; the key is the bucket's upper bound in ms ('+Inf' for the rest)."""
+    counts = {str(bound): 0 for bound in HISTOGRAM_BOUNDS_MS}
+    counts["+Inf"] = 0
+    for value in values_ms:
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if value <= bound:
+                counts[str(bound)] += 1
+                break
+        else:
+            counts["+Inf"] += 1
+    return counts
+
+
+class LoadWorker(threading.Thread):
+    """Runs queries from the mix until the deadline, following the shared rate schedule."""
+
+    def __init__(self, pool, mix, binds, arraysize, schedule, deadline):
+        super(LoadWorker, self).__init__(daemon=True)
+        self.pool = pool
+        self.queries = [query for weight, query in mix]
+        self.weights = [weight for weight, query in mix]
+        self.binds = binds
+        self.arraysize = arraysize
+        self.schedule = schedule
+        self.deadline = deadline
+        self.latencies = {query: [] for query in self.queries}
+        self.waits = []
+        self.errors = []
+
+    def run(self):
+        while True:
+            if not self.schedule.wait_for_slot(self.deadline):
+                return
+            query = random.choices(self.queries, self.weights)[0]
+            start = time.perf_counter()
+            connection = self.pool.acquire()
+            acquired = time.perf_counter()
+            self.waits.append(acquired - start)
+            try:
+                cursor = connection.cursor()
+                configure_cursor(cursor, self.arraysize, None)
+                cursor.execute(query, self.binds)
+                while cursor.fetchmany(self.arraysize or cursor.arraysize):
+                    pass
+                cursor.close()
+                self.latencies[query].append(time.perf_counter() - acquired)
+            except Exception as e:
+                self.errors.append(str(e))
+            finally:
+                self.pool.release(connection)
+
+
+class RateSchedule(object):
+    """Hands out evenly spaced start times for a total rate; rate 0 means as fast as possible."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.perf_counter()
+
+    def wait_for_slot(self, deadline):
+        """Sleeps until the next slot; returns False once the deadline has passed."""
+        if self.interval:
+            with self._lock:
+                slot = self._next
+                self._next += self.interval
+            delay = slot - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return time.perf_counter() < deadline
 
-    print "\n--- Performance ---"
-    print "Total execution time (including connection): %.2f seconds" % duration
+def run_load(opts, connect, mix, binds, workers):
+    pool_size = opts.pool_size or workers
+    pool = make_pool(opts, connect, pool_size)
+    try:
+        schedule = RateSchedule(opts.rate)
+        start = time.perf_counter()
+        threads = [LoadWorker(pool, mix, binds, opts.load_arraysize, schedule, start + opts.duration)
+                   for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
 
+    per_query = {}
+    all_latencies = []
+    for weight, query in mix:
+        latencies = sorted(value for thread in threads for value in thread.latencies[query])
+        all_latencies.extend(latencies)
+        per_query[query] = {
+            "count": len(latencies),
+            **{f"p{pct}_ms": percentile(latencies, pct) * 1000 for pct in PERCENTILES}
+        }
+    all_latencies.sort()
+    waits = sorted(value for thread in threads for value in thread.waits)
+    errors = [error for thread in threads for error in thread.errors]
 
-except cx_Oracle.DatabaseError as e:
-    # This block will catch any Oracle-specific errors
-    error, = e.args
-    print "Oracle Database Error:"
-    print "Error Code:", error.code
-    print "Error Message:", error.message
+    return {
+        "workers": workers,
+        "pool_size": pool_size,
+        "target_rate": opts.rate,
+        "duration": elapsed,
+        "completed": len(all_latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput": len(all_latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency": {f"p{pct}_ms": percentile(all_latencies, pct) * 1000 for pct in PERCENTILES},
+        "latency_histogram_ms": histogram(value * 1000 for value in all_latencies),
+        "pool_wait": {f"p{pct}_ms": percentile(waits, pct) * 1000 for pct in PERCENTILES},
+        "pool_wait_total_s": sum(waits),
+        "queries": per_query
+    }
 
-finally:
-    # This block will always run, whether there was an error or not.
-    # It's crucial for closing the connection to free up database resources.
-    if connection:
-        print "\nClosing the database connection."
+def print_load_result(result):
+    print(f"\n--- Load: {result['workers']} workers, pool of {result['pool_size']}, "
+          f"target {result['target_rate'] or 'unlimited'} queries/sec ---")
+    print(f"Completed {result['completed']} queries in {result['duration']:.1f} seconds "
+          f"({result['throughput']:.1f} queries/sec), {result['errors']} errors")
+    if result["first_error"]:
+        print(f"First error: {result['first_error']}")
+    latency = " ".join(f"p{pct}={result['latency'][f'p{pct}_ms']:.2f}ms" for pct in PERCENTILES)
+    wait = " ".join(f"p{pct}={result['pool_wait'][f'p{pct}_ms']:.2f}ms" for pct in PERCENTILES)
+    print(f"Query latency: {latency}")
+    print(f"Pool wait:     {wait} (total {result['pool_wait_total_s']:.2f}s)")
+    print("Latency histogram (ms):")
+    for bound, count in result["latency_histogram_ms"].items():
+        if count:
+            print(f"  <= {bound:>6}: {count}")
+    if len(result["queries"]) > 1:
+        for query, stats in result["queries"].items():
+            print(f"  {stats['count']:>8} x p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms  {query}")
+
+
+def fetch_batches(cursor, arraysize):
+    """Yields the result set one fetchmany() round trip at a time."""
+    while True:
+        batch = cursor.fetchmany(arraysize)
+        if not batch:
+            return
+        yield batch
+
+def split_predicates(opts, connect, splits):
+    """
+    Returns [(where clause, binds)], one per split, that together cover the
+    table once. 'rowid' hashes Oracle ROWIDs into buckets; 'key' cuts the
+    MIN..MAX range of an integer column into equal ranges.
+    """
+    if splits == 1:
+        return [("", {})]
+    split_by = opts.split_by or ("rowid" if opts.driver == "oracle" else "key")
+    if split_by == "rowid":
+        if opts.driver != "oracle":
+            raise ValueError("--split-by rowid needs the oracle driver, use --split-by key")
+        return [(f"WHERE ORA_HASH(ROWID, {splits - 1}) = {split}", {}) for split in range(splits)]
+
+    column = opts.split_column
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM {opts.export_table}")
+        low, high = cursor.fetchone()
+        cursor.close()
+    finally:
+        connection.close()
+    if low is None:
+        return [("", {})]
+    if not isinstance(low, int) or not isinstance(high, int):
+        raise ValueError(f"--split-column {column} must be an integer column for --split-by key")
+    step = (high - low) // splits + 1
+    return [(f"WHERE {column} >= :split_low AND {column} < :split_high",
+             {"split_low": low + split * step, "split_high": low + (split + 1) * step})
+            for split in range(splits)]
+
+
+class ExportWorker(threading.Thread):
+    """Scans one split on its own session and hands the batches to the writer."""
+
+    def __init__(self, connect, sql, binds, arraysize, prefetchrows, batches):
+        super(ExportWorker, self).__init__(daemon=True)
+        self.connect = connect
+        self.sql = sql
+        self.binds = binds
+        self.arraysize = arraysize
+        self.prefetchrows = prefetchrows
+        self.batches = batches
+        self.rows = 0
+        self.error = None
+
+    def run(self):
+        try:
+            connection = self.connect()
+            try:
+                cursor = connection.cursor()
+                configure_cursor(cursor, self.arraysize, self.prefetchrows)
+                cursor.execute(self.sql, self.binds)
+                for batch in fetch_batches(cursor, self.arraysize):
+                    self.batches.put(batch)
+                    self.rows += len(batch)
+                cursor.close()
+            finally:
+                connection.close()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.batches.put(None)
+
+def drain(batches, workers):
+    """Yields batches from the queue until every worker has finished."""
+    remaining = workers
+    while remaining:
+        batch = batches.get()
+        if batch is None:
+            remaining -= 1
+        else:
+            yield batch
+
+def write_csv(path, columns, batches):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+
+def write_parquet(path, columns, batches, row_group_rows):
+    """Writes a row group whenever 'row_group_rows' rows have been buffered."""
+    import pyarrow
+    import pyarrow.parquet
+
+    writer = None
+    buffered = []
+
+    def flush():
+        nonlocal writer
+        table = pyarrow.Table.from_arrays([pyarrow.array(column) for column in zip(*buffered)], names=columns)
+        if writer is None:
+            writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+        else:
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+        del buffered[:]
+
+    try:
+        for batch in batches:
+            buffered.extend(batch)
+            if len(buffered) >= row_group_rows:
+                flush()
+        if buffered:
+            flush()
+        if writer is None:
+            empty = pyarrow.table({column: pyarrow.array([], pyarrow.string()) for column in columns})
+            pyarrow.parquet.write_table(empty, path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_format(opts):
+    if opts.export_format:
+        return opts.export_format
+    return "parquet" if opts.export.endswith(".parquet") else "csv"
+
+def peak_rss_mb():
+    """Peak resident memory of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def run_export(opts, connect):
+    """
+    Streams the table into one CSV or Parquet file. Each split runs on its
+    own session; the writer takes batches from a bounded queue, so memory
+    stays at a few batches however large the table is. With more than one
+    split, rows from different splits are interleaved in the file.
+    """
+    output_format = export_format(opts)
+    if output_format == "parquet":
+        try:
+            importlib.import_module("pyarrow.parquet")
+        except ImportError:
+            raise ValueError("Parquet output needs pyarrow (pip install pyarrow), or write .csv instead")
+    if opts.splits < 1 or opts.export_arraysize < 1:
+        raise ValueError("--splits and --export-arraysize must be at least 1")
+
+    base = f"SELECT {opts.export_columns} FROM {opts.export_table}"
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(base + " WHERE 1 = 0")
+        columns = [column[0] for column in cursor.description]
+        cursor.close()
+    finally:
         connection.close()
+
+    start = time.perf_counter()
+    batches = queue.Queue(maxsize=2 * opts.splits)
+    workers = [ExportWorker(connect, f"{base} {where}".strip(), binds, opts.export_arraysize,
+                            opts.export_prefetchrows, batches)
+               for where, binds in split_predicates(opts, connect, opts.splits)]
+    for worker in workers:
+        worker.start()
+    if output_format == "parquet":
+        write_parquet(opts.export, columns, drain(batches, len(workers)), opts.row_group_rows)
+    else:
+        write_csv(opts.export, columns, drain(batches, len(workers)))
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    for worker in workers:
+        if worker.error is not None:
+            raise worker.error
+    rows = sum(worker.rows for worker in workers)
+    return {
+        "path": opts.export,
+        "format": output_format,
+        "splits": len(workers),
+        "arraysize": opts.export_arraysize,
+        "prefetchrows": opts.export_prefetchrows,
+        "rows": rows,
+        "split_rows": [worker.rows for worker in workers],
+        "duration": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0,
+        "bytes": os.path.getsize(opts.export),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def print_export_result(result):
+    print(f"\n--- Export: {result['format']} to {result['path']}, {result['splits']} split(s), "
+          f"arraysize={result['arraysize']}, prefetchrows={result['prefetchrows'] or 'default'} ---")
+    print(f"Exported {result['rows']} rows in {result['duration']:.2f} seconds "
+          f"({result['rows_per_sec']:.0f} rows/sec), {result['bytes'] / 1e6:.1f} MB written")
+    if result["splits"] > 1:
+        print(f"Rows per split: {', '.join(str(rows) for rows in result['split_rows'])}")
+    print(f"Peak memory (RSS): {result['peak_rss_mb']:.1f} MB")
+
+
+def print_result(result):
+    print(f"\n--- Performance (arraysize={result['arraysize'] or 'default'}, "
+          f"prefetchrows={result['prefetchrows'] or 'default'}) ---")
+    print(f"Rows fetched per iteration: {result['rows']}")
+    if result["unsupported"]:
+        print(f"Not supported by this driver: {', '.join(result['unsupported'])}")
+    header = "".join(f"{'p' + str(pct) + ' ms':>10}" for pct in PERCENTILES)
+    print(f"{'phase':<10}{header}{'mean ms':>10}{'max ms':>10}")
+    for phase, stats in result["phases"].items():
+        values = "".join(f"{stats[f'p{pct}_ms']:>10.2f}" for pct in PERCENTILES)
+        print(f"{phase:<10}{values}{stats['mean_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark a query against the QPID table.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--driver", default="oracle",
+                        help="oracle, sqlite or module:function (default: oracle).")
+    parser.add_argument("--sqlite-path", default=SQLITE_PATH,
+                        help=f"sqlite stand-in database file (default: {SQLITE_PATH}).")
+    parser.add_argument("--sqlite-rows", type=int, default=100000,
+                        help="Rows to generate when the stand-in QPID table does not exist (default: 100000).")
+    parser.add_argument("--query", default=sql_query, help=f"SQL to run (default: {sql_query}).")
+    parser.add_argument("--bind", dest="binds", action="append", default=[], metavar="<NAME=VALUE>",
+                        help="Bind variable for the query, e.g. --bind id=42 for ':id' (repeatable).")
+    parser.add_argument("--iterations", type=int, default=20, help="Measured iterations (default: 20).")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured warmup iterations (default: 3).")
+    parser.add_argument("--arraysize", default="", help="Comma separated cursor.arraysize values to sweep.")
+    parser.add_argument("--prefetchrows", default="", help="Comma separated cursor.prefetchrows values to sweep.")
+    parser.add_argument("--reuse-connection", action="store_true",
+                        help="Connect once and time only execute and fetch.")
+    load = parser.add_argument_group("load mode")
+    load.add_argument("--load", action="store_true", help="Run the concurrent load test instead of the benchmark.")
+    load.add_argument("--workers", default="1,4,16",
+                      help="Comma separated worker thread counts to run in turn (default: 1,4,16).")
+    load.add_argument("--pool-size", type=int, default=0,
+                      help="Sessions in the pool (default: one per worker).")
+    load.add_argument("--rate", type=float, default=0.0,
+                      help="Target total queries/sec across workers (default: unlimited).")
+    load.add_argument("--duration", type=float, default=10.0, help="Seconds per worker count (default: 10).")
+    load.add_argument("--mix", action="append", default=[], metavar="<WEIGHT:SQL>",
+                      help="Query and its relative weight in the mix (repeatable, default: --query).")
+    load.add_argument("--load-arraysize", type=int, default=None, help="cursor.arraysize in load mode.")
+    export = parser.add_argument_group("export mode")
+    export.add_argument("--export", metavar="<path>",
+                        help="Stream the table to this file instead of benchmarking (.csv or .parquet).")
+    export.add_argument("--export-format", choices=("csv", "parquet"),
+                        help="Output format (default: from the file extension, else csv).")
+    export.add_argument("--export-table", default="QPID", help="Table to export (default: QPID).")
+    export.add_argument("--export-columns", default="*", help="Select list (default: *).")
+    export.add_argument("--export-arraysize", type=int, default=EXPORT_ARRAYSIZE,
+                        help=f"Rows per fetch round trip (default: {EXPORT_ARRAYSIZE}).")
+    export.add_argument("--export-prefetchrows", type=int, default=None, help="cursor.prefetchrows in export mode.")
+    export.add_argument("--splits", type=int, default=1, help="Parallel sessions scanning the table (default: 1).")
+    export.add_argument("--split-by", choices=("rowid", "key"),
+                        help="ROWID hash buckets or key ranges (default: rowid for oracle, key otherwise).")
+    export.add_argument("--split-column", default="ID",
+                        help="Integer column for --split-by key (default: ID).")
+    export.add_argument("--row-group-rows", type=int, default=ROW_GROUP_ROWS,
+                        help=f"Rows per Parquet row group (default: {ROW_GROUP_ROWS}).")
+    parser.add_argument("--json", metavar="<file>", help="Write the results as JSON ('-' for stdout).")
+    add_profile_arguments(parser)
+    return parser
+
+
+if __name__ == "__main__":
+    opts = build_parser().parse_args()
+    start_profiling(opts)
+
+    try:
+        binds = parse_binds(opts.binds)
+        connect, database_error = load_driver(opts)
+    except (ValueError, ImportError, AttributeError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    results = []
+    try:
+        if opts.export:
+            result = run_export(opts, connect)
+            results.append(result)
+            print_export_result(result)
+        elif opts.load:
+            mix = parse_mix(opts.mix, opts.query)
+            for workers in parse_sizes(opts.workers):
+                result = run_load(opts, connect, mix, binds, workers)
+                results.append(result)
+                print_load_result(result)
+        else:
+            print("Executing query: " + opts.query)
+            for arraysize in parse_sizes(opts.arraysize):
+                for prefetchrows in parse_sizes(opts.prefetchrows):
+                    result = run_benchmark(connect, opts.query, binds, arraysize, prefetchrows,
+                                           opts.iterations, opts.warmup, opts.reuse_connection)
+                    results.append(result)
+                    print_result(result)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    except database_error as e:
+        # cx_Oracle wraps an error object with code/message; other drivers just have text.
+        error = e.args[0] if e.args else e
+        print("Database Error:")
+        print("Error Code:", getattr(error, "code", "n/a"))
+        print("Error Message:", getattr(error, "message", error))
+        sys.exit(1)
+
+    if opts.json:
+        output = {"driver": opts.driver, "query": opts.query, "binds": binds, "results": results}
+        if opts.json == "-":
+            print(json.dumps(output, indent=2))
+        else:
+            with open(opts.json, "w") as f:
+                json.dump(output, f, indent=2)
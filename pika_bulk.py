@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+# Bulk declares and binds over AMQP 0-9-1 on one non-blocking pika
+# SelectConnection. The batch is spread over several channels, sharded the
+# same way as sharded_bulk.py: every operation on one object stays on one
+# channel, in input order, and exchanges are declared before the queues and
+# binds that follow them. pika sends one synchronous method per channel at
+# a time, so the channels are what runs side by side; --window only keeps
+# each channel's next requests queued behind the current one.
+#
+# A failed declare or bind makes the broker close its channel. The
+# operation is recorded as failed, the requests queued behind it are sent
+# again on a fresh channel, and the rest of the batch carries on.
+
+import sys
+import time
+import argparse
+from collections import deque
+
+import pika
+
+from operations import load_operations, describe_operation, shard_phases, to_amqp091_call
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5672"
+DEFAULT_CHANNELS = 16
+DEFAULT_WINDOW = 10
+# A channel that closes this many times in a row without completing anything is given up.
+MAX_IDLE_REOPENS = 3
+
+
+def connection_parameters(broker_url):
+    """pika parameters for 'host[:port]' or an amqp:// URL."""
+    if "://" in broker_url:
+        return pika.URLParameters(broker_url)
+    host, _, port = broker_url.partition(":")
+    return pika.ConnectionParameters(host=host, port=int(port or 5672))
+
+
+class ChannelWorker(object):
+    """Runs one shard of a phase on its own channel, opening a new channel after each channel error."""
+
+    def __init__(self, bulk, label, shard):
+        self.bulk = bulk
+        self.label = label
+        self.pending = deque(shard)
+        self.in_flight = deque()
+        self.reopens = 0
+        self.channel = None
+        self.done = False
+        self._idle_reopens = 0
+
+    def open(self):
+        self.bulk.connection.channel(on_open_callback=self._on_open)
+
+    def _on_open(self, channel):
+        self.channel = channel
+        channel.add_on_close_callback(self._on_close)
+        self._send_pending()
+
+    def _send_pending(self):
+        while self.pending and len(self.in_flight) < self.bulk.window:
+            index, operation = self.pending.popleft()
+            method, arguments = to_amqp091_call(operation)
+            self.in_flight.append((index, operation))
+            getattr(self.channel, method)(callback=self._on_ok, **arguments)
+        if not self.pending and not self.in_flight:
+            self._finish()
+
+    def _on_ok(self, frame):
+        # Replies on a channel come back in the order the requests were sent.
+        index, operation = self.in_flight.popleft()
+        self._idle_reopens = 0
+        self.bulk.record_success(self, index, operation)
+        self._send_pending()
+
+    def _on_close(self, channel, reason):
+        self.channel = None
+        if self.done or self.bulk.closing:
+            return
+        details = f"{reason.reply_code} {reason.reply_text}" if hasattr(reason, "reply_code") else str(reason)
+        if self.in_flight:
+            # The broker closed the channel on the first unanswered request
+            # and dropped the ones queued behind it; those go out again.
+            index, operation = self.in_flight.popleft()
+            self.bulk.record_failure(self, index, operation, details)
+            self.pending.extendleft(reversed(self.in_flight))
+            self.in_flight.clear()
+        else:
+            self._idle_reopens += 1
+        if self.pending and self._idle_reopens < MAX_IDLE_REOPENS:
+            self.reopens += 1
+            self.open()
+        else:
+            for index, operation in self.pending:
+                self.bulk.record_failure(self, index, operation, f"channel closed: {details}")
+            self.pending.clear()
+            self._finish()
+
+    def abandon(self, details):
+        """Fails everything not yet answered, after the connection went away."""
+        for index, operation in list(self.in_flight) + list(self.pending):
+            self.bulk.record_failure(self, index, operation, details)
+        self.in_flight.clear()
+        self.pending.clear()
+        self.done = True
+
+    def _finish(self):
+        if self.done:
+            return
+        self.done = True
+        if self.channel is not None and self.channel.is_open:
+            self.channel.close()
+        self.bulk.worker_done(self)
+
+
+class PikaBulk(object):
+    """
+    Runs a batch over 'channels' channels of one SelectConnection, one
+    phase of shard_phases() at a time. Failures are collected per operation
+    as (index, details) and never stop the batch.
+    """
+
+    def __init__(self, broker_url, operations, channels=DEFAULT_CHANNELS, window=DEFAULT_WINDOW, quiet=False):
+        self.broker_url = broker_url
+        self.operations = operations
+        self.window = window
+        self.quiet = quiet
+        self.succeeded = 0
+        self.failed = []
+        self.reopens = 0
+        self.error = None
+        self.closing = False
+        self.connection = None
+        self._phases = shard_phases(operations, channels)
+        self._workers = []
+
+    def run(self):
+        self.connection = pika.SelectConnection(
+            connection_parameters(self.broker_url),
+            on_open_callback=self._on_open,
+            on_open_error_callback=self._on_open_error,
+            on_close_callback=self._on_close)
+        self.connection.ioloop.start()
+        self.failed.sort(key=lambda failure: failure[0])
+        return self.succeeded, self.failed
+
+    def _on_open(self, connection):
+        self._start_phase()
+
+    def _start_phase(self):
+        while self._phases:
+            shards = [shard for shard in self._phases.pop(0) if shard]
+            if shards:
+                break
+        else:
+            self.closing = True
+            self.connection.close()
+            return
+        self._workers = [ChannelWorker(self, f"ch-{number}", shard) for number, shard in enumerate(shards, 1)]
+        for worker in self._workers:
+            worker.open()
+
+    def worker_done(self, worker):
+        self.reopens += worker.reopens
+        if all(w.done for w in self._workers):
+            self._start_phase()
+
+    def record_success(self, worker, index, operation):
+        self.succeeded += 1
+        if not self.quiet:
+            print(f"[{worker.label}] [SUCCESS] {describe_operation(operation)}")
+
+    def record_failure(self, worker, index, operation, details):
+        self.failed.append((index, details))
+        print(f"[{worker.label}] [ERROR] {describe_operation(operation)}")
+        print(f"[{worker.label}] Details: {details}")
+
+    def _on_open_error(self, connection, error):
+        self.error = f"could not connect to {self.broker_url}: {error}"
+        self.failed = [(index, self.error) for index in range(len(self.operations))]
+        connection.ioloop.stop()
+
+    def _on_close(self, connection, reason):
+        if not self.closing:
+            self.error = f"connection closed: {reason}"
+            print(f"[ERROR] Connection closed by broker: {reason}")
+            for worker in self._workers:
+                if not worker.done:
+                    worker.abandon(self.error)
+            for phase in self._phases:
+                for shard in phase:
+                    self.failed.extend((index, "not sent") for index, operation in shard)
+            self._phases = []
+        connection.ioloop.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run many declares and binds over AMQP 0-9-1 on several channels of one connection.",
+        epilog="The operations file uses the qmf_bulk.py format."
+    )
+    parser.add_argument("file", nargs="?", default="-", help="Operations file ('-' or omitted for stdin).")
+    parser.add_argument("--broker", default=BROKER_URL,
+                        help=f"Broker as host[:port] or an amqp:// URL (default: {BROKER_URL}).")
+    parser.add_argument("--channels", type=int, default=DEFAULT_CHANNELS,
+                        help=f"Channels the batch is spread over (default: {DEFAULT_CHANNELS}).")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Requests queued per channel (default: {DEFAULT_WINDOW}).")
+    parser.add_argument("--quiet", action="store_true", help="Only print failures and the summary.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    if opts.channels < 1 or opts.window < 1:
+        print("[ERROR] --channels and --window must be at least 1.")
+        sys.exit(1)
+
+    try:
+        operations = load_operations(opts.file)
+        for operation in operations:
+            to_amqp091_call(operation)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    bulk = PikaBulk(opts.broker, operations, opts.channels, opts.window, opts.quiet)
+    start_time = time.monotonic()
+    try:
+        succeeded, failed = bulk.run()
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}")
+        sys.exit(1)
+    duration = time.monotonic() - start_time
+
+    if bulk.error:
+        print(f"[ERROR] {bulk.error}")
+    rate = len(operations) / duration if duration > 0 else 0.0
+    print("\n--- Bulk summary ---")
+    print(f"{succeeded} succeeded, {len(failed)} failed over {opts.channels} channel(s) "
+          f"in {duration:.2f} seconds ({rate:.0f} ops/sec), {bulk.reopens} channel(s) reopened")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+# --profile for the command line tools. The rest of the run is profiled
+# with cProfile and tracemalloc. When the tool exits, the CPU profile and
+# the allocation snapshot are written to files and a summary is printed
+# to stderr, so stdout output such as --json stays intact.
+#
+# The summary splits own time into waiting on I/O (select/poll, socket
+# reads and sleeps, i.e. mostly waiting for the broker), waiting on locks
+# held inside the tool itself (a connection pool, a queue between threads)
+# and the code that ran: the tools themselves, proton, pika and so on. That
+# answers whether a slow run is spending its time on our side or the
+# broker's. The files can be explored further:
+#
+#   python -m pstats <tool>-<time>-<pid>.prof
+#   tracemalloc.Snapshot.load("<tool>-<time>-<pid>.tracemalloc")
+#
+# Only this module and the standard library are imported up front, so
+# adding the options costs a tool nothing when --profile is not given.
+
+import os
+import re
+import sys
+import time
+import atexit
+
+DEFAULT_TOP = 15
+# Frames kept per allocation; more makes tracemalloc slower.
+TRACEMALLOC_FRAMES = 1
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Built-ins whose own time is time spent blocked rather than computing:
+# on a lock of our own, or on I/O and timers.
+LOCK_WAITING = re.compile(r"acquire")
+WAITING = re.compile(r"select|poll|epoll|kqueue|sleep|recv|accept|wait|readinto")
+
+
+def add_profile_arguments(parser):
+    """Adds --profile, --profile-dir and --profile-top to an argparse parser."""
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", action="store_true",
+                       help="Profile the run (cProfile and tracemalloc), write the results to files "
+                            "and print the top hot spots to stderr.")
+    group.add_argument("--profile-dir", default=".", metavar="<dir>",
+                       help="Directory for the profile files (default: current directory).")
+    group.add_argument("--profile-top", type=int, default=DEFAULT_TOP, metavar="<n>",
+                       help=f"Entries per table in the printed summary (default: {DEFAULT_TOP}).")
+
+
+def start_profiling(opts):
+    """Starts profiling if the parsed options ask for it; it ends when the tool exits."""
+    if opts.profile:
+        start(opts.profile_dir, opts.profile_top)
+
+
+def profile_from_argv(argv=None):
+    """
+    For tools that read sys.argv themselves: removes --profile,
+    --profile-dir <dir> and --profile-top <n> from it and starts profiling
+    if --profile was there.
+    """
+    argv = sys.argv if argv is None else argv
+    enabled = False
+    directory = "."
+    top = str(DEFAULT_TOP)
+    remaining = [argv[0]]
+    arguments = iter(argv[1:])
+    for argument in arguments:
+        if argument == "--profile":
+            enabled = True
+        elif argument == "--profile-dir":
+            directory = next(arguments, directory)
+        elif argument.startswith("--profile-dir="):
+            directory = argument.split("=", 1)[1]
+        elif argument == "--profile-top":
+            top = next(arguments, top)
+        elif argument.startswith("--profile-top="):
+            top = argument.split("=", 1)[1]
+        else:
+            remaining.append(argument)
+    argv[:] = remaining
+    if not top.isdigit():
+        sys.exit(f"[ERROR] --profile-top needs a whole number, not '{top}'")
+    if enabled:
+        start(directory, int(top))
+
+
+def start(directory=".", top=DEFAULT_TOP, tool=None):
+    import cProfile
+    import threading
+    import tracemalloc
+
+    tool = tool or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+    # The pid keeps runs started in the same second from overwriting each other.
+    prefix = os.path.join(directory, f"{tool}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    profilers = [cProfile.Profile()]
+
+    if sys.version_info < (3, 12):
+        # Before 3.12 a profiler only sees the thread that enabled it, so
+        # every thread started from now on gets its own.
+        def enable_in_thread(frame, event, arg):
+            profiler = cProfile.Profile()
+            profilers.append(profiler)
+            profiler.enable()
+        threading.setprofile(enable_in_thread)
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    atexit.register(_finish, profilers, prefix, top, time.perf_counter())
+    profilers[0].enable()
+
+
+def _finish(profilers, prefix, top, started):
+    # Both were imported by start(), so importing them here records nothing.
+    import threading
+    import tracemalloc
+
+    profilers[0].disable()
+    threading.setprofile(None)
+    wall = time.perf_counter() - started
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    import pstats
+
+    stats = pstats.Stats(profilers[0], stream=sys.stderr)
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    stats.dump_stats(prefix + ".prof")
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    snapshot.dump(prefix + ".tracemalloc")
+
+    out = sys.stderr
+    print(f"\n--- Profile: {wall:.2f} seconds wall, {len(profilers)} thread(s) profiled ---", file=out)
+    by_component = _own_time_by_component(stats.stats)
+    total = sum(by_component.values()) or 1.0
+    print("Own time by component, summed over threads:", file=out)
+    for component, seconds in sorted(by_component.items(), key=lambda item: -item[1]):
+        if seconds < 0.0005:
+            continue
+        print(f"  {component:<22} {seconds:>9.3f} s {seconds / total:>6.1%}", file=out)
+
+    print(f"\nTop {top} functions by own time:", file=out)
+    print(f"  {'calls':>10} {'own s':>9} {'total s':>9}  function", file=out)
+    ranked = sorted(stats.stats.items(), key=lambda item: -item[1][2])
+    for (filename, line, name), (primitive, calls, own, cumulative, callers) in ranked[:top]:
+        print(f"  {calls:>10} {own:>9.3f} {cumulative:>9.3f}  {_location(filename, line, name)}", file=out)
+
+    print(f"\nTop {top} allocation sites (peak traced {peak / 1e6:.1f} MB, {current / 1e6:.1f} MB at exit):",
+          file=out)
+    for statistic in snapshot.statistics("lineno")[:top]:
+        frame = statistic.traceback[0]
+        print(f"  {statistic.size / 1e6:>9.2f} MB {statistic.count:>9} blocks  "
+              f"{_short_path(frame.filename)}:{frame.lineno}", file=out)
+
+    print(f"\nCPU profile:         {prefix}.prof", file=out)
+    print(f"Allocation snapshot: {prefix}.tracemalloc", file=out)
+
+
+def _own_time_by_component(raw_stats):
+    components = {}
+    for (filename, line, name), (primitive, calls, own, cumulative, callers) in raw_stats.items():
+        component = _component(filename, name)
+        components[component] = components.get(component, 0.0) + own
+    return components
+
+
+def _component(filename, name):
+    if filename == "~":
+        if "pn_" in name:
+            return "proton"
+        if LOCK_WAITING.search(name):
+            return "waiting (locks)"
+        if WAITING.search(name):
+            return "waiting (I/O, sleeps)"
+        return "built-ins"
+    path = os.path.abspath(filename)
+    if os.path.dirname(path) == TOOLS_DIR:
+        return "tools"
+    parts = path.split(os.sep)
+    if "site-packages" in parts:
+        package = parts[parts.index("site-packages") + 1]
+        package = os.path.splitext(package)[0].lstrip("_")
+        return "proton" if "proton" in package else package
+    return "standard library"
+
+
+def _short_path(filename):
+    if os.path.dirname(os.path.abspath(filename)) == TOOLS_DIR:
+        return os.path.basename(filename)
+    parts = filename.split(os.sep)
+    if "site-packages" in parts:
+        return os.sep.join(parts[parts.index("site-packages") + 1:])
+    return filename
+
+
+def _location(filename, line, name):
+    if filename == "~":
+        return name
+    return f"{_short_path(filename)}:{line}({name})"
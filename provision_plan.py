@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+# Dependency-aware provisioning. Mixed create/bind/delete operations are
+# turned into a DAG: a bind needs its exchange and queue, an object with an
+# alternate exchange needs that exchange, and operations on the same object
+# keep their input order. The DAG is cut into layers (Kahn's algorithm) and
+# each layer is sent over several pipelined connections at once, so
+# unrelated objects never wait for each other.
+
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+from operations import load_operations, describe_operation
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+DEFAULT_CONNECTIONS = 4
+
+def _accesses(operation):
+    """
+    Returns ([objects written], [objects read]); objects are ("exchange", name)
+    or ("queue", name). Creates and deletes write their object, binds and
+    alternate-exchange references only read.
+    """
+    method = operation["method"]
+    arguments = operation["arguments"]
+    if method == "bind":
+        return [], [("exchange", arguments["exchange"]), ("queue", arguments["queue"])]
+    if method in ("create", "delete") and "type" in arguments and "name" in arguments:
+        reads = []
+        alternate = (arguments.get("properties") or {}).get("alternate-exchange")
+        if alternate:
+            reads.append(("exchange", alternate))
+        return [(arguments["type"], arguments["name"])], reads
+    return [], []
+
+def build_dag(operations):
+    """
+    Returns the dependencies of each operation as a list of sets of indexes
+    into 'operations'. Operations touching the same object keep their input
+    order, except that any number of reads can run side by side.
+    """
+    depends_on = [set() for _ in operations]
+    last_write = {}
+    reads_since_write = defaultdict(list)
+
+    for index, operation in enumerate(operations):
+        writes, reads = _accesses(operation)
+        for obj in reads:
+            if obj in last_write:
+                depends_on[index].add(last_write[obj])
+            reads_since_write[obj].append(index)
+        for obj in writes:
+            if obj in last_write:
+                depends_on[index].add(last_write[obj])
+            depends_on[index].update(reads_since_write.pop(obj, []))
+            last_write[obj] = index
+        depends_on[index].discard(index)
+    return depends_on
+
+def layers(depends_on):
+    """Kahn's algorithm: lists of operation indexes whose dependencies are all in earlier layers."""
+    dependents = defaultdict(list)
+    remaining = [len(deps) for deps in depends_on]
+    for index, deps in enumerate(depends_on):
+        for dep in deps:
+            dependents[dep].append(index)
+
+    layer = [index for index, count in enumerate(remaining) if count == 0]
+    result = []
+    while layer:
+        result.append(layer)
+        next_layer = []
+        for index in layer:
+            for dependent in dependents[index]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    next_layer.append(dependent)
+        layer = sorted(next_layer)
+    return result
+
+def run_layer(broker_url, operations, connections, window, quiet):
+    """Sends one layer over up to 'connections' connections; returns {index: error} for failures."""
+    from proton.reactor import Container
+    from qmf_bulk import QmfBulkManager
+
+    count = min(connections, len(operations))
+    parts = [operations[i::count] for i in range(count)]
+    handlers = [QmfBulkManager(broker_url, [operation for index, operation in part], window, quiet,
+                               label=f"conn-{i + 1}")
+                for i, part in enumerate(parts)]
+    Container(*handlers).run()
+
+    errors = {}
+    for handler, part in zip(handlers, parts):
+        for position, operation, details in handler.failed:
+            errors[part[position][0]] = details
+        for position, operation in handler.unsent():
+            errors[part[position][0]] = handler.error or "not sent"
+    return errors
+
+def run_plan(broker_url, operations, connections=DEFAULT_CONNECTIONS, window=200, quiet=True):
+    """
+    Runs the operations layer by layer. Operations that depend on a failed
+    one are not sent. Returns (succeeded, {index: error}, [skipped indexes]).
+    """
+    depends_on = build_dag(operations)
+    failed = {}
+    skipped = set()
+    succeeded = 0
+    for number, layer in enumerate(layers(depends_on), 1):
+        ready = []
+        for index in layer:
+            if any(dep in failed or dep in skipped for dep in depends_on[index]):
+                skipped.add(index)
+            else:
+                ready.append((index, operations[index]))
+        if not ready:
+            continue
+        start_time = time.monotonic()
+        errors = run_layer(broker_url, ready, connections, window, quiet)
+        failed.update(errors)
+        succeeded += len(ready) - len(errors)
+        print(f"Layer {number}: {len(ready)} operation(s), {len(errors)} failed "
+              f"in {time.monotonic() - start_time:.2f} seconds")
+    return succeeded, failed, sorted(skipped)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run mixed create/bind operations in dependency order, each ready layer in parallel.",
+        epilog="The operations file uses the qmf_bulk.py format."
+    )
+    parser.add_argument("file", nargs="?", default="-", help="Operations file ('-' or omitted for stdin).")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"Connections each layer is spread over (default: {DEFAULT_CONNECTIONS}).")
+    parser.add_argument("--window", type=int, default=200, help="Maximum requests in flight per connection.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the layers without sending anything.")
+    parser.add_argument("--verbose", action="store_true", help="Also print every successful operation.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    if opts.connections < 1 or opts.window < 1:
+        print("[ERROR] --connections and --window must be at least 1.")
+        sys.exit(1)
+
+    try:
+        operations = load_operations(opts.file)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    if opts.dry_run:
+        for number, layer in enumerate(layers(build_dag(operations)), 1):
+            print(f"Layer {number} ({len(layer)} operation(s)):")
+            for index in layer:
+                print(f"  {describe_operation(operations[index])}")
+        sys.exit(0)
+
+    start_time = time.monotonic()
+    try:
+        succeeded, failed, skipped = run_plan(opts.broker, operations, opts.connections, opts.window,
+                                              quiet=not opts.verbose)
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}")
+        sys.exit(1)
+    duration = time.monotonic() - start_time
+
+    for index in skipped:
+        print(f"[SKIPPED] {describe_operation(operations[index])}: a dependency failed")
+    print("\n--- Plan summary ---")
+    print(f"{succeeded} succeeded, {len(failed)} failed, {len(skipped)} skipped in {duration:.2f} seconds")
+    sys.exit(1 if failed or skipped else 0)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import argparse
+from proton import Message
+from proton.handlers import MessagingHandler
+from proton.reactor import Container
+
+from operations import load_operations, describe_operation, already_applied
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+MANAGEMENT_NODE_ADDRESS = "qmf.default.direct/broker"
+DEFAULT_WINDOW = 200
+
+def _error_text(body):
+    """The error text of a QMF '_exception' reply body."""
+    if isinstance(body, dict):
+        values = body.get('_values')
+        if isinstance(values, dict):
+            return values.get('error_text', "")
+    return str(body)
+
+class QmfBulkManager(MessagingHandler):
+    """
+    Sends many QMF '_method' requests over a single connection. Up to
+    'window' requests are kept in flight; replies are matched to their
+    request by correlation_id. With a journal (see journal.py), operations
+    it already confirmed are skipped and every reply is appended to it; an
+    operation re-sent after an unknown outcome counts as a success if the
+    broker refuses it because its effect is already in place. With
+    'ignore_existing', so does any create of an object that already exists.
+
+    Failures are kept in self.failed as (position, operation, details),
+    'position' being the operation's index in the input, so callers that
+    split a batch can map them back; unsent() does the same for the
+    operations that were never sent.
+    """
+
+    def __init__(self, broker_url, operations, window=DEFAULT_WINDOW, quiet=False, label=None, journal=None,
+                 ignore_existing=False):
+        # Reply credit matches the window so replies are never held back.
+        super(QmfBulkManager, self).__init__(prefetch=window)
+        self.broker_url = broker_url
+        self.journal = journal
+        self.ignore_existing = ignore_existing
+        self._remaining = enumerate(operations)
+        self._position = None
+        numbered = self._numbered()
+        self.operations = iter(journal.pending(numbered) if journal
+                               else ((operation, False) for operation in numbered))
+        self.window = window
+        self.quiet = quiet
+        self.label = label
+        self.succeeded = 0
+        self.already_applied = 0
+        self.failed = []
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._sender = None
+        self._receiver = None
+        self._connection = None
+        self._reply_to = None
+        self._in_flight = {}
+        self._next_id = 0
+        self._exhausted = False
+        self._unsent = None
+
+    def _numbered(self):
+        # The journal may pull several operations before it yields one, so
+        # the position of the one handed out is tracked here.
+        for position, operation in self._remaining:
+            self._position = position
+            yield operation
+
+    def on_start(self, event):
+        self.started_at = time.monotonic()
+        # Route this connection's events to this handler only, so several
+        # managers can share one Container.
+        self._connection = event.container.connect(self.broker_url, handler=self)
+        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
+        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
+
+    def on_link_opened(self, event):
+        if event.receiver == self._receiver and self._reply_to is None:
+            self._reply_to = self._receiver.remote_source.address
+            self._send_pending()
+
+    def on_sendable(self, event):
+        self._send_pending()
+
+    def _send_pending(self):
+        if self._reply_to is None:
+            return
+        while not self._exhausted and len(self._in_flight) < self.window and self._sender.credit > 0:
+            pending = next(self.operations, None)
+            if pending is None:
+                self._exhausted = True
+                break
+            operation, resent = pending
+            self._send_method_request(self._position, operation, resent)
+        self._close_if_done()
+
+    def _send_method_request(self, position, operation, resent=False):
+        correlation_id = str(self._next_id)
+        self._next_id += 1
+
+        msg = Message(
+            reply_to=self._reply_to,
+            correlation_id=correlation_id,
+            properties={'qmf.opcode': '_method'},
+            body={
+                '_method_name': operation["method"],
+                '_arguments': operation["arguments"]
+            }
+        )
+        self._in_flight[correlation_id] = (position, operation, resent)
+        self._sender.send(msg)
+
+    def on_message(self, event):
+        entry = self._in_flight.pop(event.message.correlation_id, None)
+        if entry is None:
+            print(f"[WARNING] Ignoring reply with unknown correlation_id: {event.message.correlation_id}")
+            self._send_pending()
+            return
+        position, operation, resent = entry
+
+        reply_props = event.message.properties
+        if reply_props and reply_props.get('qmf.opcode') == '_exception':
+            tolerated = resent or (self.ignore_existing and operation["method"] == "create")
+            if tolerated and already_applied(operation, _error_text(event.message.body)):
+                # Either the earlier, unanswered attempt went through after
+                # all, or the object was there before and that is allowed.
+                self.already_applied += 1
+                self._record_success(operation, " (already applied)")
+            else:
+                if self.journal:
+                    self.journal.record_failed(operation)
+                self._record_failure(position, operation, event.message.body)
+        else:
+            self._record_success(operation)
+        self._send_pending()
+
+    def _record_success(self, operation, note=""):
+        self.succeeded += 1
+        if self.journal:
+            self.journal.record_done(operation)
+        if not self.quiet:
+            print(f"{self._prefix()}[SUCCESS] {describe_operation(operation)}{note}")
+
+    def _prefix(self):
+        return f"[{self.label}] " if self.label else ""
+
+    def _record_failure(self, position, operation, details):
+        self.failed.append((position, operation, details))
+        print(f"{self._prefix()}[ERROR] {describe_operation(operation)}")
+        print(f"{self._prefix()}Details: {details}")
+
+    def unsent(self):
+        """
+        (position, operation) for each operation that was never sent, e.g.
+        after a transport error, in input order. Ones a journal had already
+        confirmed are not among them. Only meaningful once the run is over.
+        """
+        if self._unsent is None:
+            # What the iterator has not handed out yet never went on the wire.
+            self._unsent = [(position, operation) for position, operation in self._remaining
+                            if not (self.journal and self.journal.confirmed(operation))]
+        return self._unsent
+
+    def _close_if_done(self):
+        if self._exhausted and not self._in_flight and self._connection:
+            self._connection.close()
+            self._connection = None
+            self.finished_at = time.monotonic()
+
+    def _abandon_in_flight(self, reason):
+        for position, operation, resent in self._in_flight.values():
+            self._record_failure(position, operation, reason)
+        self._in_flight.clear()
+
+    def on_transport_error(self, event):
+        self.error = f"transport error: {event.transport.condition}"
+        print(f"{self._prefix()}[ERROR] Transport error: {event.transport.condition}")
+        self._abandon_in_flight("no reply received before the transport failed")
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+        self.finished_at = time.monotonic()
+
+    def on_disconnected(self, event):
+        if self._in_flight:
+            self.error = self.error or "connection closed before all replies were received"
+            print(f"\n{self._prefix()}[ERROR] Connection closed by broker before all replies were received.")
+            self._abandon_in_flight("no reply received before the connection closed")
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+
+
+def run_bulk(broker_url, operations, window=DEFAULT_WINDOW, quiet=False, journal=None, ignore_existing=False):
+    """Runs the operations and prints a summary. Returns the finished handler."""
+    handler = QmfBulkManager(broker_url, operations, window, quiet, journal=journal, ignore_existing=ignore_existing)
+    start_time = time.monotonic()
+    Container(handler).run()
+    duration = time.monotonic() - start_time
+
+    total = handler.succeeded + len(handler.failed)
+    rate = total / duration if duration > 0 else 0.0
+    unsent = handler.unsent()
+    print("\n--- Bulk summary ---")
+    print(f"{handler.succeeded} succeeded, {len(handler.failed)} failed, {len(unsent)} not sent "
+          f"in {duration:.2f} seconds ({rate:.0f} ops/sec)")
+    if journal and (journal.skipped or journal.resent):
+        print(f"Resumed from {journal.path}: {journal.skipped} skipped as already done, "
+              f"{journal.resent} with an unknown outcome sent again")
+    if handler.already_applied:
+        print(f"{handler.already_applied} of the succeeded were already in place on the broker")
+    return handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run many QMF create/bind operations over one connection.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=(
+            "Each input line is one operation:\n"
+            "  exchange <type> <name> [--durable] [--alternate-exchange <name>]\n"
+            "  queue <name> [--durable] [--auto-delete] [--alternate-exchange <name>]\n"
+            "  bind <exchange> <queue> <binding-key>\n"
+            "  {\"method\": \"create\", \"arguments\": {...}}\n"
+            "Blank lines and lines starting with '#' are ignored."
+        )
+    )
+
+    parser.add_argument("file", nargs="?", default="-", help="Operations file ('-' or omitted for stdin).")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Maximum number of requests in flight (default: {DEFAULT_WINDOW}).")
+    parser.add_argument("--quiet", action="store_true", help="Only print failures and the summary.")
+    parser.add_argument("--journal", metavar="<file>",
+                        help="Record completed operations here and skip the ones it already holds, "
+                             "so an interrupted run can be restarted.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    if opts.window < 1:
+        print("[ERROR] --window must be at least 1.")
+        sys.exit(1)
+
+    try:
+        operations = load_operations(opts.file)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    journal = None
+    if opts.journal:
+        from journal import Journal
+        journal = Journal(opts.journal)
+        if journal.completed:
+            print(f"Journal {opts.journal} holds {journal.completed} completed operation(s).")
+
+    try:
+        handler = run_bulk(opts.broker, operations, opts.window, opts.quiet, journal)
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}")
+        sys.exit(1)
+    finally:
+        if journal:
+            journal.close()
+
+    if handler.failed or handler.error or handler.unsent():
+        sys.exit(1)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import argparse
+from proton import Message
+from proton.handlers import MessagingHandler
+from proton.reactor import Container
+
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+MANAGEMENT_NODE_ADDRESS = "qmf.default.direct/broker"
+
+def query_request(class_name, reply_to, correlation_id):
+    """Builds a QMFv2 '_query_request' for all objects of one class."""
+    return Message(
+        reply_to=reply_to,
+        correlation_id=correlation_id,
+        properties={
+            'qmf.opcode': '_query_request',
+            'x-amqp-0-10.app-id': 'qmf2',
+            'method': 'request'
+        },
+        body={
+            '_what': 'OBJECT',
+            '_schema_id': {'_class_name': class_name}
+        }
+    )
+
+def is_partial(message):
+    """The broker splits large results; every message but the last carries 'partial'."""
+    return bool(message.properties and 'partial' in message.properties)
+
+def object_values(message):
+    """Returns the '_values' map of each object in a '_query_response'."""
+    if not isinstance(message.body, list):
+        return []
+    return [obj.get('_values', {}) for obj in message.body]
+
+def text(value):
+    """QMF strings may arrive as binary; return them as str."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+def ref_name(ref):
+    """Returns the object name from a QMF object id, e.g. the queue name of a 'queueRef'."""
+    if not ref:
+        return None
+    object_name = text(ref.get('_object_name', ''))
+    # org.apache.qpid.broker:<class>:<name>
+    parts = object_name.split(':', 2)
+    return parts[2] if len(parts) == 3 else None
+
+
+class QmfQueryManager(MessagingHandler):
+    """
+    Queries all objects of the given classes (e.g. 'exchange', 'queue',
+    'binding') in one connection. Each chunk of results is passed to
+    on_objects(class_name, values); by default they are collected in
+    self.objects.
+    """
+
+    def __init__(self, broker_url, class_names, on_objects=None):
+        super(QmfQueryManager, self).__init__()
+        self.broker_url = broker_url
+        self.class_names = list(class_names)
+        self.objects = {name: [] for name in self.class_names}
+        self.on_objects = on_objects or self._collect
+        self.error = None
+        self._sender = None
+        self._receiver = None
+        self._connection = None
+        self._pending = set()
+        self._request_sent = False
+
+    def _collect(self, class_name, values):
+        self.objects[class_name].extend(values)
+
+    def on_start(self, event):
+        self._connection = event.container.connect(self.broker_url)
+        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
+        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
+
+    def on_link_opened(self, event):
+        if event.receiver == self._receiver and not self._request_sent:
+            reply_to = self._receiver.remote_source.address
+            for class_name in self.class_names:
+                self._sender.send(query_request(class_name, reply_to, class_name))
+                self._pending.add(class_name)
+            self._request_sent = True
+
+    def on_message(self, event):
+        class_name = event.message.correlation_id
+        if class_name not in self._pending:
+            return
+
+        reply_props = event.message.properties
+        if reply_props and reply_props.get('qmf.opcode') == '_exception':
+            self.error = f"query for '{class_name}' failed: {event.message.body}"
+            self._connection.close()
+            return
+
+        self.on_objects(class_name, object_values(event.message))
+        if not is_partial(event.message):
+            self._pending.discard(class_name)
+            if not self._pending:
+                self._connection.close()
+
+    def on_transport_error(self, event):
+        self.error = f"transport error: {event.transport.condition}"
+        if self._connection:
+            self._connection.close()
+
+    def on_disconnected(self, event):
+        if self._pending and not self.error:
+            self.error = "connection closed by broker before the query completed"
+
+
+def query_objects(broker_url, class_names):
+    """Runs the query and returns {class_name: [values, ...]}. Raises RuntimeError on failure."""
+    handler = QmfQueryManager(broker_url, class_names)
+    Container(handler).run()
+    if handler.error:
+        raise RuntimeError(handler.error)
+    return handler.objects
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query QMF objects from a Qpid C++ broker and print them as JSON.")
+    parser.add_argument("class_names", nargs="+", help="QMF classes to query (e.g. exchange queue binding).")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    try:
+        objects = query_objects(opts.broker, opts.class_names)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    print(json.dumps(objects, indent=2, default=lambda value: text(value) if isinstance(value, bytes) else str(value)))
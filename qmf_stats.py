@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+# Streams queue and exchange statistics from a Qpid C++ broker. One
+# connection stays open and a '_query_request' per class is sent every
+# interval. Each object's last counters are kept in a small fixed-size
+# record that is updated in place, so a poll allocates only for objects
+# whose counters or rates moved; only those are written out, with rates for
+# the cumulative counters and deltas for the gauges. A counter that stops
+# moving is written once more, with a rate of 0.
+
+import sys
+import json
+import time
+import argparse
+from proton.handlers import MessagingHandler
+from proton.reactor import Container
+
+from qmf_query import MANAGEMENT_NODE_ADDRESS, query_request, is_partial, object_values, text
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+DEFAULT_INTERVAL = 1.0
+METRIC_PREFIX = "qpid"
+RATE = "rate"
+GAUGE = "gauge"
+# (field, kind): cumulative counters get a per-second rate, gauges a delta.
+COUNTERS = {
+    "queue": (
+        ("msgTotalEnqueues", RATE),
+        ("msgTotalDequeues", RATE),
+        ("msgDepth", GAUGE),
+        ("byteDepth", GAUGE),
+        ("consumerCount", GAUGE)
+    ),
+    "exchange": (
+        ("msgReceives", RATE),
+        ("msgRoutes", RATE),
+        ("msgDrops", RATE),
+        ("byteReceives", RATE)
+    )
+}
+
+
+class ObjectStats(object):
+    """Last seen counters of one queue or exchange."""
+
+    __slots__ = ("values", "rates", "sampled_at", "seen")
+
+    def __init__(self, size):
+        self.values = [None] * size
+        # Last rate written per field; 0 until one has been.
+        self.rates = [0.0] * size
+        self.sampled_at = None
+        self.seen = 0
+
+
+class NdjsonWriter(object):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def changed(self, timestamp, class_name, name, fields):
+        """'fields' is a list of (field, kind, value, change); change is None on first sight."""
+        record = {"ts": timestamp, "class": class_name, "name": name}
+        for field, kind, value, change in fields:
+            record[field] = value
+            if change is not None:
+                record[f"{field}_per_sec" if kind == RATE else f"{field}_delta"] = change
+        self.stream.write(json.dumps(record) + "\n")
+
+    def removed(self, timestamp, class_name, name):
+        self.stream.write(json.dumps({"ts": timestamp, "class": class_name, "name": name, "removed": True}) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+
+def _label_value(value):
+    """Escapes a label value for the Prometheus exposition format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusWriter(object):
+    """
+    Exposition-format samples with timestamps, only for series that changed.
+    Fields the broker did not report are left out.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def changed(self, timestamp, class_name, name, fields):
+        millis = int(timestamp * 1000)
+        labels = f'{class_name}="{_label_value(name)}"'
+        lines = []
+        for field, kind, value, change in fields:
+            if value is None:
+                continue
+            lines.append(f"{METRIC_PREFIX}_{class_name}_{field}{{{labels}}} {value} {millis}")
+            if change is not None and kind == RATE:
+                lines.append(f"{METRIC_PREFIX}_{class_name}_{field}_per_second{{{labels}}} {change} {millis}")
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+
+    def removed(self, timestamp, class_name, name):
+        # Prometheus has no deletion marker; the series simply go stale.
+        pass
+
+    def flush(self):
+        self.stream.flush()
+
+
+class StatsCollector(MessagingHandler):
+    """
+    Polls every 'interval' seconds over one connection. A poll that is still
+    running when the next one is due is not doubled up; the later poll is
+    skipped and counted in self.skipped.
+    """
+
+    def __init__(self, broker_url, class_names, writer, interval=DEFAULT_INTERVAL, polls=None):
+        super(StatsCollector, self).__init__(prefetch=1000)
+        self.broker_url = broker_url
+        self.class_names = list(class_names)
+        self.writer = writer
+        self.interval = interval
+        self.polls = polls
+        self.completed = 0
+        self.skipped = 0
+        self.error = None
+        self.tables = {class_name: {} for class_name in self.class_names}
+        self._fields = {class_name: COUNTERS[class_name] for class_name in self.class_names}
+        self._container = None
+        self._connection = None
+        self._sender = None
+        self._receiver = None
+        self._reply_to = None
+        self._poll = 0
+        self._pending = set()
+        self._timer = None
+
+    def on_start(self, event):
+        self._container = event.container
+        self._connection = event.container.connect(self.broker_url, handler=self)
+        self._sender = event.container.create_sender(self._connection, MANAGEMENT_NODE_ADDRESS)
+        self._receiver = event.container.create_receiver(self._connection, None, dynamic=True)
+
+    def on_link_opened(self, event):
+        # Also fires again after a reconnect, possibly with a new reply address.
+        if event.receiver == self._receiver:
+            self._reply_to = self._receiver.remote_source.address
+            # A poll sent before an outage gets no replies; start a new one.
+            self._pending.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+            self._send_poll()
+
+    def on_timer_task(self, event):
+        self._timer = None
+        if self._reply_to is None:
+            return  # the reply link is down; on_link_opened polls again
+        if self._pending:
+            self.skipped += 1
+            self._schedule()
+        else:
+            self._send_poll()
+
+    def _schedule(self):
+        self._timer = self._container.schedule(self.interval, self)
+
+    def _send_poll(self):
+        self._poll += 1
+        for class_name in self.class_names:
+            self._sender.send(query_request(class_name, self._reply_to, f"{class_name}:{self._poll}"))
+            self._pending.add(class_name)
+        self._schedule()
+
+    def on_message(self, event):
+        message = event.message
+        class_name, _, poll = str(message.correlation_id).partition(":")
+        if class_name not in self._pending or poll != str(self._poll):
+            return  # a late reply to a poll that was abandoned
+
+        reply_props = message.properties
+        if reply_props and reply_props.get('qmf.opcode') == '_exception':
+            self.error = f"query for '{class_name}' failed: {message.body}"
+            self.stop()
+            return
+
+        self._update(class_name, object_values(message))
+        if not is_partial(message):
+            self._pending.discard(class_name)
+            self._sweep(class_name)
+            if not self._pending:
+                self.completed += 1
+                self.writer.flush()
+                if self.polls is not None and self.completed >= self.polls:
+                    self.stop()
+
+    def _update(self, class_name, objects):
+        table = self.tables[class_name]
+        fields = self._fields[class_name]
+        now = time.monotonic()
+        timestamp = time.time()
+        for values in objects:
+            name = text(values.get("name"))
+            stats = table.get(name)
+            first = stats is None
+            if first:
+                stats = table[name] = ObjectStats(len(fields))
+            stats.seen = self._poll
+            elapsed = now - stats.sampled_at if not first else None
+            changed = None
+            for index, (field, kind) in enumerate(fields):
+                value = values.get(field)
+                previous = stats.values[index]
+                change = None
+                if not first and value is not None and previous is not None:
+                    if kind == RATE:
+                        change = (value - previous) / elapsed if elapsed else 0.0
+                    else:
+                        change = value - previous
+                if value == previous and (kind != RATE or change == stats.rates[index]):
+                    continue
+                stats.values[index] = value
+                if kind == RATE and change is not None:
+                    stats.rates[index] = change
+                if changed is None:
+                    changed = []
+                changed.append((field, kind, value, change))
+            stats.sampled_at = now
+            if changed:
+                self.writer.changed(timestamp, class_name, name, changed)
+
+    def _sweep(self, class_name):
+        """Drops and reports objects that were missing from the poll that just finished."""
+        table = self.tables[class_name]
+        gone = [name for name, stats in table.items() if stats.seen != self._poll]
+        if gone:
+            timestamp = time.time()
+            for name in gone:
+                del table[name]
+                self.writer.removed(timestamp, class_name, name)
+
+    def on_disconnected(self, event):
+        # Replies for the current poll will not come, and nothing is sent
+        # until the reply link is open again.
+        self._reply_to = None
+        self._pending.clear()
+
+    def on_transport_error(self, event):
+        print(f"[WARNING] Transport error: {event.transport.condition}; reconnecting...", file=sys.stderr)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._connection:
+            self._connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stream changed queue and exchange statistics from a Qpid C++ broker.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("class_names", nargs="*", default=["queue", "exchange"],
+                        help=f"Classes to poll, from {', '.join(sorted(COUNTERS))} (default: queue exchange).")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls (default: {DEFAULT_INTERVAL}).")
+    parser.add_argument("--polls", type=int, help="Stop after this many polls (default: run until interrupted).")
+    parser.add_argument("--format", choices=["ndjson", "prometheus"], default="ndjson",
+                        help="Output format (default: ndjson).")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+    unknown = set(opts.class_names) - set(COUNTERS)
+    if unknown:
+        parser.error(f"unsupported class(es): {', '.join(sorted(unknown))}")
+
+    writer = (PrometheusWriter if opts.format == "prometheus" else NdjsonWriter)(sys.stdout)
+    collector = StatsCollector(opts.broker, opts.class_names, writer, opts.interval, opts.polls)
+    try:
+        Container(collector).run()
+    except KeyboardInterrupt:
+        pass
+    print(f"{collector.completed} polls, {collector.skipped} skipped", file=sys.stderr)
+    if collector.error:
+        print(f"[ERROR] {collector.error}", file=sys.stderr)
+        sys.exit(1)
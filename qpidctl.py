@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+# One entry point for the management tools. Only the standard library,
+# operations.py and profiling.py are imported up front; the backend for
+# --transport (proton, pika or requests) is imported when a command actually
+# runs, so --help, --dry-run and argument errors stay fast. startup_bench.py
+# keeps it that way.
+
+import sys
+import argparse
+
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+DEFAULT_TRANSPORT = "qmf"
+TRANSPORT_BROKERS = {
+    "qmf": BROKER_URL,
+    "mgmt": "localhost:5672",
+    "amqp091": "localhost:5672",
+    "rest": "http://localhost:8080"
+}
+# What each transport imports when it runs; startup_bench.py times these.
+BACKEND_MODULES = {
+    "qmf": ("proton", "create_exchange"),
+    "mgmt": ("proton", "create_exchange_mgmt"),
+    "amqp091": ("pika", "pika_bulk"),
+    "rest": ("requests", "rest_create_exchange")
+}
+
+
+def run_qmf(broker_url, operation):
+    """Sends one QMF method request, through the management daemon when QPID_MGMT_SOCKET is set."""
+    from mgmt_client import daemon_socket, qmf_call
+
+    socket_path = daemon_socket()
+    if socket_path:
+        response = qmf_call(socket_path, broker_url, operation["method"], operation["arguments"])
+        if response["ok"]:
+            print("[SUCCESS] Broker response received. Operation should be complete.")
+        else:
+            print(f"[ERROR] {response.get('error') or response.get('body')}")
+        return 0 if response["ok"] else 1
+
+    from proton.reactor import Container
+    from mgmt_handlers import QmfManager
+    from mgmt_metrics import export_from_env
+
+    handler = QmfManager(broker_url, operation["method"], operation["arguments"])
+    Container(handler).run()
+    export_from_env()
+    return 0 if handler._reply_received and handler.exception is None else 1
+
+
+def run_mgmt(broker_url, operation):
+    """Sends one AMQP 1.0 $management request; only creating and deleting exchanges and queues is supported."""
+    from operations import to_management_request
+
+    if operation["method"] == "bind":
+        raise ValueError("'bind' is not supported over the mgmt transport, use qmf or amqp091")
+    request = to_management_request(operation)
+
+    from mgmt_client import daemon_socket, management_call
+
+    socket_path = daemon_socket()
+    if socket_path:
+        response = management_call(socket_path, broker_url, *request)
+        if response["ok"]:
+            print(f"[SUCCESS] {request[1]} '{request[2]}': {request[0]} done")
+        elif "error" in response:
+            print(f"[ERROR] {response['error']}")
+        else:
+            print(f"[ERROR] Operation failed with status {response['properties'].get('statusCode')}: "
+                  f"{response['properties'].get('statusDescription')}")
+        return 0 if response["ok"] else 1
+
+    from proton.reactor import Container
+    from mgmt_handlers import AmqpManager
+    from mgmt_metrics import export_from_env
+
+    handler = AmqpManager(broker_url, *request)
+    Container(handler).run()
+    export_from_env()
+    return 0 if handler.status_code is not None and 200 <= handler.status_code < 300 else 1
+
+
+def run_amqp091(broker_url, operation):
+    """Declares, binds or deletes over AMQP 0-9-1 with pika."""
+    import pika
+    from operations import to_amqp091_call
+    from pika_bulk import connection_parameters
+
+    method, arguments = to_amqp091_call(operation)
+    connection = None
+    try:
+        connection = pika.BlockingConnection(connection_parameters(broker_url))
+        getattr(connection.channel(), method)(**arguments)
+    except pika.exceptions.AMQPConnectionError as e:
+        print(f"[ERROR] Could not connect to {broker_url}. Is qpidd running?")
+        print(f"Details: {e}")
+        return 1
+    except pika.exceptions.AMQPChannelError as e:
+        # A refused declare or bind closes the channel (ChannelClosedByBroker).
+        print(f"[ERROR] Broker responded: {e}")
+        return 1
+    finally:
+        if connection and connection.is_open:
+            connection.close()
+
+    print("[SUCCESS] Operation complete.")
+    return 0
+
+
+def run_rest(broker_url, operation):
+    """Creates an exchange through the REST API; nothing else is available over REST."""
+    arguments = operation["arguments"]
+    if operation["method"] != "create" or arguments["type"] != "exchange":
+        raise ValueError("only exchange creation is supported over the rest transport")
+
+    from rest_create_exchange import create_exchange_rest
+
+    properties = arguments["properties"]
+    created = create_exchange_rest(arguments["name"], properties["exchange-type"],
+                                   {"durable": properties.get("durable", False)}, base_url=broker_url)
+    return 0 if created else 1
+
+
+TRANSPORTS = {
+    "qmf": run_qmf,
+    "mgmt": run_mgmt,
+    "amqp091": run_amqp091,
+    "rest": run_rest
+}
+
+
+def _run_operation(opts, operation):
+    from operations import describe_operation
+
+    broker_url = opts.broker or TRANSPORT_BROKERS[opts.transport]
+    if opts.dry_run:
+        print(f"[{opts.transport} {broker_url}] {describe_operation(operation)}")
+        return 0
+    return TRANSPORTS[opts.transport](broker_url, operation)
+
+def cmd_exchange_create(opts):
+    from operations import exchange_create
+    return _run_operation(opts, exchange_create(opts.name, opts.exchange_type, opts.durable, opts.alternate_exchange))
+
+def cmd_queue_create(opts):
+    from operations import queue_create
+    return _run_operation(opts, queue_create(opts.name, opts.durable, opts.auto_delete, opts.alternate_exchange))
+
+def cmd_delete(opts):
+    from operations import delete
+    return _run_operation(opts, delete(opts.object_type, opts.name))
+
+def cmd_bind(opts):
+    from operations import bind
+    return _run_operation(opts, bind(opts.exchange, opts.queue, opts.key))
+
+
+def cmd_apply(opts):
+    """Creates only the parts of a topology file that the broker is missing."""
+    import topology
+    from qmf_query import query_objects
+    from qmf_bulk import run_bulk
+
+    if opts.transport != "qmf":
+        raise ValueError("apply needs the qmf transport")
+    if opts.window < 1:
+        raise ValueError("--window must be at least 1")
+    broker_url = opts.broker or BROKER_URL
+
+    desired = topology.load_topology(opts.topology)
+
+    print(f"Querying existing exchanges, queues and bindings on {broker_url}...")
+    live = topology.live_topology(query_objects(broker_url, ["exchange", "queue", "binding"]))
+
+    planned, drift = topology.plan_changes(desired, live, opts.recreate_changed)
+
+    for object_type, name, current, spec in drift:
+        print(f"[WARNING] {object_type} '{name}' differs from the topology file and was left alone.")
+        print(f"  broker: {current}")
+        print(f"  wanted: {spec}")
+    if drift:
+        print("[HINT] Use --recreate-changed to delete and re-create changed objects.")
+
+    print(f"{len(planned)} operation(s) needed.")
+    if opts.dry_run:
+        from operations import describe_operation
+        for operation in planned:
+            print(f"  {describe_operation(operation)}")
+        return 0
+    if not planned:
+        return 0
+
+    handler = run_bulk(broker_url, planned, opts.window, quiet=True)
+    return 1 if handler.failed or handler.error or handler.unsent() else 0
+
+
+def cmd_export(opts):
+    """Streams the broker's topology to a record file."""
+    import topology
+
+    if opts.transport != "qmf":
+        raise ValueError("export needs the qmf transport")
+    broker_url = opts.broker or BROKER_URL
+
+    stream = topology.open_records(opts.file, "w")
+    try:
+        counts = topology.export_topology(broker_url, stream)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    print(f"Exported {counts['exchange']} exchange(s), {counts['queue']} queue(s) and "
+          f"{counts['binding']} binding(s) from {broker_url}.", file=sys.stderr if opts.file == "-" else sys.stdout)
+    return 0
+
+
+def cmd_import(opts):
+    """Replays a record file written by 'export' through pipelined create/bind requests."""
+    import topology
+    from qmf_bulk import run_bulk
+
+    if opts.transport != "qmf":
+        raise ValueError("import needs the qmf transport")
+    if opts.window < 1:
+        raise ValueError("--window must be at least 1")
+    broker_url = opts.broker or BROKER_URL
+
+    journal = None
+    if opts.journal:
+        from journal import Journal
+        journal = Journal(opts.journal)
+
+    stream = topology.open_records(opts.file, "r")
+    try:
+        handler = run_bulk(broker_url, topology.record_operations(stream), opts.window, quiet=True,
+                           journal=journal, ignore_existing=opts.ignore_existing)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if journal:
+            journal.close()
+    return 1 if handler.failed or handler.error or handler.unsent() else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Manage a Qpid C++ broker.")
+    parser.add_argument("--broker", help="Broker URL (default depends on --transport: "
+                        + ", ".join(f"{name} {url}" for name, url in TRANSPORT_BROKERS.items()) + ").")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default=DEFAULT_TRANSPORT,
+                        help=f"Protocol used to reach the broker (default: {DEFAULT_TRANSPORT}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dry-run", action="store_true", help="Print the operation without sending it.")
+
+    exchange_parser = subparsers.add_parser("exchange", help="Create or delete an exchange.")
+    exchange_actions = exchange_parser.add_subparsers(dest="action", required=True)
+    create_parser = exchange_actions.add_parser("create", parents=[common], help="Create an exchange.")
+    create_parser.add_argument("exchange_type", help="The type of the exchange (e.g., direct, topic, fanout, headers).")
+    create_parser.add_argument("name", help="The name of the exchange.")
+    create_parser.add_argument("--durable", action="store_true", help="Make the exchange durable.")
+    create_parser.add_argument("--alternate-exchange", metavar="<name>",
+                               help="Name of an alternate exchange for unroutable messages.")
+    create_parser.set_defaults(func=cmd_exchange_create)
+    delete_parser = exchange_actions.add_parser("delete", parents=[common], help="Delete an exchange.")
+    delete_parser.add_argument("name", help="The name of the exchange.")
+    delete_parser.set_defaults(func=cmd_delete, object_type="exchange")
+
+    queue_parser = subparsers.add_parser("queue", help="Create or delete a queue.")
+    queue_actions = queue_parser.add_subparsers(dest="action", required=True)
+    create_parser = queue_actions.add_parser("create", parents=[common], help="Create a queue.")
+    create_parser.add_argument("name", help="The name of the queue.")
+    create_parser.add_argument("--durable", action="store_true", help="Make the queue durable.")
+    create_parser.add_argument("--auto-delete", action="store_true", help="Delete the queue when no longer in use.")
+    create_parser.add_argument("--alternate-exchange", metavar="<name>",
+                               help="Name of an alternate exchange for rejected messages.")
+    create_parser.set_defaults(func=cmd_queue_create)
+    delete_parser = queue_actions.add_parser("delete", parents=[common], help="Delete a queue.")
+    delete_parser.add_argument("name", help="The name of the queue.")
+    delete_parser.set_defaults(func=cmd_delete, object_type="queue")
+
+    bind_parser = subparsers.add_parser("bind", parents=[common], help="Bind a queue to an exchange.")
+    bind_parser.add_argument("exchange", help="The exchange to bind to.")
+    bind_parser.add_argument("queue", help="The queue to bind.")
+    bind_parser.add_argument("key", nargs="?", default="", help="The binding key (default: empty).")
+    bind_parser.set_defaults(func=cmd_bind)
+
+    apply_parser = subparsers.add_parser("apply", parents=[common], help="Make the broker match a topology file.")
+    apply_parser.add_argument("topology", help="Topology file (YAML, or JSON if it ends in .json).")
+    apply_parser.add_argument("--recreate-changed", action="store_true",
+                              help="Delete and re-create exchanges and queues whose properties differ.")
+    apply_parser.add_argument("--window", type=int, default=200, help="Maximum number of requests in flight.")
+    apply_parser.set_defaults(func=cmd_apply)
+
+    export_parser = subparsers.add_parser("export", help="Stream the broker's exchanges, queues and bindings to a file.")
+    export_parser.add_argument("file", help="Output file: one JSON record per line, gzip if it ends in .gz, '-' for stdout.")
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser("import", help="Re-create the topology saved by 'export'.")
+    import_parser.add_argument("file", help="File written by 'export' ('-' for stdin).")
+    import_parser.add_argument("--ignore-existing", action="store_true",
+                               help="Do not fail on exchanges and queues that already exist.")
+    import_parser.add_argument("--window", type=int, default=200, help="Maximum number of requests in flight.")
+    import_parser.add_argument("--journal", metavar="<file>",
+                               help="Resume journal (see qmf_bulk.py --journal).")
+    import_parser.set_defaults(func=cmd_import)
+
+    add_profile_arguments(parser)
+    return parser
+
+
+if __name__ == "__main__":
+    opts = build_parser().parse_args()
+    start_profiling(opts)
+    try:
+        sys.exit(opts.func(opts))
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
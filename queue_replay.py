@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+
+# Drains a queue's backlog to a file and replays the file into an exchange
+# later, for incident recovery.
+#
+# drain consumes with a large credit window and accepts messages in batches,
+# each batch only after it has been written out, so a crash leaves the
+# unaccepted messages on the broker rather than losing them. If the
+# connection fails, the unaccepted messages are cut from the file again,
+# since the broker will deliver them to the next consumer. It stops at
+# --count messages or once the queue has been idle for --idle seconds.
+#
+# The file is the magic bytes below followed by one record per message: a
+# 4 byte big-endian length and the message as encoded by Message.encode().
+# replay maps the file into memory and streams each record straight from
+# the mapping onto the link, without decoding it or copying it first.
+
+import os
+import sys
+import mmap
+import time
+import struct
+import argparse
+from proton.handlers import MessagingHandler
+from proton.reactor import Container
+
+from batch_sender import BatchSender, Ticker, Progress
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5672"
+MAGIC = b"QPIDMSG1"
+LENGTH = struct.Struct(">I")
+DEFAULT_CREDIT = 5000
+DEFAULT_SETTLE_BATCH = 500
+DEFAULT_SEND_BATCH = 500
+
+
+class QueueDrainer(MessagingHandler):
+    """Consumes a queue into a message file, accepting each batch once it has been written."""
+
+    def __init__(self, broker_url, queue, path, credit, settle_batch, count, idle, progress, fsync):
+        super(QueueDrainer, self).__init__(prefetch=min(credit, count) if count else credit, auto_accept=False)
+        self.broker_url = broker_url
+        self.queue = queue
+        self.path = path
+        self.settle_batch = settle_batch
+        self.count = count
+        self.idle = idle
+        self.fsync = fsync
+        self.progress = Progress("Drained", progress)
+        self.received = 0
+        self.bytes = 0
+        self.error = None
+        self.started_at = None
+        self.last_at = None
+        self._file = None
+        self._receiver = None
+        self._unsettled = []
+        # End of the last record that was accepted.
+        self._accepted_offset = len(MAGIC)
+        self._ticker = Ticker(self)
+        self._finished = False
+
+    def on_start(self, event):
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        connection = event.container.connect(self.broker_url, handler=self)
+        self._receiver = event.container.create_receiver(connection, self.queue)
+        self.started_at = self.last_at = time.perf_counter()
+        self._ticker.start(event.container)
+
+    def on_message(self, event):
+        if self._finished:
+            return  # prefetched past --count; released when the link closes
+        data = event.message.encode()
+        self._file.write(LENGTH.pack(len(data)))
+        self._file.write(data)
+        self._unsettled.append(event.delivery)
+        self.received += 1
+        self.bytes += len(data)
+        self.last_at = time.perf_counter()
+        if len(self._unsettled) >= self.settle_batch:
+            self._settle()
+        if self.count and self.received >= self.count:
+            self._finish()
+
+    def _settle(self):
+        """Accepts everything written so far, once it is out of our buffers."""
+        if not self._unsettled:
+            return
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        for delivery in self._unsettled:
+            self.accept(delivery)
+        self._unsettled = []
+        self._accepted_offset = self._file.tell()
+
+    def _discard_unsettled(self):
+        """
+        Cuts the messages that were written but not accepted from the file.
+        The broker delivers them again to the next consumer, so keeping them
+        would replay them twice.
+        """
+        if not self._unsettled:
+            return
+        self._file.flush()
+        self.bytes -= self._file.tell() - self._accepted_offset - LENGTH.size * len(self._unsettled)
+        self.received -= len(self._unsettled)
+        self._file.truncate(self._accepted_offset)
+        self._file.seek(self._accepted_offset)
+        self._unsettled = []
+
+    def tick(self, now):
+        # A partial batch is not left waiting for messages that may never come.
+        self._settle()
+        self.progress.update(now, self.received)
+        if now - self.last_at >= self.idle:
+            print(f"Queue '{self.queue}' idle for {self.idle:g} seconds, stopping.")
+            self._finish()
+            return False
+        return True
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        self._settle()
+        self._ticker.stop()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._receiver.connection.close()
+
+    def on_link_error(self, event):
+        self.error = f"Link error: {event.link.remote_condition}"
+        print(f"[ERROR] {self.error}")
+        # The link is gone, so the unaccepted messages can no longer be
+        # accepted; they stay on the broker and come out of the file.
+        self._discard_unsettled()
+        self._finish()
+
+    def on_transport_error(self, event):
+        self.error = f"Transport error: {event.transport.condition}"
+        print(f"[ERROR] {self.error}")
+        self._discard_unsettled()
+        self._finish()
+
+
+class MessageFile(object):
+    """A message file mapped read-only; records are memoryview slices of the mapping, not copies."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size < len(MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not a message file")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a message file")
+        self._view = memoryview(self._map)
+        self.truncated = False
+
+    def count(self):
+        """Number of complete records; only the length prefixes are read."""
+        offset, end, count = len(MAGIC), len(self._map), 0
+        while offset + LENGTH.size <= end:
+            (length,) = LENGTH.unpack_from(self._map, offset)
+            offset += LENGTH.size + length
+            if offset > end:
+                break
+            count += 1
+        return count
+
+    def records(self):
+        """Yields each encoded message; a record cut short at the end of the file (a crashed drain) is dropped."""
+        offset, end = len(MAGIC), len(self._map)
+        while offset + LENGTH.size <= end:
+            (length,) = LENGTH.unpack_from(self._map, offset)
+            start = offset + LENGTH.size
+            offset = start + length
+            if offset > end:
+                self.truncated = True
+                return
+            yield self._view[start:offset]
+        self.truncated = offset != end
+
+    def close(self):
+        # The mapping can only be closed once no slices of it are left.
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        self._map.close()
+        self._file.close()
+
+
+class QueueReplayer(BatchSender):
+    """Streams the records of a message file to an address, at most 'batch' per wakeup."""
+
+    def __init__(self, broker_url, address, message_file, total, batch, presettled, progress):
+        super(QueueReplayer, self).__init__(broker_url, address, batch, presettled, self._stream_record)
+        self.total = total
+        self.progress = Progress("Replayed", progress, total)
+        self.error = None
+        self._records = message_file.records()
+        self._ticker = Ticker(self)
+
+    def on_start(self, event):
+        super(QueueReplayer, self).on_start(event)
+        self._ticker.start(event.container)
+
+    def _stream_record(self, sender):
+        data = next(self._records, None)
+        if data is None:
+            return None
+        delivery = sender.delivery(str(self.sent))
+        sender.stream(data)
+        sender.advance()
+        return delivery
+
+    def tick(self, now):
+        self.progress.update(now, self.sent)
+        return self.finished_at is None
+
+    def _finish(self):
+        if self.finished_at is None:
+            self._ticker.stop()
+            self._records.close()
+        super(QueueReplayer, self)._finish()
+
+    def on_link_error(self, event):
+        self.error = f"Link error: {event.link.remote_condition}"
+        print(f"[ERROR] {self.error}")
+        self._finish()
+
+    def on_transport_error(self, event):
+        self.error = f"Transport error: {event.transport.condition}"
+        print(f"[ERROR] {self.error}")
+        self._finish()
+
+
+def drain(opts):
+    handler = QueueDrainer(opts.broker, opts.queue, opts.file, opts.credit, opts.settle_batch, opts.count,
+                           opts.idle, opts.progress, opts.fsync)
+    Container(handler).run()
+    duration = (handler.last_at - handler.started_at) if handler.started_at else 0.0
+    rate = handler.received / duration if duration > 0 else 0.0
+    print("\n--- Drain summary ---")
+    print(f"{handler.received} messages ({handler.bytes / 1e6:.1f} MB) from '{opts.queue}' to {opts.file} "
+          f"in {duration:.2f} seconds ({rate:.0f} msgs/sec)")
+    return handler.error is None
+
+def replay(opts):
+    message_file = MessageFile(opts.file)
+    try:
+        total = message_file.count()
+        handler = QueueReplayer(opts.broker, opts.address, message_file, total, opts.batch, opts.presettled,
+                                opts.progress)
+        start = time.perf_counter()
+        Container(handler).run()
+        duration = (handler.finished_at or time.perf_counter()) - start
+        truncated = message_file.truncated
+    finally:
+        message_file.close()
+    rate = handler.sent / duration if duration > 0 else 0.0
+    print("\n--- Replay summary ---")
+    if truncated:
+        print("[WARNING] The file ends with an incomplete record, which was skipped.")
+    confirmed = "pre-settled" if opts.presettled else f"{handler.confirmed} accepted, {handler.rejected} not accepted"
+    print(f"{handler.sent}/{total} messages to '{opts.address}' ({confirmed}) "
+          f"in {duration:.2f} seconds ({rate:.0f} msgs/sec)")
+    return handler.error is None and handler.rejected == 0 and handler.sent == total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drain a queue to a file, or replay such a file into an exchange or queue."
+    )
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+    parser.add_argument("--progress", type=float, default=5.0,
+                        help="Seconds between progress lines, 0 for none (default: 5).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    drain_parser = commands.add_parser("drain", help="Consume a queue's messages into a file.")
+    drain_parser.add_argument("queue", help="Queue to drain.")
+    drain_parser.add_argument("file", help="Message file to write (overwritten).")
+    drain_parser.add_argument("--credit", type=int, default=DEFAULT_CREDIT,
+                              help=f"Messages of prefetch (default: {DEFAULT_CREDIT}).")
+    drain_parser.add_argument("--settle-batch", type=int, default=DEFAULT_SETTLE_BATCH,
+                              help=f"Messages written before they are accepted together (default: {DEFAULT_SETTLE_BATCH}).")
+    drain_parser.add_argument("--count", type=int, default=0, help="Stop after this many messages (default: all).")
+    drain_parser.add_argument("--idle", type=float, default=5.0,
+                              help="Stop once no message has arrived for this many seconds (default: 5).")
+    drain_parser.add_argument("--fsync", action="store_true",
+                              help="fsync the file before accepting each batch, not only at the end.")
+
+    replay_parser = commands.add_parser("replay", help="Send the messages of a file to an address.")
+    replay_parser.add_argument("file", help="Message file written by drain.")
+    replay_parser.add_argument("address", help="Exchange or queue to send to.")
+    replay_parser.add_argument("--batch", type=int, default=DEFAULT_SEND_BATCH,
+                               help=f"Messages sent per reactor wakeup (default: {DEFAULT_SEND_BATCH}).")
+    replay_parser.add_argument("--presettled", action="store_true",
+                               help="Send pre-settled (at most once) instead of waiting for the broker to accept.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    if opts.command == "drain" and (opts.credit < 1 or opts.settle_batch < 1):
+        parser.error("--credit and --settle-batch must be at least 1")
+    if opts.command == "replay" and opts.batch < 1:
+        parser.error("--batch must be at least 1")
+
+    try:
+        ok = drain(opts) if opts.command == "drain" else replay(opts)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}")
+        sys.exit(1)
+    sys.exit(0 if ok else 1)
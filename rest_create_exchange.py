@@ -1,24 +1,34 @@
 #!/usr/bin/env python3
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import time
 import argparse
 import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import add_profile_arguments, start_profiling
 
 BROKER_REST_URL = "http://localhost:8080"  # Default REST management port
+DEFAULT_WORKERS = 16
+
+def _put_exchange(http, exchange_name, exchange_type, properties, base_url=None):
+    url = f"{base_url or BROKER_REST_URL}/api/latest/exchange"
 
-def create_exchange_rest(exchange_name, exchange_type, properties):
-    url = f"{BROKER_REST_URL}/api/latest/exchange"
-    
     data = {
         "name": exchange_name,
         "type": exchange_type,
         **properties
     }
-    
+
+    return http.put(f"{url}/{exchange_name}", json=data)
+
+def create_exchange_rest(exchange_name, exchange_type, properties, base_url=None):
     try:
-        response = requests.put(f"{url}/{exchange_name}", json=data)
-        
+        response = _put_exchange(requests, exchange_name, exchange_type, properties, base_url)
+
         if response.status_code in [200, 201]:
             print(f"[SUCCESS] Exchange '{exchange_name}' created successfully")
             return True
@@ -26,7 +36,7 @@ def create_exchange_rest(exchange_name, exchange_type, properties):
             print(f"[ERROR] Failed to create exchange. Status: {response.status_code}")
             print(f"Response: {response.text}")
             return False
-            
+
     except requests.exceptions.ConnectionError:
         print("[ERROR] Could not connect to broker REST interface")
         print("Make sure the broker has REST management enabled")
@@ -35,16 +45,98 @@ def create_exchange_rest(exchange_name, exchange_type, properties):
         print(f"[ERROR] {e}")
         return False
 
+def pooled_session(pool_size):
+    """A keep-alive session whose connection pool holds 'pool_size' connections to the broker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def create_exchanges_bulk(exchanges, workers=DEFAULT_WORKERS, base_url=None):
+    """
+    Creates many exchanges over one pooled session with 'workers' requests
+    in flight. 'exchanges' holds (name, type, properties) tuples. Returns a
+    list of (name, status_code, error) in input order; status_code is None
+    when no response was received.
+    """
+    session = pooled_session(workers)
+
+    def create(exchange):
+        name, exchange_type, properties = exchange
+        try:
+            response = _put_exchange(session, name, exchange_type, properties, base_url)
+        except requests.exceptions.RequestException as e:
+            return name, None, str(e)
+        if response.status_code in [200, 201]:
+            return name, response.status_code, None
+        return name, response.status_code, response.text
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(create, exchanges))
+    finally:
+        session.close()
+
+def read_bulk_file(path):
+    """Reads 'exchange <type> <name> [--durable]' lines, the format qmf_bulk.py uses."""
+    from operations import parse_operation
+
+    exchanges = []
+    with (sys.stdin if path == "-" else open(path)) as f:
+        for line_number, line in enumerate(f, 1):
+            operation = parse_operation(line, line_number)
+            if operation is None:
+                continue
+            arguments = operation["arguments"]
+            if operation["method"] != "create" or arguments.get("type") != "exchange":
+                raise ValueError(f"line {line_number}: only exchange creation is supported over REST")
+            properties = arguments["properties"]
+            exchanges.append((arguments["name"], properties["exchange-type"],
+                              {"durable": properties.get("durable", False)}))
+    return exchanges
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Create exchange via REST API")
-    parser.add_argument("exchange_type", help="Exchange type")
-    parser.add_argument("exchange_name", help="Exchange name")
+    parser.add_argument("exchange_type", nargs="?", help="Exchange type")
+    parser.add_argument("exchange_name", nargs="?", help="Exchange name")
     parser.add_argument("--durable", action="store_true", help="Durable exchange")
-    
+    parser.add_argument("--bulk", metavar="<file>",
+                        help="Create every 'exchange <type> <name> [--durable]' line of this file ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent requests (and pooled connections) in bulk mode (default: {DEFAULT_WORKERS})")
+
+    add_profile_arguments(parser)
     opts = parser.parse_args()
-    
+    start_profiling(opts)
+
+    if opts.bulk:
+        try:
+            exchanges = read_bulk_file(opts.bulk)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+        start_time = time.monotonic()
+        results = create_exchanges_bulk(exchanges, opts.workers)
+        duration = time.monotonic() - start_time
+
+        failed = 0
+        for name, status_code, error in results:
+            if error:
+                failed += 1
+                print(f"[ERROR] Exchange '{name}': status {status_code}: {error}")
+        statuses = Counter(status_code for name, status_code, error in results)
+        rate = len(results) / duration if duration > 0 else 0.0
+        print(f"{len(results) - failed} created, {failed} failed in {duration:.2f} seconds ({rate:.0f} exchanges/sec)")
+        print("Status codes: " + ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items(), key=str)))
+        sys.exit(1 if failed else 0)
+
+    if not opts.exchange_type or not opts.exchange_name:
+        parser.error("exchange_type and exchange_name are required unless --bulk is given")
+
     properties = {
         "durable": opts.durable
     }
-    
+
     create_exchange_rest(opts.exchange_name, opts.exchange_type, properties)
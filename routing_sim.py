@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+# Offline routing simulator. Loads the bindings of a topology file (or of a
+# live broker, through a QMF query) into per-exchange indexes and answers
+# which queues a routing key reaches, without sending any messages. Topic
+# exchanges use a trie over the dot separated words of the binding keys,
+# with '*' matching exactly one word and '#' matching zero or more; direct
+# exchanges use a dict and fanout exchanges return every bound queue.
+
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+DEFAULT_TOP = 10
+CACHE_SIZE = 100000
+# Exchanges every broker has, so topology files often bind to them without declaring them.
+BUILTIN_EXCHANGE_TYPES = {
+    "": "direct",
+    "amq.direct": "direct",
+    "amq.topic": "topic",
+    "amq.fanout": "fanout",
+    "amq.match": "headers"
+}
+
+def _words(key):
+    return key.split(".") if key else []
+
+
+class TrieNode(object):
+    __slots__ = ("children", "bindings")
+
+    def __init__(self):
+        self.children = {}
+        self.bindings = []
+
+
+class TopicIndex(object):
+    """Binding keys of one topic exchange, as a trie of words."""
+
+    def __init__(self):
+        self.root = TrieNode()
+
+    def add(self, key, binding_id):
+        node = self.root
+        for word in _words(key):
+            child = node.children.get(word)
+            if child is None:
+                child = node.children[word] = TrieNode()
+            node = child
+        node.bindings.append(binding_id)
+
+    def match(self, key):
+        """Returns the ids of every binding whose key matches the routing key."""
+        words = _words(key)
+        count = len(words)
+        matched = []
+        stack = [(self.root, 0)]
+        visited = set()
+        while stack:
+            node, index = stack.pop()
+            state = (id(node), index)
+            if state in visited:
+                continue
+            visited.add(state)
+            children = node.children
+            hash_node = children.get("#")
+            if hash_node is not None:
+                # '#' may swallow any number of the remaining words, including none.
+                for rest in range(index, count + 1):
+                    stack.append((hash_node, rest))
+            if index == count:
+                matched.extend(node.bindings)
+                continue
+            child = children.get(words[index])
+            if child is not None:
+                stack.append((child, index + 1))
+            star = children.get("*")
+            if star is not None:
+                stack.append((star, index + 1))
+        return matched
+
+
+class DirectIndex(object):
+    def __init__(self):
+        self.keys = {}
+
+    def add(self, key, binding_id):
+        self.keys.setdefault(key, []).append(binding_id)
+
+    def match(self, key):
+        return self.keys.get(key, [])
+
+
+class FanoutIndex(object):
+    def __init__(self):
+        self.bindings = []
+
+    def add(self, key, binding_id):
+        self.bindings.append(binding_id)
+
+    def match(self, key):
+        return self.bindings
+
+
+INDEX_TYPES = {
+    "topic": TopicIndex,
+    "direct": DirectIndex,
+    "fanout": FanoutIndex
+}
+
+
+class RoutingTable(object):
+    """
+    Routing indexes for every exchange of a normalized topology (see
+    topology.normalize_topology). Bindings are numbered; self.bindings[id]
+    is the (exchange, queue, key) tuple.
+    """
+
+    def __init__(self, topology):
+        self.bindings = []
+        self.indexes = {}
+        self.skipped = []
+        self._cache = {}
+        types = dict(BUILTIN_EXCHANGE_TYPES)
+        types.update({name: spec["type"] for name, spec in topology["exchanges"].items()})
+
+        for exchange, queue, key in sorted(topology["bindings"]):
+            exchange_type = types.get(exchange)
+            if exchange_type not in INDEX_TYPES:
+                self.skipped.append((exchange, queue, key, exchange_type))
+                continue
+            index = self.indexes.get(exchange)
+            if index is None:
+                index = self.indexes[exchange] = INDEX_TYPES[exchange_type]()
+            index.add(key, len(self.bindings))
+            self.bindings.append((exchange, queue, key))
+
+        # The default exchange routes on the queue name.
+        default = self.indexes.setdefault("", DirectIndex())
+        for queue in sorted(topology["queues"]):
+            if queue not in default.keys:
+                default.add(queue, len(self.bindings))
+                self.bindings.append(("", queue, queue))
+
+    def route(self, exchange, key):
+        """
+        Returns (queues, binding_ids) for a message with this routing key.
+        A queue gets one copy however many of its bindings match.
+        """
+        cache_key = (exchange, key)
+        result = self._cache.get(cache_key)
+        if result is None:
+            index = self.indexes.get(exchange)
+            binding_ids = index.match(key) if index is not None else []
+            result = (frozenset(self.bindings[binding_id][1] for binding_id in binding_ids), tuple(binding_ids))
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[cache_key] = result
+        return result
+
+
+def replay(table, exchange, keys):
+    """Routes every key and returns the statistics of the run."""
+    fanout = Counter()
+    binding_hits = Counter()
+    queue_hits = Counter()
+    total = 0
+    start = time.perf_counter()
+    for key in keys:
+        queues, binding_ids = table.route(exchange, key)
+        total += 1
+        fanout[len(queues)] += 1
+        binding_hits.update(binding_ids)
+        queue_hits.update(queues)
+    duration = time.perf_counter() - start
+    return {
+        "keys": total,
+        "seconds": duration,
+        "keys_per_sec": total / duration if duration > 0 else 0.0,
+        "unroutable": fanout[0],
+        "fanout": dict(sorted(fanout.items())),
+        "binding_hits": binding_hits,
+        "queue_hits": queue_hits
+    }
+
+def read_keys(stream):
+    for line in stream:
+        yield line.rstrip("\n")
+
+def load_table(opts):
+    import topology
+
+    if opts.topology:
+        return RoutingTable(topology.load_topology(opts.topology))
+    from qmf_query import query_objects
+    return RoutingTable(topology.live_topology(query_objects(opts.broker, ["exchange", "queue", "binding"])))
+
+def print_report(table, stats, top):
+    print(f"Replayed {stats['keys']} keys in {stats['seconds']:.2f} seconds ({stats['keys_per_sec']:.0f} keys/sec)")
+    print(f"Unroutable: {stats['unroutable']}")
+    print("\nFan-out (queues per message):")
+    width = max(len(str(count)) for count in stats["fanout"].values()) if stats["fanout"] else 1
+    for queues, count in stats["fanout"].items():
+        share = 100.0 * count / stats["keys"]
+        print(f"  {queues:>4} queue(s): {count:>{width}}  {share:5.1f}%")
+    print(f"\nHottest {top} bindings:")
+    for binding_id, hits in stats["binding_hits"].most_common(top):
+        exchange, queue, key = table.bindings[binding_id]
+        print(f"  {hits:>10}  {exchange} -> {queue}  key '{key}'")
+    print(f"\nHottest {top} queues:")
+    for queue, hits in stats["queue_hits"].most_common(top):
+        print(f"  {hits:>10}  {queue}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Predict which queues routing keys reach, from a topology file or a live broker.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("exchange", help="Exchange the messages are published to.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--topology", metavar="<file>", help="Topology file (YAML, or JSON if it ends in .json).")
+    source.add_argument("--broker", nargs="?", const=BROKER_URL, metavar="<url>",
+                        help=f"Query the bindings from a broker (default: {BROKER_URL}).")
+    parser.add_argument("--key", dest="keys", action="append", default=[], metavar="<routing-key>",
+                        help="Route one key and print the queues it reaches (repeatable).")
+    parser.add_argument("--corpus", metavar="<file>", help="Replay one routing key per line ('-' for stdin).")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help=f"Hot bindings to list (default: {DEFAULT_TOP}).")
+    parser.add_argument("--json", action="store_true", help="Print the replay report as JSON.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+    if not opts.keys and not opts.corpus:
+        parser.error("give --key or --corpus")
+
+    try:
+        table = load_table(opts)
+    except (OSError, RuntimeError, ValueError, KeyError) as e:
+        print(f"[ERROR] Could not load the bindings: {e}")
+        sys.exit(1)
+    for exchange, queue, key, exchange_type in table.skipped:
+        print(f"[WARNING] Skipped binding {exchange} -> {queue} '{key}': "
+              f"{exchange_type or 'unknown'} exchanges are not simulated", file=sys.stderr)
+    if opts.exchange not in table.indexes:
+        print(f"[WARNING] Exchange '{opts.exchange}' has no bindings; every key is unroutable.", file=sys.stderr)
+
+    for key in opts.keys:
+        start = time.perf_counter()
+        queues, binding_ids = table.route(opts.exchange, key)
+        micros = (time.perf_counter() - start) * 1e6
+        print(f"'{key}' -> {', '.join(sorted(queues)) or '(unroutable)'}  "
+              f"[{len(binding_ids)} binding(s), {micros:.1f} us]")
+
+    if opts.corpus:
+        stream = sys.stdin if opts.corpus == "-" else open(opts.corpus)
+        try:
+            stats = replay(table, opts.exchange, read_keys(stream))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if opts.json:
+            report = dict(stats)
+            report["hot_bindings"] = [
+                {"exchange": table.bindings[binding_id][0], "queue": table.bindings[binding_id][1],
+                 "key": table.bindings[binding_id][2], "hits": hits}
+                for binding_id, hits in stats["binding_hits"].most_common(opts.top)]
+            report["hot_queues"] = [{"queue": queue, "hits": hits}
+                                    for queue, hits in stats["queue_hits"].most_common(opts.top)]
+            del report["binding_hits"], report["queue_hits"]
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(table, stats, opts.top)
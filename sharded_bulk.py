@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+# Bulk QMF operations sharded across K connections, or K worker processes
+# that each run their own reactor. A broker works through one connection at
+# a time on one thread, and a proton reactor is single threaded too, so
+# spreading a large batch can raise throughput until the broker runs out
+# of threads or cores. --sweep finds that point.
+#
+# Every operation is hashed to a shard by the object it works on, so the
+# operations on one object keep their input order on one connection:
+#
+#   exchange create/delete   the root of its alternate-exchange chain, so
+#                            an alternate exchange and its users share a shard
+#   queue create/delete      the queue name
+#   bind                     the queue name
+#
+# Exchange creates run in a phase of their own before the queue and bind
+# operations, so a bind or queue never races the exchange it refers to on
+# another shard. An exchange delete that follows queue or bind operations
+# waits for them in a later phase (see operations.shard_phases).
+
+import sys
+import time
+import argparse
+import multiprocessing
+
+from operations import load_operations, shard_phases
+from qmf_bulk import DEFAULT_WINDOW
+from topology import is_builtin_exchange
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5671"
+DEFAULT_SHARDS = 4
+MODES = ("connections", "processes")
+DEFAULT_MIN_GAIN = 0.10
+
+def _run_shard(args):
+    """Runs one shard in its own reactor; the unit of work of a worker process."""
+    from proton.reactor import Container
+    from qmf_bulk import QmfBulkManager
+
+    broker_url, shard, window, label = args
+    handler = QmfBulkManager(broker_url, [operation for index, operation in shard], window, quiet=True, label=label)
+    Container(handler).run()
+    return _shard_result(handler, shard)
+
+def _shard_result(handler, shard):
+    """(succeeded, [(index, details)]) for one finished shard."""
+    failed = [(shard[position][0], details) for position, operation, details in handler.failed]
+    failed.extend((shard[position][0], handler.error or "not sent") for position, operation in handler.unsent())
+    return handler.succeeded, failed
+
+def run_phase_connections(broker_url, shards, window):
+    from proton.reactor import Container
+    from qmf_bulk import QmfBulkManager
+
+    active = [shard for shard in shards if shard]
+    handlers = [QmfBulkManager(broker_url, [operation for index, operation in shard], window, quiet=True,
+                               label=f"shard-{number}")
+                for number, shard in enumerate(active, 1)]
+    Container(*handlers).run()
+    return [_shard_result(handler, shard) for handler, shard in zip(handlers, active)]
+
+def run_phase_processes(broker_url, shards, window, pool):
+    jobs = [(broker_url, shard, window, f"shard-{number}") for number, shard in enumerate(shards, 1) if shard]
+    return pool.map(_run_shard, jobs)
+
+def run_sharded(broker_url, operations, shards=DEFAULT_SHARDS, mode="connections", window=DEFAULT_WINDOW):
+    """
+    Runs the operations over 'shards' connections or processes. Failures
+    are printed by each shard as they happen. Returns (succeeded,
+    [(index, details)] sorted by input index).
+    """
+    succeeded = 0
+    failed = []
+    pool = multiprocessing.Pool(shards) if mode == "processes" else None
+    try:
+        for phase in shard_phases(operations, shards):
+            if pool is not None:
+                results = run_phase_processes(broker_url, phase, window, pool)
+            else:
+                results = run_phase_connections(broker_url, phase, window)
+            for shard_succeeded, shard_failed in results:
+                succeeded += shard_succeeded
+                failed.extend(shard_failed)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return succeeded, sorted(failed, key=lambda failure: failure[0])
+
+def renamed(operations, suffix):
+    """The same operations on differently named objects, so a sweep can run the batch again."""
+    def name(exchange):
+        return exchange if is_builtin_exchange(exchange) else exchange + suffix
+
+    result = []
+    for operation in operations:
+        arguments = dict(operation["arguments"])
+        if operation["method"] == "bind":
+            arguments["exchange"] = name(arguments["exchange"])
+            arguments["queue"] += suffix
+        elif "name" in arguments:
+            if arguments.get("type") == "exchange":
+                arguments["name"] = name(arguments["name"])
+            else:
+                arguments["name"] += suffix
+            properties = dict(arguments.get("properties") or {})
+            if properties.get("alternate-exchange"):
+                properties["alternate-exchange"] = name(properties["alternate-exchange"])
+                arguments["properties"] = properties
+        result.append({"method": operation["method"], "arguments": arguments})
+    return result
+
+def cleanup_operations(operations):
+    """
+    Returns (queue deletes, exchange deletes) for everything the batch
+    created. The queues have to go first: an exchange that is still some
+    queue's alternate exchange cannot be deleted.
+    """
+    from operations import delete
+
+    created = [(operation["arguments"]["type"], operation["arguments"]["name"])
+               for operation in operations if operation["method"] == "create"]
+    return ([delete(object_type, name) for object_type, name in created if object_type == "queue"],
+            [delete(object_type, name) for object_type, name in reversed(created) if object_type == "exchange"])
+
+def sweep(broker_url, operations, shard_counts, mode, window, cleanup, min_gain):
+    print(f"{'K':>4} {'seconds':>9} {'ops/sec':>9} {'speedup':>8} {'failed':>7}")
+    rows = []
+    knee = None
+    for shards in shard_counts:
+        batch = renamed(operations, f"-k{shards}")
+        start_time = time.monotonic()
+        succeeded, failed = run_sharded(broker_url, batch, shards, mode, window)
+        duration = time.monotonic() - start_time
+        rate = len(batch) / duration if duration > 0 else 0.0
+        speedup = rate / rows[0][2] if rows and rows[0][2] else 1.0
+        if rows and knee is None and rate < rows[-1][2] * (1 + min_gain):
+            knee = rows[-1][0]
+        rows.append((shards, duration, rate, len(failed)))
+        print(f"{shards:>4} {duration:>9.2f} {rate:>9.0f} {speedup:>7.2f}x {len(failed):>7}")
+        if cleanup:
+            for deletes in cleanup_operations(batch):
+                run_sharded(broker_url, deletes, shards, mode, window)
+    if knee is not None:
+        print(f"\nThroughput stops improving by {min_gain:.0%} or more after K={knee}.")
+    else:
+        print(f"\nThroughput was still improving at K={rows[-1][0]}.")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a large batch of create/bind operations sharded over several connections or processes.",
+        epilog="The operations file uses the qmf_bulk.py format."
+    )
+    parser.add_argument("file", nargs="?", default="-", help="Operations file ('-' or omitted for stdin).")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS,
+                        help=f"Number of connections or processes, K (default: {DEFAULT_SHARDS}).")
+    parser.add_argument("--mode", choices=MODES, default="connections",
+                        help="One reactor with K connections, or K processes with a reactor each (default: connections).")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Maximum requests in flight per shard (default: {DEFAULT_WINDOW}).")
+    parser.add_argument("--sweep", metavar="<K,K,...>",
+                        help="Run the batch once per K, on renamed copies of its objects, and report where "
+                             "throughput stops improving.")
+    parser.add_argument("--cleanup", action="store_true", help="With --sweep, delete each run's objects afterwards.")
+    parser.add_argument("--min-gain", type=float, default=DEFAULT_MIN_GAIN,
+                        help=f"Smallest throughput gain that counts as improving (default: {DEFAULT_MIN_GAIN}).")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    # --sweep picks its own shard counts, but its runs use --window too.
+    if opts.shards < 1 or opts.window < 1:
+        parser.error("--shards and --window must be at least 1")
+
+    try:
+        operations = load_operations(opts.file)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    try:
+        if opts.sweep:
+            shard_counts = [int(value) for value in opts.sweep.split(",") if value.strip()]
+            if not shard_counts or min(shard_counts) < 1:
+                parser.error("--sweep needs a comma separated list of positive shard counts")
+            sweep(opts.broker, operations, shard_counts, opts.mode, opts.window, opts.cleanup, opts.min_gain)
+            sys.exit(0)
+
+        start_time = time.monotonic()
+        succeeded, failed = run_sharded(opts.broker, operations, opts.shards, opts.mode, opts.window)
+        duration = time.monotonic() - start_time
+    except Exception as e:
+        print(f"An unhandled error occurred: {e}")
+        sys.exit(1)
+
+    rate = len(operations) / duration if duration > 0 else 0.0
+    print("\n--- Sharded bulk summary ---")
+    print(f"{succeeded} succeeded, {len(failed)} failed over {opts.shards} {opts.mode} "
+          f"in {duration:.2f} seconds ({rate:.0f} ops/sec)")
+    sys.exit(1 if failed else 0)
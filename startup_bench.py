@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Cold start benchmark for qpidctl.py. Every run is a fresh interpreter, as
+# it is under cron or config management. Commands that never reach a broker
+# (--help, --dry-run) must stay under the budget and must not import any
+# backend; the import cost of each backend is reported separately.
+
+import os
+import sys
+import time
+import statistics
+import argparse
+import subprocess
+
+QPIDCTL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qpidctl.py")
+DEFAULT_RUNS = 20
+DEFAULT_BUDGET_MS = 150.0
+HEAVY_MODULES = ("proton", "pika", "requests", "cx_Oracle", "yaml")
+COMMANDS = (
+    ("--help",),
+    ("exchange", "create", "direct", "bench-exchange", "--durable", "--dry-run"),
+    ("--transport", "amqp091", "bind", "bench-exchange", "bench-queue", "bench-key", "--dry-run")
+)
+
+def time_command(argv, runs):
+    """Runs 'argv' in a fresh interpreter 'runs' times; returns the wall times in ms."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def imported_modules(argv):
+    """Top level packages imported by one run, from -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + argv[1:],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+    return modules
+
+def print_timings(label, timings):
+    print(f"{label:<70} first {timings[0]:7.1f}  median {statistics.median(timings):7.1f}  "
+          f"max {max(timings):7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure qpidctl.py cold start time against a budget.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help=f"Runs per command (default: {DEFAULT_RUNS}).")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Largest allowed median start time in ms (default: {DEFAULT_BUDGET_MS:.0f}).")
+    parser.add_argument("--skip-backends", action="store_true", help="Do not time the backend imports.")
+
+    opts = parser.parse_args()
+
+    failed = False
+    baseline = time_command([sys.executable, "-c", "pass"], opts.runs)
+    print_timings("python -c pass (interpreter alone)", baseline)
+
+    for command in COMMANDS:
+        argv = [sys.executable, QPIDCTL] + list(command)
+        timings = time_command(argv, opts.runs)
+        print_timings("qpidctl " + " ".join(command), timings)
+        if statistics.median(timings) > opts.budget_ms:
+            print(f"[ERROR] median start time is over the {opts.budget_ms:.0f} ms budget")
+            failed = True
+        heavy = sorted(imported_modules(argv) & set(HEAVY_MODULES))
+        if heavy:
+            print(f"[ERROR] imported backend modules without talking to a broker: {', '.join(heavy)}")
+            failed = True
+
+    if not opts.skip_backends:
+        sys.path.insert(0, os.path.dirname(QPIDCTL))
+        from qpidctl import BACKEND_MODULES
+
+        print("\nBackend import cost (informational):")
+        for transport, modules in sorted(BACKEND_MODULES.items()):
+            code = f"import sys; sys.path.insert(0, {os.path.dirname(QPIDCTL)!r}); import qpidctl, " + ", ".join(modules)
+            try:
+                timings = time_command([sys.executable, "-c", code], max(1, opts.runs // 4))
+            except subprocess.CalledProcessError:
+                print(f"{transport:<70} not installed ({', '.join(modules)})")
+                continue
+            print_timings(transport, timings)
+
+    print("\n[SUCCESS] Cold start is within budget." if not failed else "\n[ERROR] Cold start budget check failed.")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+# Local stand-in for a Qpid C++ broker's management interfaces, for running
+# the tools and benchmarks offline. It answers QMF '_method' and
+# '_query_request' messages on qmf.default.direct/broker, AMQP 1.0
+# '$management' requests, and the REST exchange API. Exchanges, queues and
+# bindings are kept in memory so creates, binds and queries behave like a
+# real broker.
+
+import sys
+import time
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from proton import Message
+from proton.handlers import MessagingHandler
+from proton.reactor import Container
+
+AMQP_URL = "localhost:5671"
+HTTP_PORT = 8080
+QMF_ADDRESS = "qmf.default.direct/broker"
+MANAGEMENT_ADDRESS = "$management"
+DEFAULT_EXCHANGES = {
+    "": "direct",
+    "amq.direct": "direct",
+    "amq.topic": "topic",
+    "amq.fanout": "fanout",
+    "amq.match": "headers"
+}
+QUERY_CHUNK_SIZE = 100
+
+def _object_id(class_name, name):
+    return {'_object_name': f"org.apache.qpid.broker:{class_name}:{name}"}
+
+
+class BrokerModel(object):
+    """In-memory exchanges, queues and bindings, shared by the AMQP and HTTP stubs."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.exchanges = {name: {"type": exchange_type, "durable": False, "alternate-exchange": None}
+                          for name, exchange_type in DEFAULT_EXCHANGES.items()}
+        self.queues = {}
+        self.bindings = set()
+
+    def create(self, object_type, name, properties):
+        """
+        Returns None on success or an error text. Like qpidd, an existing
+        object is always an error; the 'strict' argument does not change that.
+        """
+        with self.lock:
+            if object_type == "exchange":
+                if name in self.exchanges:
+                    return f"object already exists: {name}"
+                self.exchanges[name] = {
+                    "type": properties.get("exchange-type", "direct"),
+                    "durable": bool(properties.get("durable", False)),
+                    "alternate-exchange": properties.get("alternate-exchange")
+                }
+            elif object_type == "queue":
+                if name in self.queues:
+                    return f"object already exists: {name}"
+                self.queues[name] = {
+                    "durable": bool(properties.get("durable", False)),
+                    "auto-delete": bool(properties.get("auto-delete", False)),
+                    "exclusive": bool(properties.get("exclusive", False)),
+                    "alternate-exchange": properties.get("alternate-exchange"),
+                    "msgTotalEnqueues": 0,
+                    "msgTotalDequeues": 0,
+                    "msgDepth": 0
+                }
+            else:
+                return f"unsupported object type: {object_type}"
+        return None
+
+    def delete(self, object_type, name):
+        with self.lock:
+            objects = self.exchanges if object_type == "exchange" else self.queues
+            if name not in objects:
+                return f"not-found: Delete failed. No such {object_type}: {name}"
+            del objects[name]
+            index = 0 if object_type == "exchange" else 1
+            self.bindings = {binding for binding in self.bindings if binding[index] != name}
+        return None
+
+    def bind(self, exchange, queue, key):
+        with self.lock:
+            if exchange not in self.exchanges:
+                return f"not-found: Bind failed. No such exchange: {exchange}"
+            if queue not in self.queues:
+                return f"not-found: Bind failed. No such queue: {queue}"
+            self.bindings.add((exchange, queue, key))
+        return None
+
+    def query(self, class_name):
+        """Returns the QMF '_values' maps for one class."""
+        with self.lock:
+            if class_name == "exchange":
+                return [{"name": name, "type": spec["type"], "durable": spec["durable"],
+                         **({"altExchange": _object_id("exchange", spec["alternate-exchange"])}
+                            if spec["alternate-exchange"] else {})}
+                        for name, spec in self.exchanges.items()]
+            if class_name == "queue":
+                return [{"name": name, "durable": spec["durable"], "autoDelete": spec["auto-delete"],
+                         "exclusive": spec["exclusive"],
+                         "msgTotalEnqueues": spec["msgTotalEnqueues"],
+                         "msgTotalDequeues": spec["msgTotalDequeues"],
+                         "msgDepth": spec["msgDepth"],
+                         **({"altExchange": _object_id("exchange", spec["alternate-exchange"])}
+                            if spec["alternate-exchange"] else {})}
+                        for name, spec in self.queues.items()]
+            if class_name == "binding":
+                return [{"exchangeRef": _object_id("exchange", exchange),
+                         "queueRef": _object_id("queue", queue),
+                         "bindingKey": key}
+                        for exchange, queue, key in self.bindings]
+        return []
+
+    def call(self, method_name, arguments):
+        if method_name == "create":
+            return self.create(arguments.get("type"), arguments.get("name"),
+                               arguments.get("properties") or {})
+        if method_name == "delete":
+            return self.delete(arguments.get("type"), arguments.get("name"))
+        if method_name == "bind":
+            return self.bind(arguments.get("exchange"), arguments.get("queue"), arguments.get("key", ""))
+        return f"unknown method: {method_name}"
+
+
+class StubBroker(MessagingHandler):
+    """Answers management requests from a BrokerModel. 'delay' adds seconds of fake processing time."""
+
+    def __init__(self, url, model=None, delay=0.0):
+        super(StubBroker, self).__init__(prefetch=1000)
+        self.url = url
+        self.model = model or BrokerModel()
+        self.delay = delay
+        self.acceptor = None
+        self._reply_senders = {}
+        self._next_address = 0
+
+    def on_start(self, event):
+        self.acceptor = event.container.listen(self.url)
+
+    def on_link_opening(self, event):
+        link = event.link
+        if link.is_sender and link.remote_source and link.remote_source.dynamic:
+            self._next_address += 1
+            address = f"stub-reply-{self._next_address}"
+            link.source.address = address
+            self._reply_senders[address] = link
+        elif link.is_receiver and link.remote_target:
+            link.target.address = link.remote_target.address
+
+    def on_link_closing(self, event):
+        if event.link.is_sender and event.link.source:
+            self._reply_senders.pop(event.link.source.address, None)
+
+    def on_message(self, event):
+        request = event.message
+        target = event.link.target.address
+        sender = self._reply_senders.get(request.reply_to)
+        if sender is None:
+            return
+        if self.delay:
+            time.sleep(self.delay)
+
+        if target == MANAGEMENT_ADDRESS:
+            self._management_reply(sender, request)
+        else:
+            self._qmf_reply(sender, request)
+
+    def _qmf_reply(self, sender, request):
+        opcode = (request.properties or {}).get('qmf.opcode')
+        body = request.body if isinstance(request.body, dict) else {}
+
+        if opcode == '_query_request':
+            class_name = body.get('_schema_id', {}).get('_class_name')
+            objects = [{'_values': values} for values in self.model.query(class_name)]
+            chunks = [objects[i:i + QUERY_CHUNK_SIZE] for i in range(0, len(objects), QUERY_CHUNK_SIZE)] or [[]]
+            for index, chunk in enumerate(chunks):
+                properties = {'qmf.opcode': '_query_response'}
+                if index < len(chunks) - 1:
+                    properties['partial'] = None
+                sender.send(Message(correlation_id=request.correlation_id, properties=properties, body=chunk))
+            return
+
+        error = self.model.call(body.get('_method_name'), body.get('_arguments') or {})
+        if error:
+            reply = Message(correlation_id=request.correlation_id,
+                            properties={'qmf.opcode': '_exception'},
+                            body={'_values': {'error_text': error}})
+        else:
+            reply = Message(correlation_id=request.correlation_id,
+                            properties={'qmf.opcode': '_method_response'},
+                            body={'_arguments': {}})
+        sender.send(reply)
+
+    def _management_reply(self, sender, request):
+        properties = request.properties or {}
+        body = request.body if isinstance(request.body, dict) else {}
+        operation = properties.get("operation")
+        entity_type = properties.get("type", "")
+        object_type = entity_type.rsplit(":", 1)[-1]
+        name = properties.get("name")
+        if object_type not in ("exchange", "queue"):
+            status = (400, f"unsupported type: {entity_type}")
+        elif operation == "CREATE":
+            if object_type == "exchange":
+                body = {
+                    "exchange-type": body.get("exchangeType"),
+                    "durable": body.get("durable"),
+                    "alternate-exchange": body.get("alternateExchange")
+                }
+            error = self.model.create(object_type, name, body)
+            status = (409, error) if error else (201, "Created")
+        elif operation == "DELETE":
+            error = self.model.delete(object_type, name)
+            status = (404, error) if error else (204, "No Content")
+        else:
+            # Nothing else is modelled; claiming success would hide a test
+            # that relies on an operation the stub never performed.
+            status = (501, f"unsupported operation: {operation}")
+        sender.send(Message(correlation_id=request.correlation_id,
+                            properties={'statusCode': status[0], 'statusDescription': status[1]},
+                            body={}))
+
+class StubRestHandler(BaseHTTPRequestHandler):
+    """PUT/GET /api/latest/exchange/<name>, backed by the server's BrokerModel."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, keep-alive
+    # clients stall on Nagle/delayed-ACK for ~40ms per request.
+    disable_nagle_algorithm = True
+    prefix = "/api/latest/exchange/"
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.startswith(self.prefix):
+            self._reply(404, {"error": "not found"})
+            return
+        name = self.path[len(self.prefix):]
+        if name in self.server.model.exchanges:
+            # A REST PUT of an existing object updates it rather than failing.
+            self._reply(200, {"name": name})
+            return
+        error = self.server.model.create("exchange", name, {
+            "exchange-type": data.get("type"),
+            "durable": data.get("durable")
+        })
+        if error:
+            self._reply(422, {"error": error})
+        else:
+            self._reply(201, {"name": name})
+
+    def do_GET(self):
+        name = self.path[len(self.prefix):] if self.path.startswith(self.prefix) else None
+        spec = self.server.model.exchanges.get(name) if name is not None else None
+        if spec is None:
+            self._reply(404, {"error": "not found"})
+        else:
+            self._reply(200, {"name": name, **spec})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_stub(port, model):
+    """Starts the REST stub on a daemon thread and returns the server."""
+    server = ThreadingHTTPServer(("localhost", port), StubRestHandler)
+    server.daemon_threads = True
+    server.model = model
+    threading.Thread(target=server.serve_forever, name="stub-http", daemon=True).start()
+    return server
+
+def start_amqp_stub(url, model, delay=0.0):
+    """Starts the AMQP stub on a daemon thread and returns its container."""
+    container = Container(StubBroker(url, model, delay))
+    threading.Thread(target=container.run, name="stub-amqp", daemon=True).start()
+    return container
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the broker's management interfaces.")
+    parser.add_argument("--listen", default=AMQP_URL, help=f"AMQP 1.0 listen address (default: {AMQP_URL}).")
+    parser.add_argument("--http-port", type=int, default=HTTP_PORT,
+                        help=f"REST listen port, 0 to disable (default: {HTTP_PORT}).")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds of fake processing time per request.")
+
+    opts = parser.parse_args()
+
+    model = BrokerModel()
+    if opts.http_port:
+        start_http_stub(opts.http_port, model)
+        print(f"REST stub listening on http://localhost:{opts.http_port}")
+    print(f"AMQP stub listening on {opts.listen}")
+    try:
+        Container(StubBroker(opts.listen, model, opts.delay)).run()
+    except KeyboardInterrupt:
+        sys.exit(0)
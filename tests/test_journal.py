@@ -0,0 +1,108 @@
+import operations
+from journal import Journal, operation_digest, RECORD_SIZE, SENT, DONE, FAILED
+
+
+def run(path, batch, outcomes):
+    """Sends 'batch' through a journal; outcomes[i] is True, False or None (never answered)."""
+    journal = Journal(str(path))
+    sent = []
+    for (operation, resent), outcome in zip(journal.pending(batch), outcomes):
+        sent.append((operations.describe_operation(operation), resent))
+        if outcome is True:
+            journal.record_done(operation)
+        elif outcome is False:
+            journal.record_failed(operation)
+    journal.close()
+    return journal, sent
+
+
+def test_records_are_fixed_size(tmp_path):
+    path = tmp_path / "journal"
+    create = operations.exchange_create("ex", "topic")
+    run(path, [create], [True])
+    data = path.read_bytes()
+    assert len(data) == 2 * RECORD_SIZE
+    assert data == SENT + operation_digest(create) + DONE + operation_digest(create)
+
+
+def test_digest_ignores_strict():
+    create = operations.exchange_create("ex", "topic")
+    relaxed = operations.exchange_create("ex", "topic")
+    relaxed["arguments"]["strict"] = False
+    assert operation_digest(create) == operation_digest(relaxed)
+    assert operation_digest(create) != operation_digest(operations.exchange_create("ex", "direct"))
+
+
+def test_resume_skips_done_and_resends_failed(tmp_path):
+    path = tmp_path / "journal"
+    batch = [operations.exchange_create("a", "topic"), operations.queue_create("q"), operations.bind("a", "q", "k")]
+    run(path, batch, [True, False, True])
+
+    journal, sent = run(path, batch, [True, True, True])
+    assert sent == [("create queue 'q'", False)]
+    assert journal.skipped == 2
+    assert journal.completed == 2
+    assert journal.resent == 0
+
+
+def test_unanswered_operations_are_flagged_when_resent(tmp_path):
+    path = tmp_path / "journal"
+    batch = [operations.exchange_create("a", "topic"), operations.delete("queue", "q")]
+    run(path, batch, [None, None])
+
+    journal, sent = run(path, batch, [True, True])
+    assert sent == [("create exchange 'a'", True), ("delete queue 'q'", True)]
+    assert journal.resent == 2
+    # Answered now, so a third run has nothing left to send.
+    assert run(path, batch, [True, True])[1] == []
+
+
+def test_identical_operations_are_counted(tmp_path):
+    path = tmp_path / "journal"
+    bind = operations.bind("a", "q", "k")
+    run(path, [bind, bind], [True, None])
+
+    journal, sent = run(path, [bind, bind, bind], [True, True, True])
+    assert sent == [("bind queue 'q' to exchange 'a' with key 'k'", True),
+                    ("bind queue 'q' to exchange 'a' with key 'k'", False)]
+    assert journal.skipped == 1
+
+
+def test_record_cut_short_by_a_crash_is_dropped(tmp_path):
+    path = tmp_path / "journal"
+    create = operations.exchange_create("a", "topic")
+    run(path, [create], [True])
+    with open(path, "ab") as f:
+        f.write(FAILED + operation_digest(create)[:5])
+
+    journal, sent = run(path, [create], [True])
+    assert sent == []
+    assert journal.skipped == 1
+    assert path.stat().st_size == 2 * RECORD_SIZE
+
+
+def test_already_applied_ignores_strict():
+    create = operations.exchange_create("a", "topic")
+    create["arguments"]["strict"] = False
+    assert operations.already_applied(create, "object already exists: a")
+    assert not operations.already_applied(create, "invalid exchange type")
+    delete = operations.delete("exchange", "a")
+    assert operations.already_applied(delete, "Delete failed. No such exchange: a")
+    assert not operations.already_applied(delete, "resource-locked: in use")
+    bind = operations.bind("a", "q", "k")
+    assert not operations.already_applied(bind, "Bind failed. No such queue: q")
+    assert not operations.already_applied(create, None)
+
+
+def test_confirmed_uses_up_confirmations_without_journaling(tmp_path):
+    path = tmp_path / "journal"
+    create = operations.exchange_create("a", "topic")
+    run(path, [create], [True])
+    size = path.stat().st_size
+
+    journal = Journal(str(path))
+    assert journal.confirmed(create)
+    assert not journal.confirmed(create)
+    journal.close()
+    assert journal.skipped == 1
+    assert path.stat().st_size == size
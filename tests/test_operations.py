@@ -0,0 +1,105 @@
+import io
+
+import pytest
+
+import operations
+from operations import exchange_create, queue_create, bind, delete, shard_phases
+
+
+def positions(phases):
+    """index -> (phase, shard, position in shard) for every scheduled operation."""
+    placed = {}
+    for phase_number, phase in enumerate(phases):
+        for shard_number, shard in enumerate(phase):
+            for position, (index, operation) in enumerate(shard):
+                placed[index] = (phase_number, shard_number, position)
+    return placed
+
+
+def runs_before(placed, first, second):
+    """True if 'first' is certain to finish before 'second' starts."""
+    a, b = placed[first], placed[second]
+    return a[0] < b[0] or (a[0] == b[0] and a[1] == b[1] and a[2] < b[2])
+
+
+@pytest.mark.parametrize("shards", [1, 2, 7])
+def test_every_operation_is_scheduled_once(shards):
+    batch = [exchange_create(f"ex{n}", "topic") for n in range(10)] + [queue_create(f"q{n}") for n in range(10)]
+    phases = shard_phases(batch, shards)
+    assert all(len(phase) == shards for phase in phases)
+    assert sorted(index for phase in phases for shard in phase for index, _ in shard) == list(range(20))
+
+
+def test_exchange_creates_go_ahead_of_binds():
+    batch = [queue_create("q"), bind("ex", "q", "k"), exchange_create("ex", "topic")]
+    phases = shard_phases(batch, 4)
+    assert len(phases) == 2
+    assert [index for shard in phases[0] for index, _ in shard] == [2]
+
+
+def test_exchange_delete_stays_behind_a_bind_to_it():
+    batch = [bind("ex", "q", "k"), delete("exchange", "ex")]
+    placed = positions(shard_phases(batch, 4))
+    assert runs_before(placed, 0, 1)
+
+
+def test_delete_and_recreate_keep_their_order():
+    batch = [exchange_create("ex", "topic"), queue_create("q"), bind("ex", "q", "a"),
+             delete("exchange", "ex"), exchange_create("ex", "direct"), bind("ex", "q", "b")]
+    placed = positions(shard_phases(batch, 4))
+    for first, second in [(0, 2), (1, 2), (2, 3), (3, 4), (4, 5), (1, 5)]:
+        assert runs_before(placed, first, second), (first, second)
+
+
+def test_alternate_exchange_chain_shares_a_shard():
+    batch = [exchange_create("alt", "fanout")] + \
+            [exchange_create(f"ex{n}", "topic", alternate_exchange="alt") for n in range(8)]
+    phases = shard_phases(batch, 8)
+    assert len(phases) == 1
+    assert sum(1 for shard in phases[0] if shard) == 1
+    assert [index for shard in phases[0] for index, _ in shard] == list(range(9))
+
+
+def test_no_empty_phases():
+    assert shard_phases([], 4) == []
+    assert len(shard_phases([queue_create("q")], 4)) == 1
+
+
+def test_parse_text_formats():
+    text = """
+    # comment
+    exchange topic orders --durable --alternate-exchange unrouted
+    queue "order q" --auto-delete
+    bind orders "order q" order.#
+    {"method": "delete", "arguments": {"type": "queue", "name": "old"}}
+    """
+    parsed = list(operations.read_operations(io.StringIO(text)))
+    assert parsed == [
+        exchange_create("orders", "topic", durable=True, alternate_exchange="unrouted"),
+        queue_create("order q", auto_delete=True),
+        bind("orders", "order q", "order.#"),
+        delete("queue", "old"),
+    ]
+
+
+@pytest.mark.parametrize("line, message", [
+    ("exchange topic", "line 3: expected 'exchange <type> <name>'"),
+    ("queue q --durable --bogus", "line 3: unknown option '--bogus'"),
+    ("queue q --alternate-exchange", "line 3: --alternate-exchange needs a value"),
+    ("bind ex q", "line 3: expected 'bind <exchange> <queue> <binding-key>'"),
+    ("route ex q k", "line 3: unknown operation 'route'"),
+    ('{"method": "create"}', "line 3: JSON operations need 'method' and 'arguments'"),
+])
+def test_parse_errors_name_the_line(line, message):
+    with pytest.raises(ValueError) as error:
+        list(operations.read_operations(io.StringIO(f"queue a\n\n{line}\n")))
+    assert str(error.value) == message
+
+
+def test_load_operations_reads_the_whole_file(tmp_path):
+    path = tmp_path / "ops.txt"
+    path.write_text("queue a\nbind ex a k\n")
+    assert operations.load_operations(str(path)) == [queue_create("a"), bind("ex", "a", "k")]
+    path.write_text("queue a\nqueue\n")
+    with pytest.raises(ValueError, match="line 2"):
+        operations.load_operations(str(path))
@@ -0,0 +1,38 @@
+from operations import exchange_create, queue_create, bind, delete
+from provision_plan import build_dag, layers
+
+
+def test_binds_wait_for_their_exchange_and_queue():
+    batch = [exchange_create("ex", "topic"), queue_create("q"), bind("ex", "q", "a"), bind("ex", "q", "b")]
+    depends_on = build_dag(batch)
+    assert depends_on == [set(), set(), {0, 1}, {0, 1}]
+    assert layers(depends_on) == [[0, 1], [2, 3]]
+
+
+def test_alternate_exchange_is_a_read():
+    batch = [exchange_create("alt", "fanout"), exchange_create("ex", "topic", alternate_exchange="alt")]
+    assert build_dag(batch) == [set(), {0}]
+
+
+def test_write_waits_for_the_reads_before_it():
+    batch = [exchange_create("ex", "topic"), queue_create("q"), bind("ex", "q", "k"), delete("exchange", "ex"),
+             exchange_create("ex", "direct"), bind("ex", "q", "k")]
+    depends_on = build_dag(batch)
+    assert depends_on[3] == {0, 2}
+    assert depends_on[4] == {3}
+    assert depends_on[5] == {1, 4}
+    assert layers(depends_on) == [[0, 1], [2], [3], [4], [5]]
+
+
+def test_unrelated_objects_share_a_layer():
+    batch = [queue_create(f"q{number}") for number in range(5)]
+    assert layers(build_dag(batch)) == [[0, 1, 2, 3, 4]]
+
+
+def test_layer_follows_the_longest_chain():
+    depends_on = [set(), {0}, {1}, {0}, {2, 3}]
+    assert layers(depends_on) == [[0], [1, 3], [2], [4]]
+
+
+def test_empty_batch():
+    assert layers(build_dag([])) == []
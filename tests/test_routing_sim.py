@@ -0,0 +1,78 @@
+from routing_sim import TopicIndex, RoutingTable
+
+
+def topic_index(*keys):
+    index = TopicIndex()
+    for binding_id, key in enumerate(keys):
+        index.add(key, binding_id)
+    return index
+
+
+def matches(index, key):
+    return sorted(index.match(key))
+
+
+def test_exact_words():
+    index = topic_index("stock.usd.nyse", "stock.eur.nyse")
+    assert matches(index, "stock.usd.nyse") == [0]
+    assert matches(index, "stock.usd") == []
+    assert matches(index, "stock.usd.nyse.extra") == []
+
+
+def test_star_matches_exactly_one_word():
+    index = topic_index("stock.*.nyse")
+    assert matches(index, "stock.usd.nyse") == [0]
+    assert matches(index, "stock.nyse") == []
+    assert matches(index, "stock.usd.eur.nyse") == []
+
+
+def test_hash_matches_zero_or_more_words():
+    index = topic_index("stock.#", "#.nyse", "#")
+    assert matches(index, "stock") == [0, 2]
+    assert matches(index, "stock.usd.nyse") == [0, 1, 2]
+    assert matches(index, "nyse") == [1, 2]
+    assert matches(index, "") == [2]
+
+
+def test_hash_between_words():
+    index = topic_index("a.#.z")
+    assert matches(index, "a.z") == [0]
+    assert matches(index, "a.b.c.z") == [0]
+    assert matches(index, "a.b.c") == []
+
+
+def test_adjacent_wildcards():
+    index = topic_index("#.*", "*.#.*")
+    assert matches(index, "") == []
+    assert matches(index, "a") == [0]
+    assert matches(index, "a.b") == [0, 1]
+
+
+def test_binding_reported_once_however_many_paths_match():
+    index = topic_index("#.#.a")
+    assert matches(index, "a.a.a") == [0]
+
+
+def test_duplicate_keys_keep_both_bindings():
+    index = topic_index("a.b", "a.b")
+    assert matches(index, "a.b") == [0, 1]
+
+
+def test_routing_table_delivers_one_copy_per_queue():
+    topology = {
+        "exchanges": {"orders": {"type": "topic"}, "audit": {"type": "fanout"}},
+        "queues": {"eu": {}, "all": {}},
+        "bindings": [
+            ("orders", "eu", "order.eu.*"),
+            ("orders", "all", "order.#"),
+            ("orders", "all", "#.created"),
+            ("audit", "all", "ignored"),
+        ],
+    }
+    table = RoutingTable(topology)
+    queues, binding_ids = table.route("orders", "order.eu.created")
+    assert queues == {"eu", "all"}
+    assert len(binding_ids) == 3
+    assert table.route("audit", "anything")[0] == {"all"}
+    assert table.route("", "eu")[0] == {"eu"}
+    assert table.route("missing", "order.eu.created") == (frozenset(), ())
@@ -0,0 +1,8 @@
+import topology
+
+
+def test_only_exclusive_queues_are_session_queues():
+    assert topology.is_session_queue({"exclusive": True, "autoDelete": True})
+    assert topology.is_session_queue({"exclusive": True})
+    assert not topology.is_session_queue({"autoDelete": True})
+    assert not topology.is_session_queue({})
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# End-to-end message throughput through an exchange and binding created
+# with create_exchange.py and bind_queue.py. Senders publish to the
+# exchange with the binding key as the message subject (the routing key
+# for AMQP 1.0 messages on a Qpid C++ broker); receivers consume from the
+# bound queue. Every message carries its send time, so the receivers can
+# measure end-to-end latency. All links run in one reactor, one connection
+# per link.
+
+import sys
+import json
+import time
+import argparse
+from proton import Message
+from proton.handlers import MessagingHandler
+from proton.reactor import Container
+
+from batch_sender import BatchSender
+from bench_stats import percentile
+from profiling import add_profile_arguments, start_profiling
+
+BROKER_URL = "localhost:5672"
+SENT_AT = "x-sent-at"
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LoadSender(BatchSender):
+    """Sends 'count' messages to the exchange, at most 'batch' per wakeup."""
+
+    def __init__(self, broker_url, exchange, key, count, body, batch, presettled):
+        super(LoadSender, self).__init__(broker_url, exchange, batch, presettled, self._send_message)
+        self.key = key
+        self.count = count
+        self.body = body
+        self.exhausted = count <= 0
+
+    def _send_message(self, sender):
+        message = Message(subject=self.key, body=self.body,
+                          properties={SENT_AT: time.perf_counter()})
+        self.exhausted = self.sent + 1 >= self.count
+        return sender.send(message)
+
+    def on_transport_error(self, event):
+        print(f"[ERROR] Sender transport error: {event.transport.condition}")
+        self._sender.connection.close()
+
+
+class LoadReceiver(MessagingHandler):
+    """Consumes from the queue with 'credit' messages of prefetch and records latency."""
+
+    def __init__(self, broker_url, queue, credit, stats):
+        super(LoadReceiver, self).__init__(prefetch=credit)
+        self.broker_url = broker_url
+        self.queue = queue
+        self.stats = stats
+        self._receiver = None
+
+    def on_start(self, event):
+        connection = event.container.connect(self.broker_url, handler=self)
+        self._receiver = event.container.create_receiver(connection, self.queue)
+
+    def on_message(self, event):
+        now = time.perf_counter()
+        message = event.message
+        sent_at = (message.properties or {}).get(SENT_AT)
+        if sent_at is not None:
+            self.stats.latencies.append(now - sent_at)
+        self.stats.received += 1
+        self.stats.bytes += len(message.body) if message.body else 0
+        if self.stats.first_at is None:
+            self.stats.first_at = now
+        self.stats.last_at = now
+        if self.stats.received >= self.stats.expected:
+            self.stats.close_all()
+
+    def close(self):
+        if self._receiver:
+            self._receiver.connection.close()
+
+    def on_transport_error(self, event):
+        print(f"[ERROR] Receiver transport error: {event.transport.condition}")
+        self.close()
+
+
+class ReceiveStats(object):
+    """Counters shared by all receivers; the reactor is single threaded."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.received = 0
+        self.bytes = 0
+        self.latencies = []
+        self.first_at = None
+        self.last_at = None
+        self.receivers = []
+        self.deadline = None
+
+    def close_all(self):
+        # The pending deadline timer would otherwise keep the reactor running.
+        if self.deadline is not None:
+            self.deadline.cancel()
+        for receiver in self.receivers:
+            receiver.close()
+
+
+class Deadline(object):
+    def __init__(self, senders, stats):
+        self.senders = senders
+        self.stats = stats
+
+    def on_timer_task(self, event):
+        print("[WARNING] Timed out before every message was received.")
+        self.stats.deadline = None
+        self.stats.close_all()
+        for sender in self.senders:
+            sender._finish()
+
+
+def run(opts):
+    body = b"x" * opts.size
+    expected = opts.senders * opts.count * opts.fanout
+    stats = ReceiveStats(expected)
+    senders = [LoadSender(opts.broker, opts.exchange, opts.key, opts.count, body, opts.batch, opts.presettled)
+               for _ in range(opts.senders)]
+    receivers = [LoadReceiver(opts.broker, opts.queue, opts.credit, stats) for _ in range(opts.receivers)]
+    stats.receivers = receivers
+
+    # Receivers come first so they are attached before the senders start.
+    container = Container(*(receivers + senders))
+    stats.deadline = container.schedule(opts.timeout, Deadline(senders, stats))
+    start = time.perf_counter()
+    container.run()
+    end = time.perf_counter()
+
+    sent = sum(sender.sent for sender in senders)
+    send_end = max((sender.finished_at or end) for sender in senders)
+    receive_time = (stats.last_at - start) if stats.last_at else 0.0
+    latencies = sorted(stats.latencies)
+    return {
+        "messages_sent": sent,
+        "messages_confirmed": sum(sender.confirmed for sender in senders),
+        "messages_rejected": sum(sender.rejected for sender in senders),
+        "messages_received": stats.received,
+        "message_size": opts.size,
+        "send_rate": sent / (send_end - start) if send_end > start else 0.0,
+        "receive_rate": stats.received / receive_time if receive_time > 0 else 0.0,
+        "receive_bytes_per_sec": stats.bytes / receive_time if receive_time > 0 else 0.0,
+        "latency_ms": {f"p{pct}": percentile(latencies, pct) * 1000 for pct in PERCENTILES},
+        "elapsed": end - start
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure message throughput and latency through an exchange and binding.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("exchange", help="Exchange to publish to.")
+    parser.add_argument("queue", help="Queue bound to the exchange to consume from.")
+    parser.add_argument("--key", default="", help="Routing key sent as the message subject.")
+    parser.add_argument("--broker", default=BROKER_URL, help=f"Broker URL (default: {BROKER_URL}).")
+    parser.add_argument("--count", type=int, default=10000, help="Messages per sender (default: 10000).")
+    parser.add_argument("--size", type=int, default=1024, help="Message body size in bytes (default: 1024).")
+    parser.add_argument("--senders", type=int, default=1, help="Number of senders (default: 1).")
+    parser.add_argument("--receivers", type=int, default=1, help="Number of receivers (default: 1).")
+    parser.add_argument("--credit", type=int, default=500, help="Link credit (prefetch) per receiver (default: 500).")
+    parser.add_argument("--batch", type=int, default=100,
+                        help="Messages a sender writes before yielding to the reactor (default: 100).")
+    parser.add_argument("--presettled", action="store_true",
+                        help="Send pre-settled (at most once) instead of waiting for acknowledgements.")
+    parser.add_argument("--fanout", type=int, default=1,
+                        help="Copies of each message the queue receives, e.g. when bound more than once (default: 1).")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up after this many seconds (default: 300).")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    add_profile_arguments(parser)
+    opts = parser.parse_args()
+    start_profiling(opts)
+
+    try:
+        result = run(opts)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        sys.exit(1)
+
+    if opts.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Sent {result['messages_sent']} ({result['messages_confirmed']} accepted, "
+              f"{result['messages_rejected']} rejected/released), received {result['messages_received']}")
+        print(f"Send rate:    {result['send_rate']:.0f} msgs/sec")
+        print(f"Receive rate: {result['receive_rate']:.0f} msgs/sec, "
+              f"{result['receive_bytes_per_sec'] / 1e6:.2f} MB/sec")
+        print("Latency:      " + ", ".join(f"{name}={value:.2f}ms" for name, value in result["latency_ms"].items()))
+    if result["messages_received"] < result["messages_sent"] * opts.fanout:
+        sys.exit(1)
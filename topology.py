@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+# Declarative broker topology: loading a topology file, reading the live
+# topology from QMF query results, and planning the operations needed to
+# make the broker match the file.
+#
+# Topology files are YAML (or JSON) of the form:
+#
+#   exchanges:
+#     - {name: s1, type: topic, durable: true, alternate-exchange: ae}
+#   queues:
+#     - {name: s2, durable: true}
+#   bindings:
+#     - {exchange: s1, queue: s2, key: mykey}
+#
+# For backups of large brokers there is also a streaming form: one JSON
+# record per line (optionally gzip compressed), exchanges first, then
+# queues, then bindings, so it can be written while the QMF query results
+# arrive and replayed without loading it whole:
+#
+#   {"kind": "exchange", "name": "s1", "type": "topic", "durable": true}
+#   {"kind": "queue", "name": "s2", "durable": true, "auto-delete": false}
+#   {"kind": "binding", "exchange": "s1", "queue": "s2", "key": "mykey"}
+
+import sys
+import gzip
+import json
+
+import operations
+
+
+def load_topology(path):
+    """Loads a topology file and returns it in normalized form (see normalize_topology)."""
+    with open(path) as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+        else:
+            import yaml
+            data = yaml.safe_load(f)
+    return normalize_topology(data or {})
+
+
+def _exchange_spec(entry):
+    return {
+        "type": entry["type"],
+        "durable": bool(entry.get("durable", False)),
+        "alternate-exchange": entry.get("alternate-exchange")
+    }
+
+
+def _queue_spec(entry):
+    return {
+        "durable": bool(entry.get("durable", False)),
+        "auto-delete": bool(entry.get("auto-delete", False)),
+        "alternate-exchange": entry.get("alternate-exchange")
+    }
+
+
+def normalize_topology(data):
+    """
+    Returns {"exchanges": {name: spec}, "queues": {name: spec},
+    "bindings": {(exchange, queue, key), ...}}.
+    """
+    return {
+        "exchanges": {entry["name"]: _exchange_spec(entry) for entry in data.get("exchanges") or []},
+        "queues": {entry["name"]: _queue_spec(entry) for entry in data.get("queues") or []},
+        "bindings": {
+            (entry["exchange"], entry["queue"], entry.get("key", ""))
+            for entry in data.get("bindings") or []
+        }
+    }
+
+
+def exchange_from_values(values):
+    """Returns (name, spec) for the '_values' of a QMF exchange object."""
+    from qmf_query import text, ref_name
+
+    return text(values.get("name")), {
+        "type": text(values.get("type")),
+        "durable": bool(values.get("durable", False)),
+        "alternate-exchange": ref_name(values.get("altExchange"))
+    }
+
+
+def queue_from_values(values):
+    """Returns (name, spec) for the '_values' of a QMF queue object."""
+    from qmf_query import text, ref_name
+
+    return text(values.get("name")), {
+        "durable": bool(values.get("durable", False)),
+        "auto-delete": bool(values.get("autoDelete", False)),
+        "alternate-exchange": ref_name(values.get("altExchange"))
+    }
+
+
+def is_session_queue(values):
+    """
+    True for the '_values' of a queue that belongs to a client session
+    (an exclusive queue, such as a dynamic reply queue) rather than to the
+    broker's configured topology. Auto-delete alone does not count: those
+    queues are declared on purpose, e.g. with 'queue --auto-delete'.
+    """
+    return bool(values.get("exclusive", False))
+
+
+def binding_from_values(values):
+    """Returns (exchange, queue, key) for the '_values' of a QMF binding object."""
+    from qmf_query import text, ref_name
+
+    return (
+        ref_name(values.get("exchangeRef")),
+        ref_name(values.get("queueRef")),
+        text(values.get("bindingKey", ""))
+    )
+
+
+def live_topology(objects):
+    """Normalizes the result of a QMF query for 'exchange', 'queue' and 'binding'."""
+    exchanges = dict(exchange_from_values(values) for values in objects.get("exchange", []))
+    queues = dict(queue_from_values(values) for values in objects.get("queue", []))
+    bindings = {binding_from_values(values) for values in objects.get("binding", [])}
+    return {"exchanges": exchanges, "queues": queues, "bindings": bindings}
+
+
+def is_builtin_exchange(name):
+    """The default exchange and the amq.*, qpid.* and qmf.* exchanges every broker creates itself."""
+    return not name or name.startswith(("amq.", "qpid.", "qmf."))
+
+
+def open_records(path, mode):
+    """Opens a record file for "r" or "w" in text mode; '-' is stdin/stdout and '.gz' is gzip."""
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode)
+
+
+def _record(kind, name, spec):
+    record = {"kind": kind, "name": name}
+    record.update((key, value) for key, value in spec.items() if value is not None)
+    return json.dumps(record)
+
+
+def export_topology(broker_url, stream):
+    """
+    Writes the broker's exchanges, queues and bindings to 'stream' as
+    records, one query chunk at a time. Built-in exchanges, session queues
+    (see is_session_queue) with their bindings, and the default exchange's
+    bindings are left out. Only exchanges that have an alternate exchange
+    are held back (and ordered) so the file replays in dependency order.
+    Returns {kind: count}. Raises RuntimeError if a query fails.
+    """
+    from proton.reactor import Container
+    from qmf_query import QmfQueryManager
+
+    counts = {"exchange": 0, "queue": 0, "binding": 0}
+    with_alternate = {}
+    session_queues = set()
+
+    def write_exchanges(class_name, objects):
+        for values in objects:
+            name, spec = exchange_from_values(values)
+            if is_builtin_exchange(name):
+                continue
+            if spec["alternate-exchange"]:
+                with_alternate[name] = spec
+                continue
+            stream.write(_record("exchange", name, spec) + "\n")
+            counts["exchange"] += 1
+
+    def write_queues(class_name, objects):
+        for values in objects:
+            name, spec = queue_from_values(values)
+            if is_session_queue(values):
+                session_queues.add(name)
+                continue
+            stream.write(_record("queue", name, spec) + "\n")
+            counts["queue"] += 1
+
+    def write_bindings(class_name, objects):
+        for values in objects:
+            exchange, queue, key = binding_from_values(values)
+            if not exchange:
+                continue  # the broker binds every queue to the default exchange itself
+            if queue in session_queues:
+                continue
+            stream.write(json.dumps({"kind": "binding", "exchange": exchange, "queue": queue, "key": key}) + "\n")
+            counts["binding"] += 1
+
+    def run_query(class_name, on_objects):
+        handler = QmfQueryManager(broker_url, [class_name], on_objects)
+        Container(handler).run()
+        if handler.error:
+            raise RuntimeError(handler.error)
+
+    run_query("exchange", write_exchanges)
+    for name in _exchange_order(set(with_alternate), with_alternate):
+        stream.write(_record("exchange", name, with_alternate[name]) + "\n")
+        counts["exchange"] += 1
+    with_alternate.clear()
+    run_query("queue", write_queues)
+    run_query("binding", write_bindings)
+    return counts
+
+
+def record_operations(stream):
+    """Lazily turns the records of an export back into create/bind operations."""
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record.get("kind")
+        if kind == "exchange":
+            operation = operations.exchange_create(record["name"], record["type"], record.get("durable", False),
+                                                   record.get("alternate-exchange"))
+        elif kind == "queue":
+            operation = operations.queue_create(record["name"], record.get("durable", False),
+                                                record.get("auto-delete", False), record.get("alternate-exchange"))
+        elif kind == "binding":
+            operation = operations.bind(record["exchange"], record["queue"], record.get("key", ""))
+        else:
+            raise ValueError(f"line {line_number}: unknown record kind {kind!r}")
+        yield operation
+
+
+def _exchange_order(names, exchanges):
+    """Orders exchanges so that an alternate exchange is created before its users."""
+    ordered = []
+    visited = set()
+
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        alternate = exchanges[name]["alternate-exchange"]
+        if alternate in names:
+            visit(alternate)
+        ordered.append(name)
+
+    for name in sorted(names):
+        visit(name)
+    return ordered
+
+
+def plan_changes(desired, live, recreate_changed=False):
+    """
+    Compares the desired topology with the live one. Returns a tuple
+    (operations, drift) where 'operations' creates what is missing (and,
+    with recreate_changed, deletes and re-creates exchanges and queues whose
+    properties differ) and 'drift' lists the changed objects left alone.
+    """
+    drift = []
+    deletes = []
+    exchanges = set()
+    queues = set()
+
+    for name, spec in desired["exchanges"].items():
+        current = live["exchanges"].get(name)
+        if current is None:
+            exchanges.add(name)
+        elif current != spec:
+            if recreate_changed:
+                deletes.append(operations.delete("exchange", name))
+                exchanges.add(name)
+            else:
+                drift.append(("exchange", name, current, spec))
+
+    for name, spec in desired["queues"].items():
+        current = live["queues"].get(name)
+        if current is None:
+            queues.add(name)
+        elif current != spec:
+            if recreate_changed:
+                deletes.append(operations.delete("queue", name))
+                queues.add(name)
+            else:
+                drift.append(("queue", name, current, spec))
+
+    planned = list(deletes)
+    all_exchanges = desired["exchanges"]
+    for name in _exchange_order(exchanges, all_exchanges):
+        spec = all_exchanges[name]
+        planned.append(operations.exchange_create(
+            name, spec["type"], spec["durable"], spec["alternate-exchange"]))
+    for name in sorted(queues):
+        spec = desired["queues"][name]
+        planned.append(operations.queue_create(
+            name, spec["durable"], spec["auto-delete"], spec["alternate-exchange"]))
+
+    # Re-created objects lose their bindings, so those are sent again too.
+    for exchange, queue, key in sorted(desired["bindings"]):
+        if (exchange, queue, key) not in live["bindings"] or exchange in exchanges or queue in queues:
+            planned.append(operations.bind(exchange, queue, key))
+
+    return planned, drift